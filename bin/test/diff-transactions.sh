@@ -5,4 +5,5 @@
 
 thisdir="$( cd "$( dirname "$0" )" && pwd )"
 basedir=$thisdir/../..
+$basedir/bin/pecuniacli.sh compact > /dev/null
 diff $@ $basedir/private/gold/transactions.json $basedir/private/transactions.json
@@ -6,3 +6,4 @@
 thisdir="$( cd "$( dirname "$0" )" && pwd )"
 basedir=$thisdir/../..
 cp $basedir/private/gold/transactions.json $basedir/private/transactions.json
+rm -f $basedir/private/transactions.json.journal
@@ -5,4 +5,5 @@
 
 thisdir="$( cd "$( dirname "$0" )" && pwd )"
 basedir=$thisdir/../..
+$basedir/bin/pecuniacli.sh compact > /dev/null
 cp $basedir/private/transactions.json $basedir/private/gold/transactions.json
@@ -0,0 +1,145 @@
+'''
+A sorted index of the amounts in the transaction database
+
+The index lists the amount of each transaction in ascending order with
+its position, where a position is as :func:`tagindexing.write` numbers
+it, so that the transactions within a range of amounts are found by
+binary search.  Like the tag index, it is written only with the
+database file, so a reader checks the transactions that the journal
+has added since.  The amounts and positions are stored as the bytes
+of their arrays, which load far faster than pickled lists.
+
+* :class:`AmountRanges`
+* :func:`parse_amount_ranges`
+* :func:`write`
+* :func:`load`
+* :class:`AmountIndex`
+'''
+
+# Standard imports:
+import array
+import bisect
+
+# Project imports:
+import caching
+
+
+class AmountRanges(object):
+    '''
+    Inclusive ranges of amounts, each with ``None`` for an open end
+    '''
+
+    def __init__(self, ranges):
+        self.ranges = ranges
+
+    def __contains__(self, amount):
+        if amount is None:
+            return False
+        for low, high in self.ranges:
+            if ((low is None or low <= amount) and
+                    (high is None or amount <= high)):
+                return True
+        return False
+
+    def __eq__(self, other):
+        return isinstance(other, AmountRanges) and self.ranges == other.ranges
+
+    def __ne__(self, other):
+        return not self == other
+
+
+def parse_amount_ranges(s):
+    '''
+    Convert a string like ``-10``, ``9.99..10.01``, ``..-500`` or
+    ``500..`` to :class:`AmountRanges`, chaining ranges with commas as
+    :func:`datetools.parse_date_sequence` does.  Debits are negative.
+    '''
+
+    ranges = []
+    for subtoken in s.split(','):
+        if subtoken == '':
+            continue
+        try:
+            if '..' in subtoken:
+                low, high = subtoken.split('..')
+                low = None if low == '' else float(low)
+                high = None if high == '' else float(high)
+            else:
+                low = high = float(subtoken)
+        except ValueError:
+            raise ValueError('"%s" is not an amount range.' % subtoken)
+        if (low is None and high is None) or (
+                low is not None and high is not None and low > high):
+            raise ValueError('"%s" is not an amount range.' % subtoken)
+        ranges.append((low, high))
+    return AmountRanges(ranges)
+
+
+def write(path, xactions, source_paths):
+    '''
+    Write an index of the amounts of `xactions`, each at its position
+    in the list, to `path` as of the files at `source_paths`.
+    '''
+
+    amounts_and_positions = sorted(
+        (x.amount, position)
+        for position, x in enumerate(xactions)
+        if x.amount is not None)
+    _store(
+        path,
+        source_paths,
+        array.array('d', [amount for amount, _ in amounts_and_positions]),
+        array.array('i', [position for _, position in amounts_and_positions]))
+
+
+def load(path, source_paths):
+    '''
+    Return the :class:`AmountIndex` at `path` if it is as of the files
+    at `source_paths` as they are now, otherwise ``None``.
+    '''
+
+    payload = caching.load(path, caching.stat_key(source_paths))
+    if payload is None:
+        return None
+    return _amount_index(payload)
+
+
+class AmountIndex(object):
+    '''
+    The amounts of a database in ascending order and the position of
+    each
+    '''
+
+    def __init__(self, amounts, positions):
+        self.amounts = amounts
+        self.positions = positions
+
+    def select(self, amount_ranges):
+        '''
+        Return the sorted positions whose amount is in the
+        :class:`AmountRanges` `amount_ranges`.
+        '''
+
+        selected_positions = set()
+        for low, high in amount_ranges.ranges:
+            first = (
+                0 if low is None
+                else bisect.bisect_left(self.amounts, low))
+            last = (
+                len(self.amounts) if high is None
+                else bisect.bisect_right(self.amounts, high))
+            selected_positions.update(self.positions[first:last])
+        return sorted(selected_positions)
+
+
+def _store(path, source_paths, amounts, positions):
+    caching.store(
+        path,
+        caching.stat_key(source_paths),
+        (amounts.tostring(), positions.tostring()))
+
+
+def _amount_index(payload):
+    amounts_bytes, positions_bytes = payload
+    return AmountIndex(
+        array.array('d', amounts_bytes), array.array('i', positions_bytes))
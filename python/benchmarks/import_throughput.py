@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+'''
+Measure how quickly account-activity files are parsed
+
+Writes a synthetic credit-card export and parses it twice: once the
+way :func:`importing.parse_file` used to (``readlines()``, splitting
+each line by hand and trying each date format in turn) and once with
+the current
+:func:`importing.iterate_file`.  Then reports the rows per second of
+each.
+'''
+
+# Standard imports:
+import argparse
+import datetime
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Project imports:
+import importing
+
+
+def main():
+    options = _parse_options()
+    folder_path = tempfile.mkdtemp()
+    try:
+        path = os.path.join(folder_path, 'activity.CSV')
+        _synthesize_activity_file(path, options.count)
+
+        legacy_seconds = _time(lambda: _legacy_parse_file(path))
+        current_seconds = _time(lambda: list(importing.iterate_file(path)))
+    finally:
+        shutil.rmtree(folder_path)
+
+    sys.stdout.write('Rows:    %d\n' % options.count)
+    for name, seconds in (
+            ('Before', legacy_seconds),
+            ('After', current_seconds)):
+        sys.stdout.write(
+            '%-7s  %6.3f s  (%.0f rows/s)\n' % (
+                name + ':', seconds, options.count / seconds))
+
+
+def _parse_options():
+    parser = argparse.ArgumentParser(
+        description='Measure how quickly account-activity files are parsed')
+    parser.add_argument(
+        '--count',
+        type=int,
+        default=200 * 1000,
+        help='the number of synthetic rows',
+        dest='count')
+    return parser.parse_args()
+
+
+def _synthesize_activity_file(path, count):
+    randomizer = random.Random(0)
+    with open(path, 'w') as activity_file:
+        activity_file.write('Type,Trans Date,Post Date,Description,Amount\n')
+        for index in xrange(count):
+            month = 1 + index % 12
+            day = 1 + index % 28
+            description = randomizer.choice([
+                'WALGREENS #%d',
+                'TRADER JOE\'S #%d',
+                'THRIFT BOOKS GLOBAL, LLC %d',
+            ]) % randomizer.randint(0, 5000)
+            activity_file.write('%s,%02d/%02d/2018,%02d/%02d/2018,%s,%.2f\n' % (
+                randomizer.choice(['Sale', 'Sale', 'Return']),
+                month, day, month, day,
+                description,
+                randomizer.uniform(-200.0, 50.0)))
+
+
+def _time(function):
+    start = time.time()
+    function()
+    return time.time() - start
+
+
+def _legacy_parse_file(path):
+    '''
+    Parse the file at `path` as :func:`importing.parse_file` did before
+    it used the :mod:`csv` module and compiled row parsers.
+    '''
+
+    xactions = []
+    with open(path, 'r') as activity_file:
+        key = importing._parse_key_line(activity_file.readline())
+        for line in activity_file.readlines():
+            tokens = _legacy_split_transaction_line(line)
+            x = importing.transactions.Transaction()
+            x.type = tokens[key.type].lower()
+            x.trans_date = _legacy_parse_transaction_date(
+                tokens[key.trans_date])
+            x.post_date = _legacy_parse_transaction_date(
+                tokens[key.post_date])
+            x.description = tokens[key.description]
+            x.amount = float(tokens[key.amount])
+            if x.type not in ('payment', 'acct_xfer'):
+                xactions.append(x)
+    return xactions
+
+
+def _legacy_split_transaction_line(line):
+    tokens = []
+    for maybe_token in line.strip().split(','):
+        if maybe_token.startswith(' ') and (len(maybe_token) > 1):
+            tokens[-1] = tokens[-1] + ',' + maybe_token
+        else:
+            tokens.append(maybe_token)
+    return tokens
+
+
+def _legacy_parse_transaction_date(s):
+    try:
+        month, day, year = s.split('/')
+    except ValueError:
+        year, month, day = s.split('-')
+    return datetime.date(int(year), int(month), int(day))
+
+
+if __name__ == '__main__':
+    main()
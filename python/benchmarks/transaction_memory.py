@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+'''
+Measure the memory each decoded transaction occupies
+
+Decodes a synthetic database twice: once into transactions laid out
+the way :class:`transactions.Transaction` used to be (a ``__dict__``,
+a fresh ``tags`` and no interning) and once into the current
+:class:`transactions.Transaction`.  Then reports the bytes per
+transaction of each, counting every object reachable from a
+transaction once.
+'''
+
+# Standard imports:
+import argparse
+import datetime
+import json
+import random
+import sys
+
+# Project imports:
+import transactions
+
+
+def main():
+    options = _parse_options()
+    json_lines = _synthesize_json_lines(options.count)
+
+    legacy_bytes = _footprint(
+        [_LegacyTransaction.decode(json.loads(line)) for line in json_lines])
+    current_bytes = _footprint(
+        [transactions.Transaction.decode(json.loads(line))
+         for line in json_lines])
+
+    sys.stdout.write('Transactions:  %d\n' % options.count)
+    for name, total_bytes in (
+            ('Before', legacy_bytes),
+            ('After', current_bytes)):
+        sys.stdout.write(
+            '%-7s        %6.1f bytes/transaction  (%.1f MiB)\n' % (
+                name + ':',
+                total_bytes / float(options.count),
+                total_bytes / float(1024 * 1024)))
+
+
+def _parse_options():
+    parser = argparse.ArgumentParser(
+        description='Measure the memory each decoded transaction occupies')
+    parser.add_argument(
+        '--count',
+        type=int,
+        default=1000 * 1000,
+        help='the number of synthetic transactions',
+        dest='count')
+    return parser.parse_args()
+
+
+def _synthesize_json_lines(count):
+    '''
+    Return `count` transactions encoded one per line, as they would be
+    read from a database.
+    '''
+
+    randomizer = random.Random(0)
+    first_date = datetime.date(2010, 1, 1)
+    tag_choices = [[], [], ['food'], ['rent'], ['food', 'cash'], ['travel']]
+    json_lines = []
+    for index in xrange(count):
+        x = transactions.Transaction()
+        x.type = randomizer.choice(['sale', 'sale', 'sale', 'return'])
+        x.trans_date = first_date + datetime.timedelta(days=index // 300)
+        x.post_date = x.trans_date + datetime.timedelta(days=1)
+        x.description = 'MERCHANT #%d' % randomizer.randint(0, 5000)
+        x.amount = round(randomizer.uniform(-200.0, 50.0), 2)
+        x.tags = dict.fromkeys(randomizer.choice(tag_choices))
+        json_lines.append(json.dumps(x.encode()))
+    return json_lines
+
+
+class _LegacyTransaction(object):
+    '''
+    A transaction laid out as :class:`transactions.Transaction` was
+    before it gained ``__slots__`` and interning
+    '''
+
+    def __init__(self):
+        self.type = None
+        self.trans_date = None
+        self.post_date = None
+        self.description = None
+        self.amount = None
+        self.tags = {}
+
+    @staticmethod
+    def decode(json_decodable):
+        x = _LegacyTransaction()
+        x.type = json_decodable['type']
+        x.trans_date = transactions._parse_transaction_date(
+            json_decodable['trans_date'])
+        x.post_date = transactions._parse_transaction_date(
+            json_decodable['post_date'])
+        x.description = json_decodable['description']
+        x.amount = json_decodable['amount']
+        if 'tags' in json_decodable:
+            x.tags = json_decodable['tags']
+            if isinstance(x.tags, list):
+                x.tags = {tag: None for tag in x.tags}
+        return x
+
+
+def _footprint(xactions):
+    '''
+    Return the bytes occupied by `xactions`, their attributes and their
+    tags, counting each distinct object once.
+    '''
+
+    seen_ids = set()
+    total_bytes = 0
+
+    def visit(obj):
+        if id(obj) in seen_ids:
+            return 0
+        seen_ids.add(id(obj))
+        return sys.getsizeof(obj)
+
+    for x in xactions:
+        total_bytes += visit(x)
+        if hasattr(x, '__dict__'):
+            total_bytes += visit(x.__dict__)
+        for value in (
+                x.type, x.trans_date, x.post_date, x.description, x.amount):
+            total_bytes += visit(value)
+        total_bytes += visit(x.tags)
+        for tag, amount in x.tags.items():
+            total_bytes += visit(tag) + visit(amount)
+    return total_bytes
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+'''
+An on-disk cache of decoded transactions
+
+A cache file holds a key that identifies the files it was decoded from
+followed by the decoded payload, each pickled separately so that a
+stale cache is recognized without unpickling its payload.
+
+* :func:`file_key`
+* :func:`stat_key`
+* :func:`hash_file`
+* :func:`load`
+* :func:`store`
+* :func:`clear`
+'''
+
+# Standard imports:
+import cPickle
+import hashlib
+import os
+
+
+def file_key(paths):
+    '''
+    Return a key that changes whenever any of the files at `paths` is
+    created, removed or changed: each file's absolute path, mtime,
+    size and a hash of its content.
+    '''
+
+    key = []
+    for path in paths:
+        path = os.path.abspath(path)
+        if not os.path.exists(path):
+            key.append((path, None))
+            continue
+        stat = os.stat(path)
+        key.append((path, stat.st_mtime, stat.st_size, hash_file(path)))
+    return tuple(key)
+
+
+def stat_key(paths):
+    '''
+    Return a key that changes whenever any of the files at `paths` is
+    created, removed or changed, judging by its mtime and size alone.
+    '''
+
+    key = []
+    for path in paths:
+        path = os.path.abspath(path)
+        if not os.path.exists(path):
+            key.append((path, None))
+            continue
+        stat = os.stat(path)
+        key.append((path, stat.st_mtime, stat.st_size))
+    return tuple(key)
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    '''
+    Return a hash of the content of the file at `path`.
+    '''
+
+    digest = hashlib.sha1()
+    with open(path, 'rb') as hashed_file:
+        while True:
+            chunk = hashed_file.read(chunk_size)
+            if len(chunk) == 0:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load(path, key):
+    '''
+    Return the payload cached at `path` if it was stored with `key`,
+    otherwise ``None``.
+    '''
+
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as cache_file:
+            if cPickle.load(cache_file) != key:
+                return None
+            return cPickle.load(cache_file)
+    except Exception:
+        # A cache that cannot be read is as good as no cache.
+        return None
+
+
+def store(path, key, payload):
+    '''
+    Cache `payload` at `path` under `key`.
+    '''
+
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'wb') as cache_file:
+        cPickle.dump(key, cache_file, cPickle.HIGHEST_PROTOCOL)
+        cPickle.dump(payload, cache_file, cPickle.HIGHEST_PROTOCOL)
+    os.rename(temporary_path, path)
+
+
+def clear(path):
+    '''
+    Discard the cache at `path`.
+    '''
+
+    if os.path.exists(path):
+        os.remove(path)
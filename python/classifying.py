@@ -60,7 +60,7 @@ def _handle_user_input(rawInput, allTransactions, transaction):
                 'Stored %d transcations to file "%s".\n' % (
                     len(allTransactions), transactions.database_path()))
         else:
-            transaction.tags.update(_parseTag(token))
+            transaction.add_tags(_parse_tag(token))
 
 
 def _parse_tag(token):
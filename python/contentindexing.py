@@ -0,0 +1,91 @@
+'''
+An index of the content of the transactions in the database
+
+The index counts the transactions with each content key: the date,
+amount, description and type by which an imported transaction is
+recognized as already present.  It holds the hash of each key in a
+sorted array, so counting a key is a binary search.  It is written
+only with the database file, so a reader counts the transactions that
+the journal has added since.
+
+* :func:`content_key`
+* :func:`write`
+* :func:`load`
+* :class:`ContentIndex`
+'''
+
+# Standard imports:
+import array
+import bisect
+import datetime
+
+# Project imports:
+import caching
+
+
+def content_key(x):
+    '''
+    Return the date, amount, description and type of `x` as a tuple,
+    without the double quotes that transactions imported before
+    :func:`importing.iterate_file` used the :mod:`csv` module kept
+    around the description.
+    '''
+
+    description = x.description
+    if (description is not None and len(description) >= 2 and
+            description[0] == description[-1] == '"'):
+        description = description[1:-1]
+    return (x.date, x.amount, description, x.type)
+
+
+def write(path, xactions, source_paths):
+    '''
+    Write an index of the content of `xactions` to `path` as of the
+    files at `source_paths`.
+    '''
+
+    hashes = array.array(
+        'l', sorted(hash(content_key(x)) for x in xactions))
+    caching.store(
+        path,
+        caching.stat_key(source_paths),
+        (hash(_probe_key), hashes.tostring()))
+
+
+def load(path, source_paths):
+    '''
+    Return the :class:`ContentIndex` at `path` if it is as of the files
+    at `source_paths` as they are now, otherwise ``None``.
+    '''
+
+    payload = caching.load(path, caching.stat_key(source_paths))
+    if payload is None:
+        return None
+    probe_hash, hashes_bytes = payload
+    # Another interpreter may hash differently.
+    if probe_hash != hash(_probe_key):
+        return None
+    return ContentIndex(array.array('l', hashes_bytes))
+
+
+class ContentIndex(object):
+    '''
+    The sorted hashes of the content keys of a database's transactions
+    '''
+
+    def __init__(self, hashes):
+        self.hashes = hashes
+
+    def count(self, key):
+        '''
+        Return how many transactions have the content key `key`, taking
+        the rare key whose hash another shares for that one.
+        '''
+
+        key_hash = hash(key)
+        return (
+            bisect.bisect_right(self.hashes, key_hash) -
+            bisect.bisect_left(self.hashes, key_hash))
+
+
+_probe_key = (datetime.date(2018, 9, 6), -2.85, u'WALGREENS #1234', u'sale')
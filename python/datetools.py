@@ -8,6 +8,7 @@ Functions:
 * :func:`parse_date_range`
 * :func:`parse_date`
 * :func:`date_as_string`
+* :func:`month_date_range`
 
 Objects:
 
@@ -22,10 +23,15 @@ Exceptions:
 '''
 
 # Standard imports:
+import bisect
 import datetime
 import sys
 
 
+_first_ordinal = datetime.date.min.toordinal()
+_last_ordinal = datetime.date.max.toordinal()
+
+
 def parse_date_sequence_file(path):
     '''
     Convert the contents of the file at `path` to a :class:`DateSequence`.
@@ -119,13 +125,33 @@ def date_as_string(date):
     return '%04d-%02d-%02d' % (date.year, date.month, date.day)
 
 
+def month_date_range(year, month):
+    '''
+    Return the :class:`DateRange` of every day in a month.
+    '''
+
+    first = datetime.date(year, month, 1)
+    if month == 12:
+        following = datetime.date(year + 1, 1, 1)
+    else:
+        following = datetime.date(year, month + 1, 1)
+    return DateRange(first, following - datetime.timedelta(days=1))
+
+
 class DateSequence(object):
     '''
     A sequence of dates and date ranges
+
+    Membership is answered from the sorted, disjoint intervals of date
+    ordinals that the sequence covers, which are worked out when first
+    needed and again whenever ``dates`` grows or is replaced.
     '''
 
     def __init__(self, dates):
         self.dates = dates
+        self._intervals_source = None
+        self._firsts = []
+        self._lasts = []
 
     def __repr__(self):
         return '[%s]' % (
@@ -139,14 +165,7 @@ class DateSequence(object):
             raise TypeError(
                 'Non-date "%s" was passed to DateSequence.__contains__().' % (
                     date))
-        for date_ in self.dates:
-            if isinstance(date_, DateRange):
-                if date in date_:
-                    return True
-            else:
-                if date == date_:
-                    return True
-        return False
+        return self.contains_ordinal(date.toordinal())
 
     def __eq__(self, other):
         if not isinstance(other, DateSequence):
@@ -175,9 +194,73 @@ class DateSequence(object):
     def is_empty(self):
         return len(self.dates) == 0
 
+    def contains_ordinal(self, ordinal):
+        '''
+        Return ``True`` if the date whose ordinal is `ordinal` is in the
+        sequence.
+        '''
+
+        self._compile_intervals()
+        index = bisect.bisect_right(self._firsts, ordinal) - 1
+        return index >= 0 and ordinal <= self._lasts[index]
+
+    def ordinal_intervals(self):
+        '''
+        Return the dates in the sequence as sorted, disjoint, inclusive
+        ``(first, last)`` pairs of date ordinals.  Open ends become the
+        first and last representable dates.
+        '''
+
+        self._compile_intervals()
+        return zip(self._firsts, self._lasts)
+
+    def overlaps(self, date_range):
+        '''
+        Return ``True`` if any date in the bounded :class:`DateRange`
+        `date_range` is in the sequence.
+        '''
+
+        first = date_range.first.toordinal()
+        last = date_range.last.toordinal()
+        self._compile_intervals()
+        # The last interval that starts no later than `last` is the
+        # only one that can reach `first`.
+        index = bisect.bisect_right(self._firsts, last) - 1
+        return index >= 0 and first <= self._lasts[index]
+
     def extend(self, other):
         self.dates.extend(other.dates)
 
+    def _compile_intervals(self):
+        source = (id(self.dates), len(self.dates))
+        if source == self._intervals_source:
+            return
+
+        intervals = []
+        for date in self.dates:
+            if not isinstance(date, DateRange):
+                intervals.append((date.toordinal(), date.toordinal()))
+            else:
+                intervals.append((
+                    _first_ordinal if date.first is None
+                    else date.first.toordinal(),
+                    _last_ordinal if date.last is None
+                    else date.last.toordinal()))
+        intervals.sort()
+
+        firsts = []
+        lasts = []
+        for first, last in intervals:
+            if len(lasts) > 0 and first <= lasts[-1] + 1:
+                lasts[-1] = max(lasts[-1], last)
+            else:
+                firsts.append(first)
+                lasts.append(last)
+
+        self._firsts = firsts
+        self._lasts = lasts
+        self._intervals_source = source
+
 
 class DateRange(object):
     '''
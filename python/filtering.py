@@ -1,24 +1,275 @@
 '''
 Transaction filtering
 
+* :func:`query_transactions`
 * :func:`filter_transactions`
+* :func:`iterate_filtered_transactions`
+* :func:`query_table`
+* :func:`query_tag_totals`
+* :func:`filter_table`
 '''
 
 # Standard imports:
+import array
+import itertools
 import re
 import sys
 
 # Project imports:
 import datetools
+import formatting
+import resultcaching
+import tables
+import transactions
 
 
-def filter_transactions(xactions, options):
+def query_transactions(options):
     '''
-    Filter a list of transactions by certain criteria.
+    Filter the transactions in the database by certain criteria,
+    letting an indexed database skip those the dates and tags rule
+    out.
+
+    The result is remembered in the database's
+    :func:`transactions.result_cache`, if it has one, and the same
+    query reads only the transactions it returned until the database
+    changes.  ``--explain`` always runs the query.
+    '''
+
+    date_sequence = _date_sequence(options)
+    result_cache = _result_cache(options)
+    if result_cache is None:
+        ruled_out_counts = {}
+        return _filter_transactions(
+            transactions.iterate(
+                ruled_out_counts=ruled_out_counts,
+                **_iterate_arguments(options, date_sequence)),
+            options,
+            date_sequence,
+            ruled_out_counts=ruled_out_counts)
+
+    key = _query_key('transactions', options, date_sequence)
+    result = result_cache.get(key)
+    if result is not None:
+        _write_messages(result.messages)
+        return [
+            x for _, x in transactions.iterate_with_positions(
+                positions=result.positions)
+        ]
+
+    positions_by_id = {}
+
+    def remember_positions(positions_and_xactions):
+        for position, x in positions_and_xactions:
+            positions_by_id[id(x)] = position
+            yield x
+
+    messages = []
+    ruled_out_counts = {}
+    filtered_xactions = _filter_transactions(
+        remember_positions(transactions.iterate_with_positions(
+            ruled_out_counts=ruled_out_counts,
+            **_iterate_arguments(options, date_sequence))),
+        options,
+        date_sequence,
+        messages=messages,
+        ruled_out_counts=ruled_out_counts)
+    result_cache.put(key, resultcaching.QueryResult(
+        sorted(positions_by_id[id(x)] for x in filtered_xactions),
+        messages))
+    return filtered_xactions
+
+
+def filter_transactions(xactions, options, date_sorted=False):
+    '''
+    Filter an iterable of transactions by certain criteria.
+
+    Only the transactions that survive are ever held in a list, so
+    `xactions` may be a generator such as :func:`transactions.iterate`.
+
+    If `date_sorted`, `xactions` is a list sorted by date, most recent
+    first, as :func:`transactions.load` returns, and the dates are
+    selected by binary search without looking at the others.
+    '''
+
+    return _filter_transactions(
+        xactions, options, _date_sequence(options), date_sorted)
+
+
+def iterate_filtered_transactions(xactions, options, date_sorted=False):
+    '''
+    Yield the transactions in an iterable that satisfy the same
+    criteria as :func:`filter_transactions`, as they are found.
+
+    Every criterion is tested in one pass over `xactions` and no list
+    is built.  How many transactions each criterion filtered is
+    reported once the last has been yielded.
+    '''
+
+    return _iterate_filtered_transactions(
+        xactions, options, _date_sequence(options), date_sorted)
+
+
+def query_table(options):
+    '''
+    Load the transactions in the database that might satisfy certain
+    criteria into a :class:`tables.TransactionTable` and return it with
+    the row numbers that do.
+    '''
+
+    date_sequence = _date_sequence(options)
+    ruled_out_counts = {}
+    table = tables.TransactionTable(transactions.iterate(
+        ruled_out_counts=ruled_out_counts,
+        **_iterate_arguments(options, date_sequence)))
+    return table, _filter_table(
+        table, options, date_sequence, ruled_out_counts=ruled_out_counts)
+
+
+def query_tag_totals(options):
+    '''
+    Return the number of transactions in the database that satisfy
+    certain criteria and, for each tag among them in alphabetical
+    order with ``None`` for no tags, a tuple of the tag, the number of
+    them with it and their debits, credits, volume and total.
+
+    Like :func:`query_transactions`, the result is remembered in the
+    database's :func:`transactions.result_cache`, if it has one.
+    '''
+
+    date_sequence = _date_sequence(options)
+    result_cache = _result_cache(options)
+    if result_cache is None:
+        table, rows = query_table(options)
+        return _tag_totals(table, rows)
+
+    key = _query_key('tag totals', options, date_sequence)
+    result = result_cache.get(key)
+    if result is not None:
+        _write_messages(result.messages)
+        return result.totals
+
+    # The position of each row of the table
+    positions = array.array('i')
+
+    def remember_positions(positions_and_xactions):
+        for position, x in positions_and_xactions:
+            positions.append(position)
+            yield x
+
+    ruled_out_counts = {}
+    table = tables.TransactionTable(remember_positions(
+        transactions.iterate_with_positions(
+            ruled_out_counts=ruled_out_counts,
+            **_iterate_arguments(options, date_sequence))))
+    messages = []
+    rows = _filter_table(
+        table, options, date_sequence, messages, ruled_out_counts)
+    totals = _tag_totals(table, rows)
+    result_cache.put(key, resultcaching.QueryResult(
+        sorted(positions[row] for row in rows), messages, totals))
+    return totals
+
+
+def _tag_totals(table, rows):
+    return (
+        len(rows),
+        [
+            (
+                tag,
+                len(tag_rows),
+                table.debits(tag_rows),
+                table.credits(tag_rows),
+                table.volume(tag_rows),
+                table.total(tag_rows),
+            )
+            for tag, tag_rows in table.rows_by_tag(rows).iteritems()
+        ])
+
+
+def filter_table(table, options):
+    '''
+    Return the row numbers of a :class:`tables.TransactionTable` that
+    satisfy the same criteria as :func:`filter_transactions`.
     '''
 
-    filtered_xactions = xactions
+    return _filter_table(table, options, _date_sequence(options))
 
+
+def _iterate_arguments(options, date_sequence):
+    '''
+    Return the keyword arguments with which :func:`transactions.iterate`
+    may skip the transactions that cannot satisfy `options`.
+    '''
+
+    return {
+        'date_sequence': date_sequence,
+        'no_tags': hasattr(options, 'no_tags') and options.no_tags,
+        'description_matcher': _include_matcher(options),
+        'tag_queries': _tag_queries(options),
+        'amount_ranges': _amount_ranges(options),
+    }
+
+
+def _result_cache(options):
+    if hasattr(options, 'explain') and options.explain:
+        return None
+    return transactions.result_cache()
+
+
+def _query_key(kind, options, date_sequence):
+    '''
+    Return a key that is the same for any two queries of `kind` that
+    select the same transactions, however their criteria are spelled.
+    '''
+
+    def regexs(name):
+        return tuple(sorted(set(getattr(options, name, []))))
+
+    return (
+        kind,
+        tuple(date_sequence.ordinal_intervals()),
+        regexs('include_regexs'),
+        regexs('exclude_regexs'),
+        bool(hasattr(options, 'no_tags') and options.no_tags),
+        tuple(sorted(set(
+            tuple(sorted(set(tag_query.terms)))
+            for tag_query in _tag_queries(options)))),
+        None if _amount_ranges(options) is None
+        else tuple(sorted(set(_amount_ranges(options).ranges))),
+    )
+
+
+def _write_messages(messages, written_messages=None):
+    '''
+    Write each of `messages` and, if `written_messages` is a list,
+    append it there too.
+    '''
+
+    for message in messages:
+        sys.stdout.write(message)
+        if written_messages is not None:
+            written_messages.append(message)
+
+
+def _include_matcher(options):
+    if hasattr(options, 'include_regexs') and len(options.include_regexs) > 0:
+        return _DescriptionMatcher(options.include_regexs)
+    return None
+
+
+def _tag_queries(options):
+    if hasattr(options, 'tag_queries'):
+        return options.tag_queries
+    return []
+
+
+def _amount_ranges(options):
+    if hasattr(options, 'amounts'):
+        return options.amounts
+    return None
+
+
+def _date_sequence(options):
     date_sequence = datetools.DateSequence([])
     if hasattr(options, 'dates') and options.dates is not None:
         date_sequence.extend(options.dates)
@@ -26,68 +277,477 @@ def filter_transactions(xactions, options):
         for dates_file in options.dates_files:
             date_sequence.extend(
                 datetools.parse_date_sequence_file(dates_file))
-    if not date_sequence.is_empty:
-        filtered_xactions = _filter_transactions_with_non_matching_dates(
-            filtered_xactions, date_sequence)
+    return date_sequence
+
+
+def _filter_transactions(
+        xactions,
+        options,
+        date_sequence,
+        date_sorted=False,
+        messages=None,
+        ruled_out_counts=None):
+    return list(_iterate_filtered_transactions(
+        xactions,
+        options,
+        date_sequence,
+        date_sorted,
+        messages,
+        ruled_out_counts))
+
+
+def _iterate_filtered_transactions(
+        xactions,
+        options,
+        date_sequence,
+        date_sorted=False,
+        messages=None,
+        ruled_out_counts=None):
+    '''
+    Yield the transactions in `xactions` that pass every stage in a
+    single pass, then report how many each stage filtered, appending
+    each message to the list `messages` if it is given.
+
+    The stages run in the order :func:`_plan_filter_stages` chooses.  A
+    transaction is dropped by the first stage it fails and is not
+    tested by the rest, so each count is of the transactions that the
+    stages before it let through.  The stages whose criteria
+    :func:`transactions.iterate` answered, as the dict
+    `ruled_out_counts` it filled says, count as having run first.
+    '''
+
+    if not date_sequence.is_empty and date_sorted:
+        xactions = _slice_transactions_with_matching_dates(
+            xactions, date_sequence)
+        date_sequence = None
+    stages = _filter_stages(options, date_sequence)
+
+    if len(stages) > 1:
+        if isinstance(xactions, list):
+            sample = xactions[::max(1, len(xactions) // _sample_size)]
+        else:
+            xactions = iter(xactions)
+            sample = list(itertools.islice(xactions, _sample_size))
+            xactions = itertools.chain(sample, xactions)
+        stages = _plan_filter_stages(stages, sample)
+
+    explain = hasattr(options, 'explain') and options.explain
+    return _iterate_passing_transactions(
+        xactions, stages, explain, messages, ruled_out_counts)
+
+
+class _FilterStage(object):
+    '''
+    A predicate that a transaction must satisfy to pass the filter and
+    the message that reports how many transactions it filtered
+
+    A planned stage also has its estimated cost in seconds per
+    transaction, a fixed estimate for its kind, and the fraction of
+    transactions it lets through.
+    '''
+
+    def __init__(self, name, predicate, message=None):
+        self.name = name
+        self.predicate = predicate
+        self.message = message
+        self.cost = None
+        self.pass_rate = None
+
+
+def _filter_stages(options, date_sequence):
+    '''
+    Return the :class:`_FilterStage` for each criterion in `options`
+    and, unless it is ``None`` or empty, `date_sequence`.
+    '''
+
+    stages = []
+
+    if date_sequence is not None and not date_sequence.is_empty:
+        stages.append(_FilterStage(
+            'dates',
+            lambda x: x.date in date_sequence))
 
     if hasattr(options, 'include_regexs') and len(options.include_regexs) > 0:
-        filtered_xactions = _filter_transactions_with_non_matching_descriptions(
-            filtered_xactions, options.include_regexs)
+        matches_include_regex = _DescriptionMatcher(options.include_regexs)
+        stages.append(_FilterStage(
+            'include',
+            lambda x: matches_include_regex(x.description),
+            'Filtered %d transaction(s) for not matching include regex.\n'))
 
     if hasattr(options, 'exclude_regexs') and len(options.exclude_regexs) > 0:
-        filtered_xactions = _filter_transactions_with_matching_descriptions(
-            filtered_xactions, options.exclude_regexs)
+        matches_exclude_regex = _DescriptionMatcher(options.exclude_regexs)
+        stages.append(_FilterStage(
+            'exclude',
+            lambda x: not matches_exclude_regex(x.description),
+            'Filtered %d transaction(s) for matching exclude regex.\n'))
 
     if hasattr(options, 'no_tags') and options.no_tags:
-        filtered_xactions = _filter_transactions_without_tags(
-            filtered_xactions)
+        stages.append(_FilterStage(
+            'no-tags',
+            lambda x: len(x.tags) == 0,
+            'Filtered %d transaction(s) for not having tags.\n'))
 
-    return filtered_xactions
+    tag_queries = _tag_queries(options)
+    if len(tag_queries) > 0:
+        stages.append(_FilterStage(
+            'tag',
+            lambda x: all(tag_query(x.tags) for tag_query in tag_queries),
+            'Filtered %d transaction(s) for not matching tag query.\n'))
 
+    amount_ranges = _amount_ranges(options)
+    if amount_ranges is not None:
+        stages.append(_FilterStage(
+            'amount',
+            lambda x: x.amount in amount_ranges,
+            'Filtered %d transaction(s) for amount out of range.\n'))
 
-def _filter_transactions_with_non_matching_dates(xactions, date_sequence):
-    filtered_xactions = [
-        x for x in xactions
-        if x.date in date_sequence
-    ]
-    return filtered_xactions
+    return stages
 
 
-def _filter_transactions_with_non_matching_descriptions(xactions, regexs):
-    filtered_xactions = [
-        x for x in xactions
-        if _any_regex_matches(regexs, x.description)
-    ]
-    sys.stdout.write(
-        'Filtered %d transaction(s) for not matching include regex.\n' % (
-            len(xactions) - len(filtered_xactions)))
-    return filtered_xactions
+# The number of transactions on which the stages are tried to plan
+# their order
+_sample_size = 256
+
+# The estimated cost of each kind of stage in seconds per transaction.
+# Unlike timings, these plan the same order every time for the same
+# transactions, so the messages and counts that depend on the order do
+# not vary from run to run.
+_stage_costs = {
+    'dates': 1.0e-6,
+    'include': 1.0e-6,
+    'exclude': 1.0e-6,
+    'no-tags': 0.5e-6,
+    'tag': 1.5e-6,
+    'amount': 0.5e-6,
+}
+
+
+def _plan_filter_stages(stages, sample):
+    '''
+    Estimate the pass rate of each of `stages` by trying it on the
+    transactions in `sample`, and return the stages in the order that
+    drops transactions most cheaply by the cost of each kind of stage.
+
+    A stage is ranked by its cost divided by the fraction it drops, so
+    a cheap stage that drops much runs first and one that drops nothing
+    runs last.  Stages that rank the same keep the order of their
+    kinds.
+    '''
+
+    if len(sample) == 0:
+        return stages
+
+    for stage in stages:
+        predicate = stage.predicate
+        pass_count = 0
+        for x in sample:
+            if predicate(x):
+                pass_count += 1
+        stage.cost = _stage_costs[stage.name]
+        stage.pass_rate = float(pass_count) / len(sample)
 
+    def rank(stage):
+        if stage.pass_rate == 1.0:
+            return float('inf')
+        return stage.cost / (1.0 - stage.pass_rate)
 
-def _filter_transactions_with_matching_descriptions(xactions, regexs):
-    filtered_xactions = [
-        x for x in xactions
-        if not _any_regex_matches(regexs, x.description)
+    return sorted(stages, key=rank)
+
+
+def _iterate_passing_transactions(
+        xactions,
+        stages,
+        explain=False,
+        messages=None,
+        ruled_out_counts=None):
+    '''
+    Yield the transactions in `xactions` that pass all of `stages`,
+    then report how many each stage filtered as :func:`_write_messages`
+    does and, if `explain`, write the plan.  Those counts include the
+    transactions in `ruled_out_counts` that were never read.
+    '''
+
+    filtered_counts = [0] * len(stages)
+    indexes_and_predicates = [
+        (index, stage.predicate) for index, stage in enumerate(stages)
     ]
-    sys.stdout.write(
-        'Filtered %d transaction(s) for matching exclude regex.\n' % (
-            len(xactions) - len(filtered_xactions)))
+    count = 0
+    for x in xactions:
+        count += 1
+        for index, predicate in indexes_and_predicates:
+            if not predicate(x):
+                filtered_counts[index] += 1
+                break
+        else:
+            yield x
+
+    if ruled_out_counts:
+        stages, count, filtered_counts = _with_ruled_out_counts(
+            stages, count, filtered_counts, ruled_out_counts)
+    _write_messages(
+        [
+            stage.message % filtered_count
+            for stage, filtered_count in zip(stages, filtered_counts)
+            if stage.message is not None
+        ],
+        messages)
+    if explain:
+        _write_plan(stages, count, filtered_counts)
+
+
+def _with_ruled_out_counts(stages, count, filtered_counts, ruled_out_counts):
+    '''
+    Return `stages` with those whose criteria were answered before any
+    transaction was read first, how many transactions came into the
+    first stage and how many each filtered, counting those in
+    `ruled_out_counts` that were never read.
+    '''
+
+    ruled_out_steps = []
+    read_steps = []
+    for stage, filtered_count in zip(stages, filtered_counts):
+        ruled_out_count = ruled_out_counts.get(stage.name)
+        if ruled_out_count is None:
+            read_steps.append((stage, filtered_count))
+        else:
+            ruled_out_steps.append((stage, ruled_out_count + filtered_count))
+            count += ruled_out_count
+    steps = ruled_out_steps + read_steps
+    return (
+        [stage for stage, _ in steps],
+        count,
+        [filtered_count for _, filtered_count in steps])
+
+
+def _write_plan(stages, count, filtered_counts):
+    '''
+    Write a table of `stages` in the order they ran, with their
+    estimates and how many transactions went into and came out of
+    each.
+    '''
+
+    steps = []
+    for stage, filtered_count in zip(stages, filtered_counts):
+        steps.append((stage, count, count - filtered_count))
+        count -= filtered_count
+
+    def estimate_token(value, pattern):
+        if value is None:
+            return '-'
+        return pattern % value
+
+    console_table = formatting.ConsoleTable()
+    console_table.create_column(
+        'STAGE', [stage.name for stage, _, _ in steps], alignment='left')
+    console_table.create_column(
+        'COST', [
+            estimate_token(
+                None if stage.cost is None else stage.cost * 1e6,
+                '%.2f us')
+            for stage, _, _ in steps
+        ])
+    console_table.create_column(
+        'PASS', [
+            estimate_token(
+                None if stage.pass_rate is None else stage.pass_rate * 100,
+                '%.0f%%')
+            for stage, _, _ in steps
+        ])
+    console_table.create_column(
+        'IN', [str(in_count) for _, in_count, _ in steps])
+    console_table.create_column(
+        'OUT', [str(out_count) for _, _, out_count in steps])
+    sys.stdout.write('Filter plan:\n')
+    if len(steps) > 0:
+        console_table.write(sys.stdout)
+
+
+def _filter_table(
+        table, options, date_sequence, messages=None, ruled_out_counts=None):
+    '''
+    Return the rows of `table` that satisfy `options` and
+    `date_sequence`, reporting how many each criterion filtered,
+    including the transactions in `ruled_out_counts` that never made
+    it into the table.
+    '''
+
+    rows = table.rows()
+
+    def report(message, filtered_rows, name):
+        filtered_count = len(rows) - len(filtered_rows)
+        if ruled_out_counts is not None:
+            filtered_count += ruled_out_counts.get(name, 0)
+        _write_messages([message % filtered_count], messages)
+
+    if not date_sequence.is_empty:
+        rows = table.select_dates(rows, date_sequence)
+
+    if hasattr(options, 'include_regexs') and len(options.include_regexs) > 0:
+        filtered_rows = table.select_descriptions(
+            rows, _DescriptionMatcher(options.include_regexs))
+        report(
+            'Filtered %d transaction(s) for not matching include regex.\n',
+            filtered_rows,
+            'include')
+        rows = filtered_rows
+
+    if hasattr(options, 'exclude_regexs') and len(options.exclude_regexs) > 0:
+        matches_exclude_regex = _DescriptionMatcher(options.exclude_regexs)
+        filtered_rows = table.select_descriptions(
+            rows, lambda s: not matches_exclude_regex(s))
+        report(
+            'Filtered %d transaction(s) for matching exclude regex.\n',
+            filtered_rows,
+            'exclude')
+        rows = filtered_rows
+
+    if hasattr(options, 'no_tags') and options.no_tags:
+        filtered_rows = table.select_untagged(rows)
+        report(
+            'Filtered %d transaction(s) for not having tags.\n',
+            filtered_rows,
+            'no-tags')
+        rows = filtered_rows
+
+    tag_queries = _tag_queries(options)
+    if len(tag_queries) > 0:
+        filtered_rows = table.select_tags(
+            rows,
+            lambda tags: all(tag_query(tags) for tag_query in tag_queries))
+        report(
+            'Filtered %d transaction(s) for not matching tag query.\n',
+            filtered_rows,
+            'tag')
+        rows = filtered_rows
+
+    amount_ranges = _amount_ranges(options)
+    if amount_ranges is not None:
+        filtered_rows = table.select_amounts(rows, amount_ranges)
+        report(
+            'Filtered %d transaction(s) for amount out of range.\n',
+            filtered_rows,
+            'amount')
+        rows = filtered_rows
+
+    return rows
+
+
+def _slice_transactions_with_matching_dates(xactions, date_sequence):
+    '''
+    Return the transactions in `date_sequence` from the list
+    `xactions`, which is sorted by date, most recent first.
+    '''
+
+    filtered_xactions = []
+    for first, last in reversed(date_sequence.ordinal_intervals()):
+        filtered_xactions.extend(xactions[
+            _index_of_first_dated_before(xactions, last + 1):
+            _index_of_first_dated_before(xactions, first)])
     return filtered_xactions
 
 
-def _any_regex_matches(regexs, s):
-    for regex in regexs:
-        if re.search(regex, s, re.IGNORECASE) is not None:
+def _index_of_first_dated_before(xactions, ordinal):
+    '''
+    Return the index of the first transaction in the list `xactions`,
+    sorted by date, most recent first, whose date ordinal is less than
+    `ordinal`.  Undated transactions count as dated before any date.
+    '''
+
+    low = 0
+    high = len(xactions)
+    while low < high:
+        middle = (low + high) // 2
+        if _date_ordinal(xactions[middle]) >= ordinal:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def _date_ordinal(x):
+    if x.date is None:
+        return 0
+    return x.date.toordinal()
+
+
+class _DescriptionMatcher(object):
+    '''
+    Tells whether a description matches any of several regexs,
+    ignoring case
+
+    Regexs and descriptions are matched as ``unicode``, decoding UTF-8
+    as the command line gives it, and case is ignored in Unicode.
+    Regexs without special characters are searched for as lowercase
+    substrings.  The rest are compiled once into a single alternation
+    so that a description is scanned once for all of them, save those
+    with backreferences, which alternation would renumber, named
+    groups, whose names may clash, or inline flags, which would apply
+    to every alternative.  The answer for each distinct description is
+    remembered.
+    '''
+
+    def __init__(self, regexs):
+        self.regexs = regexs
+        self.literals = []
+        alternatives = []
+        self.separate_regexs = []
+        for regex in regexs:
+            regex = _as_unicode(regex)
+            if _regex_special_characters.search(regex) is None:
+                self.literals.append(regex.lower())
+            elif _regex_uncombinable.search(regex) is not None:
+                self.separate_regexs.append(re.compile(regex, _regex_flags))
+            else:
+                alternatives.append(regex)
+
+        self.combined_regex = None
+        if len(alternatives) > 0:
+            try:
+                self.combined_regex = re.compile(
+                    u'|'.join([u'(?:%s)' % regex for regex in alternatives]),
+                    _regex_flags)
+            except re.error:
+                # Whatever else keeps them apart, they still work alone.
+                self.separate_regexs.extend([
+                    re.compile(regex, _regex_flags)
+                    for regex in alternatives
+                ])
+        self._matches_by_description = {}
+
+    def __call__(self, description):
+        matches = self._matches_by_description.get(description)
+        if matches is None:
+            matches = self._matches_by_description[description] = (
+                self._match(description))
+        return matches
+
+    def _match(self, description):
+        if description is None:
+            return False
+        description = _as_unicode(description)
+        if len(self.literals) > 0:
+            lower_description = description.lower()
+            for literal in self.literals:
+                if literal in lower_description:
+                    return True
+        if (self.combined_regex is not None and
+                self.combined_regex.search(description) is not None):
             return True
-    return False
+        for regex in self.separate_regexs:
+            if regex.search(description) is not None:
+                return True
+        return False
 
 
-def _filter_transactions_without_tags(xactions):
-    filtered_xactions = [
-        x for x in xactions
-        if len(x.tags) == 0
-    ]
-    sys.stdout.write(
-        'Filtered %d transaction(s) for not having tags.\n' % (
-            len(xactions) - len(filtered_xactions)))
-    return filtered_xactions
+def _as_unicode(s):
+    if isinstance(s, unicode):
+        return s
+    return s.decode('utf-8', 'replace')
+
+
+_regex_flags = re.IGNORECASE | re.UNICODE
+
+_regex_special_characters = re.compile(r'[.^$*+?{}\[\]\\|()]')
+
+# Backreferences, named groups and inline flags
+_regex_uncombinable = re.compile(r'\\[1-9]|\(\?P[=<]|\(\?[iLmsux]+\)')
@@ -1,38 +1,472 @@
 #!/usr/bin/env python
 '''
 For importing account activity
+
+* :func:`parse_file`
+* :func:`iterate_file`
+* :func:`iterate_activity_files`
+* :class:`RowErrors`
+* :func:`parse_files`
+* :class:`ParsedFile`
+* :func:`merge`
+:func:`store_new`
+* :func:`register_format`
 '''
 
 # Standard imports:
+import collections
+import contextlib
+import csv
 import datetime
+import gzip
+import itertools
+import multiprocessing
 import sys
+import tarfile
 import traceback
+import zipfile
 
 # Project imports:
+import contentindexing
 import transactions
 
 
 def parse_file(path):
     '''
-    Parse the account-activity file at `path`.
+    Parse the account-activity file at `path`, or every one in the
+    bundle at `path` (see :func:`iterate_activity_files`), reporting
+    any rows that cannot be parsed to ``stderr`` in one summary per
+    file.
     '''
 
-    transactions = []
+    xactions = []
+    for name, activity_file in iterate_activity_files(path):
+        row_errors = RowErrors(name)
+        xactions.extend(_iterate_rows(activity_file, row_errors))
+        if len(row_errors) > 0:
+            sys.stderr.write(row_errors.summary())
+    return xactions
 
-    with open(path, 'r') as activity_file:
-        line = activity_file.readline()
-        transaction_key = _parse_key_line(line)
-        for line in activity_file.readlines():
-            try:
-                transaction = _parse_line(transaction_key, line)
-            except Exception:
-                traceback.print_exc()
-                continue
 
-            if transaction.type not in ('payment', 'acct_xfer'):
-                transactions.append(transaction)
+def iterate_file(path, row_errors=None):
+    '''
+    Yield each transaction in the account-activity file at `path`,
+    which may be compressed with gzip, as its row is read.
+
+    Rows that cannot be parsed are skipped and recorded in
+    `row_errors`, a :class:`RowErrors`, if given.  Payments and
+    account transfers are skipped too.
+    '''
+
+    with _open_activity_file(path) as activity_file:
+        for x in _iterate_rows(activity_file, row_errors):
+            yield x
+
+
+def iterate_activity_files(path):
+    '''
+    Yield the name and an open file of each account-activity file in
+    the file at `path`.
+
+    That is each ``.csv`` member of a ``.zip``, ``.tar.gz`` or ``.tgz``
+    archive, named ``ARCHIVE:MEMBER``, or else the file itself, which
+    may be compressed with gzip.  Each member is decompressed as it is
+    read, never extracted, and is closed once the next is asked for.
+    '''
+
+    lower_path = path.lower()
+    if lower_path.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            for member_name in _zip_member_names(archive):
+                with contextlib.closing(archive.open(member_name)) as member:
+                    yield _member_path(path, member_name), member
+    elif lower_path.endswith(_tar_extensions):
+        with tarfile.open(path, 'r|gz') as archive:
+            for member in archive:
+                if not member.isfile() or not _is_csv_name(member.name):
+                    continue
+                member_file = archive.extractfile(member)
+                with contextlib.closing(member_file):
+                    yield _member_path(path, member.name), member_file
+    else:
+        with _open_activity_file(path) as activity_file:
+            yield path, activity_file
+
+
+_tar_extensions = ('.tar.gz', '.tgz')
+
+
+def _open_activity_file(path):
+    if path.lower().endswith('.gz'):
+        return contextlib.closing(gzip.GzipFile(path, 'rb'))
+    return open(path, 'rb')
+
+
+def _zip_member_names(archive):
+    return [
+        member_name
+        for member_name in archive.namelist()
+        if _is_csv_name(member_name)
+    ]
+
+
+def _is_csv_name(name):
+    return name.lower().endswith('.csv')
+
+
+def _member_path(path, member_name):
+    return '%s:%s' % (path, member_name)
+
+
+def _iterate_rows(activity_file, row_errors=None):
+    '''
+    Yield each transaction in the open account-activity file
+    `activity_file` as its row is read.
+    '''
+
+    rows = _numbered_rows(csv.reader(activity_file))
+    transaction_key = _parse_key_tokens(next(rows, (0, []))[1])
+    first_rows = list(itertools.islice(rows, _date_format_sample_size))
+    parse_row = _create_row_parser(
+        transaction_key,
+        _detect_date_parser(
+            transaction_key, [tokens for _, tokens in first_rows]))
+    column_count = transaction_key.column_count
+    for line_number, tokens in itertools.chain(first_rows, rows):
+        if len(tokens) == 0:
+            continue
+        # Only a row wider than the key can have an unquoted comma.
+        if len(tokens) > column_count:
+            tokens = _join_unquoted_commas(tokens)
+        try:
+            transaction = parse_row(tokens)
+        except Exception:
+            if row_errors is not None:
+                row_errors.add(line_number, *sys.exc_info()[:2])
+            continue
+
+        if transaction.type not in ('payment', 'acct_xfer'):
+            yield transaction
+
+
+def _numbered_rows(reader):
+    '''
+    Yield the number of the line each row of `reader` ends on and the
+    row.
+    '''
+
+    for tokens in reader:
+        yield reader.line_num, tokens
+
+
+class RowErrors(object):
+    '''
+    The rows of one account-activity file that could not be parsed
+    '''
+
+    # The most line numbers to list for any one error.
+    max_line_numbers = 5
+
+    def __init__(self, path):
+        self.path = path
+        self.line_numbers_by_message = collections.OrderedDict()
+
+    def __len__(self):
+        return sum([
+            len(line_numbers)
+            for line_numbers in self.line_numbers_by_message.itervalues()
+        ])
+
+    def add(self, line_number, exception_type, exception):
+        '''
+        Record that the row ending on `line_number` raised `exception`.
+        '''
+
+        message = ''.join(traceback.format_exception_only(
+            exception_type, exception)).strip()
+        self.line_numbers_by_message.setdefault(message, []).append(
+            line_number)
+
+    def summary(self):
+        '''
+        Return a report of the errors, one line per distinct message
+        with the first few lines it occurred on.
+        '''
+
+        lines = ['Skipped %d rows of "%s":\n' % (len(self), self.path)]
+        for message, line_numbers in self.line_numbers_by_message.items():
+            listed = ', '.join([
+                str(line_number)
+                for line_number in line_numbers[:self.max_line_numbers]
+            ])
+            unlisted_count = len(line_numbers) - self.max_line_numbers
+            if unlisted_count > 0:
+                listed += ' and %d more' % unlisted_count
+            lines.append('    %s (line %s)\n' % (message, listed))
+        return ''.join(lines)
+
+
+def parse_files(paths, process_count=None):
+    '''
+    Parse the account-activity files at `paths` in up to
+    `process_count` processes (by default, one per core) and return a
+    :class:`ParsedFile` for each, in the order of `paths`.
+
+    A bundle of files (see :func:`iterate_activity_files`) gives a
+    :class:`ParsedFile` for each file in it.  The members of a ``.zip``
+    archive are parsed in parallel, those of a ``.tar.gz`` archive one
+    after another as it is decompressed.
+
+    A file that cannot be parsed does not stop the others.
+    '''
+
+    sources = []
+    for path in paths:
+        sources.extend(_sources(path))
+
+    if process_count is None:
+        process_count = multiprocessing.cpu_count()
+    process_count = min(process_count, len(sources))
+    if process_count <= 1:
+        parsed_file_lists = [_parse_source(source) for source in sources]
+    else:
+        with contextlib.closing(multiprocessing.Pool(process_count)) as pool:
+            parsed_file_lists = pool.map(_parse_source, sources, chunksize=1)
+
+    return [
+        parsed_file
+        for parsed_files in parsed_file_lists
+        for parsed_file in parsed_files
+    ]
+
+
+class ParsedFile(object):
+    '''
+    The outcome of parsing one account-activity file: its
+    ``xactions`` and ``row_errors``, or the ``error`` that prevented
+    parsing it
+
+    ``input_path`` is the path given to :func:`parse_files`, which is
+    the path of the archive the file came from, if any.
+    '''
+
+    def __init__(self, path, xactions=None, row_errors=None, error=None):
+        self.path = path
+        self.input_path = path
+        self.xactions = [] if xactions is None else xactions
+        self.row_errors = RowErrors(path) if row_errors is None else row_errors
+        self.error = error
+
+
+def _sources(path):
+    '''
+    Return the ``(path, member_name)`` of each unit of parsing in the
+    file at `path`: each member of a ``.zip`` archive, or else the
+    whole file with a `member_name` of ``None``.
+    '''
+
+    if not path.lower().endswith('.zip'):
+        return [(path, None)]
+    try:
+        with zipfile.ZipFile(path) as archive:
+            return [
+                (path, member_name)
+                for member_name in _zip_member_names(archive)
+            ]
+    except Exception:
+        # Let parsing report the error.
+        return [(path, None)]
+
+
+def _parse_source(source):
+    '''
+    Return a :class:`ParsedFile` for each account-activity file in
+    `source`, a ``(path, member_name)`` of :func:`_sources`.
+    '''
+
+    path, member_name = source
+    parsed_files = []
+    if member_name is not None:
+        name = _member_path(path, member_name)
+        try:
+            with zipfile.ZipFile(path) as archive:
+                with contextlib.closing(archive.open(member_name)) as member:
+                    parsed_files.append(_parse_activity_file(name, member))
+        except Exception:
+            parsed_files.append(ParsedFile(name, error=_format_exception()))
+    else:
+        try:
+            for name, activity_file in iterate_activity_files(path):
+                parsed_files.append(_parse_activity_file(name, activity_file))
+        except Exception:
+            parsed_files.append(ParsedFile(path, error=_format_exception()))
 
-    return transactions
+    for parsed_file in parsed_files:
+        parsed_file.input_path = path
+    return parsed_files
+
+
+def _parse_activity_file(name, activity_file):
+    row_errors = RowErrors(name)
+    try:
+        return ParsedFile(
+            name,
+            xactions=list(_iterate_rows(activity_file, row_errors)),
+            row_errors=row_errors)
+    except Exception:
+        return ParsedFile(name, error=_format_exception())
+
+
+def _format_exception():
+    '''
+    Return the one-line description of the exception being handled.
+    '''
+
+    exception_type, exception = sys.exc_info()[:2]
+    return ''.join(traceback.format_exception_only(
+        exception_type, exception)).strip()
+
+
+def merge(xactions, imported_xaction_lists):
+    '''
+    Merge each list in `imported_xaction_lists`, the transactions
+    parsed from one account-activity file, into `xactions` and return
+    the transactions that were new.
+
+    `xactions` must be sorted most recent first and stays that way.  An
+    imported transaction is already present when `xactions` has one
+    with the same :func:`contentindexing.content_key`: the same date,
+    amount, description and type, whatever its tags.  Identical
+    transactions within one file are each new unless `xactions`
+    already has as many of them.
+    '''
+
+    counts_by_key = collections.defaultdict(int)
+    for x in xactions:
+        counts_by_key[contentindexing.content_key(x)] += 1
+
+    new_xactions = _new_xactions(
+        lambda key: counts_by_key.get(key, 0), imported_xaction_lists)
+    xactions[:] = _merge_sorted(xactions, new_xactions)
+    return new_xactions
+
+
+def store_new(imported_xaction_lists):
+    '''
+    Add the transactions in `imported_xaction_lists` that are new to the
+    database, as :func:`merge` judges them, and return them.
+
+    With a current content index, only the imported transactions are
+    looked up and the new ones are added through the journal, so the
+    cost follows the number imported rather than the size of the
+    database.  Otherwise the database is loaded, merged and stored.
+    '''
+
+    count_present = transactions.content_counter()
+    if count_present is None:
+        xactions = transactions.load()
+        new_xactions = merge(xactions, imported_xaction_lists)
+        transactions.store(xactions)
+        return new_xactions
+
+    new_xactions = _new_xactions(count_present, imported_xaction_lists)
+    transactions.add(new_xactions)
+    return new_xactions
+
+
+def _new_xactions(count_present, imported_xaction_lists):
+    '''
+    Return the transactions in `imported_xaction_lists` that are new,
+    where `count_present` counts the transactions already present with
+    a content key.
+    '''
+
+    # The new transactions of the files before, by content key
+    added_counts_by_key = collections.defaultdict(int)
+    new_xactions = []
+    for imported_xactions in imported_xaction_lists:
+        imported_counts_by_key = collections.defaultdict(int)
+        new_keys = []
+        for x in imported_xactions:
+            key = contentindexing.content_key(x)
+            imported_counts_by_key[key] += 1
+            if (imported_counts_by_key[key] >
+                    count_present(key) + added_counts_by_key[key]):
+                new_xactions.append(x)
+                new_keys.append(key)
+        for key in new_keys:
+            added_counts_by_key[key] += 1
+    return new_xactions
+
+
+def _merge_sorted(xactions, new_xactions):
+    '''
+    Return `xactions`, which are sorted most recent first, with
+    `new_xactions` inserted in the same order after any existing
+    transactions of the same date.
+    '''
+
+    new_xactions = sorted(new_xactions, key=_date_key, reverse=True)
+    merged_xactions = []
+    index = 0
+    for new_x in new_xactions:
+        new_date_key = _date_key(new_x)
+        while (index < len(xactions) and
+               _date_key(xactions[index]) >= new_date_key):
+            merged_xactions.append(xactions[index])
+            index += 1
+        merged_xactions.append(new_x)
+    merged_xactions.extend(xactions[index:])
+    return merged_xactions
+
+
+def _date_key(x):
+    '''
+    Return the ordinal of the date of `x`, or zero if it has none so
+    that undated transactions sort last.
+    '''
+
+    if x.date is None:
+        return 0
+    return x.date.toordinal()
+
+
+def register_format(name, column_fields):
+    '''
+    Register the account-activity format called `name`, whose header
+    names the columns in `column_fields`: a mapping of each column's
+    name (in any case) onto the field of
+    :class:`transactions.Transaction` it holds: ``'type'``,
+    ``'trans_date'``, ``'post_date'``, ``'description'``, ``'amount'``
+    or ``None``.
+
+    A file is of the registered format with the most columns that its
+    header names.
+    '''
+
+    _formats.append((
+        name,
+        {
+            column.lower(): field
+            for column, field in column_fields.iteritems()
+        }))
+    _formats.sort(key=lambda format_: len(format_[1]), reverse=True)
+
+
+_formats = []
+
+# The fields of the columns a file of no registered format may have.
+_generic_column_fields = {
+    'type': 'type',
+    'trans date': 'trans_date',
+    'post date': 'post_date',
+    'posting date': 'post_date',
+    'description': 'description',
+    'amount': 'amount',
+}
+
+# The number of rows that settle the date format of a file.
+_date_format_sample_size = 10
 
 
 def _parse_key_line(line):
@@ -40,78 +474,147 @@ def _parse_key_line(line):
     Parse the `line` that explains the content of the various columns.
     '''
 
+    return _parse_key_tokens(next(csv.reader([line]), []))
+
+
+def _parse_key_tokens(tokens):
+    columns = [token.strip().lower() for token in tokens]
+
+    format_name, column_fields = None, _generic_column_fields
+    for registered_name, registered_column_fields in _formats:
+        if set(registered_column_fields).issubset(columns):
+            format_name, column_fields = (
+                registered_name, registered_column_fields)
+            break
+
     transaction_key = _TransactionKey()
-    tokens = line.strip().split(',')
-    for index, token in enumerate(tokens):
-        if token.lower() in ('posting date', 'post date'):
-            transaction_key.post_date = index
-        elif token.lower() == 'description':
-            transaction_key.description = index
-        elif token.lower() == 'amount':
-            transaction_key.amount = index
-        elif token.lower() == 'type':
-            transaction_key.type = index
-        elif token.lower() == 'trans date':
-            transaction_key.trans_date = index
+    transaction_key.format_name = format_name
+    transaction_key.column_count = len(tokens)
+    for index, column in enumerate(columns):
+        field = column_fields.get(column)
+        if field is not None:
+            setattr(transaction_key, field, index)
     return transaction_key
 
 
 class _TransactionKey(object):
+    '''
+    The column of each field in the rows of one file
+    '''
 
     def __init__(self):
+        self.format_name = None
         self.type = None
         self.trans_date = None
         self.post_date = None
         self.description = None
         self.amount = None
+        self.column_count = 0
 
 
-def _parse_line(key, line):
+def _create_row_parser(key, parse_date):
     '''
-    Parse a single `line` of account activity.
+    Return a function that parses the tokens of one row laid out as
+    `key` says into a :class:`transactions.Transaction`, parsing dates
+    with `parse_date`.
+
+    Which columns `key` has is settled here, once, so the function just
+    converts the token of each column it has.  It parses each distinct
+    date once.
     '''
 
-    transaction = transactions.Transaction()
+    dates = {}
 
-    tokens = _split_transaction_line(line)
-    if key.type is not None:
-        transaction.type = _parse_transaction_type(tokens[key.type])
-    if key.trans_date is not None:
-        transaction.trans_date = _parse_transaction_date(tokens[key.trans_date])
-    if key.post_date is not None:
-        transaction.post_date = _parse_transaction_date(tokens[key.post_date])
-    if key.description is not None:
-        transaction.description = tokens[key.description]
-    if key.amount is not None:
-        transaction.amount = float(tokens[key.amount])
+    def parse_cached_date(s):
+        date = dates.get(s)
+        if date is None:
+            date = dates[s] = parse_date(s)
+        return date
 
-    return transaction
+    # The argument of Transaction.from_fields, the column and the
+    # conversion of each field that `key` has a column for
+    field_parsers = [
+        (argument, column, convert)
+        for argument, column, convert in [
+            (0, key.type, lambda token: token.lower()),
+            (1, key.trans_date, parse_cached_date),
+            (2, key.post_date, parse_cached_date),
+            (3, key.description, lambda token: token),
+            (4, key.amount, float),
+        ]
+        if column is not None
+    ]
 
+    def parse_row(tokens):
+        fields = [None, None, None, None, None]
+        for argument, column, convert in field_parsers:
+            fields[argument] = convert(tokens[column])
+        return transactions.Transaction.from_fields(*fields)
 
-def _split_transaction_line(line):
-    maybe_tokens = line.strip().split(',')
+    return parse_row
 
-    tokens = []
-    for maybeToken in maybe_tokens:
-        if maybeToken.startswith(' ') and (len(maybeToken) > 1):
-            tokens[-1] = tokens[-1] + ',' + maybeToken
-        else:
-            tokens.append(maybeToken)
-    return tokens
 
+def _detect_date_parser(key, rows):
+    '''
+    Return the function that parses the dates of `rows`, laid out as
+    `key` says, judging by the first date among them.
+    '''
 
-def _parse_transaction_type(s):
-    return s.lower()
+    for tokens in rows:
+        for column in (key.trans_date, key.post_date):
+            if column is None or column >= len(tokens):
+                continue
+            if '-' in tokens[column]:
+                return _parse_dashed_date
+            if '/' in tokens[column]:
+                return _parse_slashed_date
+    return _parse_slashed_date
 
 
-def _parse_transaction_date(s):
-    try:
-        month, day, year = s.split('/')
-    except ValueError:
-        year, month, day = s.split('-')
+def _parse_slashed_date(s):
+    month, day, year = s.split('/')
     return datetime.date(int(year), int(month), int(day))
 
 
+def _parse_dashed_date(s):
+    year, month, day = s.split('-')
+    return datetime.date(int(year), int(month), int(day))
+
+
+def _join_unquoted_commas(tokens):
+    '''
+    Rejoin the `tokens` split at an unquoted comma followed by a space,
+    which some banks leave in descriptions (``THRIFT BOOKS GLOBAL,
+    LLC``).
+    '''
+
+    joined_tokens = []
+    for token in tokens:
+        if token.startswith(' ') and len(token) > 1 and joined_tokens:
+            joined_tokens[-1] = joined_tokens[-1] + ',' + token
+        else:
+            joined_tokens.append(token)
+    return joined_tokens
+
+
+register_format('Chase credit card', {
+    'Type': 'type',
+    'Trans Date': 'trans_date',
+    'Post Date': 'post_date',
+    'Description': 'description',
+    'Amount': 'amount',
+})
+
+register_format('Chase checking', {
+    'Details': None,
+    'Posting Date': 'post_date',
+    'Description': 'description',
+    'Amount': 'amount',
+    'Type': 'type',
+    'Balance': None,
+})
+
+
 def main():
     transactions = []
     for arg in sys.argv[1:]:
@@ -0,0 +1,343 @@
+'''
+An inverted index of the descriptions in the transaction database
+
+The index mirrors the database file as a snapshot does.  It lists each
+distinct description once with the rows that have it, and maps each
+trigram of the lowercase descriptions onto the descriptions that
+contain it.  A regex search then runs only on the descriptions that
+contain every trigram of the literals the regex requires.
+
+* :func:`write`
+* :func:`is_current`
+* :func:`matching_rows`
+* :func:`required_literals`
+'''
+
+# Standard imports:
+import array
+import bisect
+import collections
+import contextlib
+import mmap
+import os
+import sre_constants
+import sre_parse
+import struct
+import zlib
+
+
+_magic = 'PECIDX01'
+
+# magic, source mtime, source size, description count, row posting count,
+# trigram count, description posting count
+_header = struct.Struct('<8sdQIIII')
+
+# string offset, string length, first row posting, row posting count
+_description = struct.Struct('<IIII')
+
+# trigram hash, first description posting, description posting count
+_trigram = struct.Struct('<III')
+
+_posting = struct.Struct('<I')
+
+# Literals shorter than a trigram narrow nothing.
+_trigram_length = 3
+
+
+def write(path, xactions, source_path):
+    '''
+    Write an index of the descriptions of `xactions` to `path`, where
+    `xactions` are in the same order as in the database file at
+    `source_path`.
+    '''
+
+    rows_by_description = collections.OrderedDict()
+    for row, x in enumerate(xactions):
+        if x.description is not None:
+            rows_by_description.setdefault(x.description, []).append(row)
+
+    description_ids_by_hash = collections.defaultdict(list)
+    for description_id, description in enumerate(rows_by_description):
+        for trigram_hash in sorted(_trigram_hashes(description)):
+            description_ids_by_hash[trigram_hash].append(description_id)
+
+    descriptions = []
+    row_postings = array.array('I')
+    encoded_descriptions = []
+    string_offset = 0
+    for description, rows in rows_by_description.iteritems():
+        if isinstance(description, unicode):
+            description = description.encode('utf-8')
+        descriptions.append(_description.pack(
+            string_offset, len(description), len(row_postings), len(rows)))
+        encoded_descriptions.append(description)
+        string_offset += len(description)
+        row_postings.extend(rows)
+
+    trigrams = []
+    description_postings = array.array('I')
+    for trigram_hash in sorted(description_ids_by_hash):
+        description_ids = description_ids_by_hash[trigram_hash]
+        trigrams.append(_trigram.pack(
+            trigram_hash, len(description_postings), len(description_ids)))
+        description_postings.extend(description_ids)
+
+    source_stat = os.stat(source_path)
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'wb') as index_file:
+        index_file.write(_header.pack(
+            _magic,
+            source_stat.st_mtime,
+            source_stat.st_size,
+            len(descriptions),
+            len(row_postings),
+            len(trigrams),
+            len(description_postings)))
+        index_file.write(''.join(descriptions))
+        index_file.write(_as_little_endian(row_postings).tostring())
+        index_file.write(''.join(trigrams))
+        index_file.write(_as_little_endian(description_postings).tostring())
+        index_file.write(''.join(encoded_descriptions))
+    os.rename(temporary_path, path)
+
+
+def is_current(path, source_path):
+    '''
+    Return ``True`` if the index at `path` mirrors the database file at
+    `source_path` as it is now.
+    '''
+
+    if not os.path.exists(path) or not os.path.exists(source_path):
+        return False
+    with open(path, 'rb') as index_file:
+        header = index_file.read(_header.size)
+    if len(header) != _header.size:
+        return False
+    magic, source_mtime, source_size = _header.unpack(header)[:3]
+    source_stat = os.stat(source_path)
+    return (
+        magic == _magic and
+        source_mtime == source_stat.st_mtime and
+        source_size == source_stat.st_size)
+
+
+def matching_rows(path, description_matcher):
+    '''
+    Return the sorted rows of the index at `path` whose description
+    satisfies `description_matcher`, a callable that tells whether a
+    description matches any of its ``regexs``.
+
+    Only the descriptions that may match, judging by the trigrams of
+    the literals each regex requires, are passed to
+    `description_matcher`.
+    '''
+
+    with open(path, 'rb') as index_file:
+        with contextlib.closing(mmap.mmap(
+                index_file.fileno(), 0, access=mmap.ACCESS_READ)) as data:
+            reader = _Reader(data)
+            description_ids = set()
+            for regex in description_matcher.regexs:
+                regex_description_ids = reader.candidates(regex)
+                if regex_description_ids is None:
+                    description_ids = xrange(reader.description_count)
+                    break
+                description_ids.update(regex_description_ids)
+
+            rows = []
+            for description_id in description_ids:
+                if description_matcher(reader.description(description_id)):
+                    rows.extend(reader.rows(description_id))
+    rows.sort()
+    return rows
+
+
+def required_literals(regex):
+    '''
+    Return the literals that any string `regex` matches must contain,
+    as a list of alternatives, each a list of literals that must all
+    be present.  An alternative that requires nothing is an empty list.
+    '''
+
+    try:
+        if not isinstance(regex, unicode):
+            regex = regex.decode('utf-8')
+        parsed = sre_parse.parse(regex)
+    except (UnicodeDecodeError, sre_constants.error):
+        return [[]]
+    return _required_literals(parsed)
+
+
+def _required_literals(subpattern):
+    items = list(subpattern)
+    if len(items) == 1 and items[0][0] == sre_constants.BRANCH:
+        alternatives = []
+        for branch in items[0][1][1]:
+            alternatives.extend(_required_literals(branch))
+        return alternatives
+
+    literals = []
+    run = []
+    for op, av in items:
+        if op == sre_constants.LITERAL:
+            run.append(unichr(av))
+            continue
+
+        if len(run) > 0:
+            literals.append(u''.join(run))
+            run = []
+        if op == sre_constants.SUBPATTERN:
+            literals.extend(_sole_alternative(av[1]))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            minimum, _, repeated = av
+            if minimum > 0:
+                literals.extend(_sole_alternative(repeated))
+    if len(run) > 0:
+        literals.append(u''.join(run))
+    return [literals]
+
+
+def _sole_alternative(subpattern):
+    '''
+    Return the literals that `subpattern` requires if it has only one
+    alternative, otherwise none.
+    '''
+
+    alternatives = _required_literals(subpattern)
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return []
+
+
+def _trigram_hashes(s):
+    '''
+    Return the hashes of the trigrams of `s` ignoring case.
+    '''
+
+    if not isinstance(s, unicode):
+        s = s.decode('utf-8', 'replace')
+    s = s.lower()
+    return set([
+        _trigram_hash(s[index:index + _trigram_length])
+        for index in xrange(len(s) - _trigram_length + 1)
+    ])
+
+
+def _trigram_hash(trigram):
+    return zlib.crc32(trigram.encode('utf-8')) & 0xffffffff
+
+
+def _as_little_endian(postings):
+    if struct.pack('=I', 1) != struct.pack('<I', 1):
+        postings = array.array('I', postings)
+        postings.byteswap()
+    return postings
+
+
+class _Reader(object):
+    '''
+    Looks up descriptions and trigrams in a memory-mapped index
+    '''
+
+    def __init__(self, data):
+        self.data = data
+        (
+            _, _, _,
+            self.description_count,
+            self.row_posting_count,
+            self.trigram_count,
+            self.description_posting_count,
+        ) = _header.unpack_from(data, 0)
+        self.descriptions_offset = _header.size
+        self.row_postings_offset = (
+            self.descriptions_offset +
+            self.description_count * _description.size)
+        self.trigrams_offset = (
+            self.row_postings_offset +
+            self.row_posting_count * _posting.size)
+        self.description_postings_offset = (
+            self.trigrams_offset + self.trigram_count * _trigram.size)
+        self.strings_offset = (
+            self.description_postings_offset +
+            self.description_posting_count * _posting.size)
+        self.trigram_hashes = _TrigramHashes(self)
+
+    def description(self, description_id):
+        string_offset, string_length = _description.unpack_from(
+            self.data,
+            self.descriptions_offset + description_id * _description.size)[:2]
+        start = self.strings_offset + string_offset
+        return self.data[start:start + string_length].decode('utf-8')
+
+    def rows(self, description_id):
+        first, count = _description.unpack_from(
+            self.data,
+            self.descriptions_offset +
+            description_id * _description.size)[2:]
+        return self._postings(self.row_postings_offset, first, count)
+
+    def candidates(self, regex):
+        '''
+        Return the set of ids of the descriptions that `regex` may
+        match, or ``None`` if it may match any.
+        '''
+
+        description_ids = set()
+        for literals in required_literals(regex):
+            trigram_hashes = set()
+            for literal in literals:
+                trigram_hashes.update(_trigram_hashes(literal))
+            if len(trigram_hashes) == 0:
+                return None
+            description_ids.update(self._containing_all(trigram_hashes))
+        return description_ids
+
+    def _containing_all(self, trigram_hashes):
+        '''
+        Return the set of ids of the descriptions that contain every
+        trigram in `trigram_hashes`.
+        '''
+
+        postings = []
+        for trigram_hash in trigram_hashes:
+            index = bisect.bisect_left(self.trigram_hashes, trigram_hash)
+            if (index == self.trigram_count or
+                    self.trigram_hashes[index] != trigram_hash):
+                return set()
+            first, count = _trigram.unpack_from(
+                self.data, self.trigrams_offset + index * _trigram.size)[1:]
+            postings.append((count, first))
+
+        # Intersect the shortest first.
+        postings.sort()
+        count, first = postings[0]
+        description_ids = set(self._postings(
+            self.description_postings_offset, first, count))
+        for count, first in postings[1:]:
+            description_ids.intersection_update(self._postings(
+                self.description_postings_offset, first, count))
+        return description_ids
+
+    def _postings(self, offset, first, count):
+        start = offset + first * _posting.size
+        postings = array.array('I')
+        postings.fromstring(self.data[start:start + count * _posting.size])
+        return _as_little_endian(postings)
+
+
+class _TrigramHashes(object):
+    '''
+    The sorted trigram hashes of an index as a sequence that
+    :func:`bisect.bisect_left` can search without reading them all
+    '''
+
+    def __init__(self, reader):
+        self.reader = reader
+
+    def __len__(self):
+        return self.reader.trigram_count
+
+    def __getitem__(self, index):
+        return _trigram.unpack_from(
+            self.reader.data,
+            self.reader.trigrams_offset + index * _trigram.size)[0]
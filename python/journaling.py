@@ -0,0 +1,104 @@
+'''
+An append-only journal of edits to the transaction database
+
+* :class:`Journal`
+* :class:`JournalError`
+'''
+
+# Standard imports:
+import json
+import os
+
+
+class Journal(object):
+    '''
+    A file of JSON records, one per line, that only ever grows until
+    it is cleared
+    '''
+
+    def __init__(self, path):
+        self.path = path
+
+    @property
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def append(self, records):
+        '''
+        Append each of `records` to the end of the journal, first
+        discarding the torn final record an interrupted :meth:`append`
+        may have left, lest the first of `records` run on from it.
+        '''
+
+        if self.exists:
+            with open(self.path, 'r+b') as journal_file:
+                _discard_torn_record(journal_file)
+        with open(self.path, 'a') as journal_file:
+            for record in records:
+                journal_file.write(json.dumps(record, sort_keys=True))
+                journal_file.write('\n')
+
+    def iterate(self):
+        '''
+        Yield each record in the journal in the order it was appended.
+
+        An undecodable final record is the remains of an interrupted
+        :meth:`append` and is ignored.  An undecodable record anywhere
+        else is a :class:`JournalError`.
+        '''
+
+        if not self.exists:
+            return
+
+        with open(self.path, 'r') as journal_file:
+            torn_line_number = None
+            for line_number, line in enumerate(journal_file, 1):
+                if torn_line_number is not None:
+                    raise JournalError(
+                        'Line %d of journal "%s" is corrupt.' % (
+                            torn_line_number, self.path))
+                line = line.strip()
+                if len(line) == 0:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    torn_line_number = line_number
+                    continue
+                yield record
+
+    def clear(self):
+        '''
+        Discard every record in the journal.
+        '''
+
+        if self.exists:
+            os.remove(self.path)
+
+
+def _discard_torn_record(journal_file, chunk_size=4096):
+    '''
+    Truncate `journal_file` just after its last newline.
+    '''
+
+    journal_file.seek(0, os.SEEK_END)
+    size = end = journal_file.tell()
+    while end > 0:
+        start = max(0, end - chunk_size)
+        journal_file.seek(start)
+        newline_offset = journal_file.read(end - start).rfind('\n')
+        if newline_offset >= 0:
+            end = start + newline_offset + 1
+            break
+        end = start
+    if end != size:
+        journal_file.truncate(end)
+
+
+class JournalError(ValueError):
+    '''
+    A journal that cannot be replayed
+    '''
+
+    def __init__(self, s):
+        ValueError.__init__(self, s)
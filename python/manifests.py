@@ -0,0 +1,71 @@
+'''
+A record of the account-activity files already imported
+
+* :class:`Manifest`
+'''
+
+# Standard imports:
+import json
+import os
+
+# Project imports:
+import caching
+
+
+class Manifest(object):
+    '''
+    A JSON file that maps the absolute path of each imported file onto
+    its size, mtime and content hash when it was imported
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = None
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            self._entries = {}
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as manifest_file:
+                    self._entries = json.load(manifest_file)
+        return self._entries
+
+    def is_unchanged(self, file_path):
+        '''
+        Return ``True`` if the file at `file_path` is as it was when it
+        was last recorded.
+
+        A file whose size and mtime are unchanged is not read.  One
+        whose mtime alone has changed is hashed, and if its content is
+        unchanged its new mtime is recorded.
+        '''
+
+        entry = self.entries.get(os.path.abspath(file_path))
+        if entry is None or not os.path.exists(file_path):
+            return False
+        size, mtime, content_hash = entry
+        stat = os.stat(file_path)
+        if stat.st_size != size:
+            return False
+        if stat.st_mtime == mtime:
+            return True
+        if caching.hash_file(file_path) != content_hash:
+            return False
+        self.record(file_path)
+        return True
+
+    def record(self, file_path):
+        '''
+        Record the file at `file_path` as it is now.
+        '''
+
+        stat = os.stat(file_path)
+        self.entries[os.path.abspath(file_path)] = [
+            stat.st_size, stat.st_mtime, caching.hash_file(file_path)]
+
+    def save(self):
+        temporary_path = self.path + '.tmp'
+        with open(temporary_path, 'w') as manifest_file:
+            json.dump(self.entries, manifest_file, indent=4, sort_keys=True)
+        os.rename(temporary_path, self.path)
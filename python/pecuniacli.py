@@ -7,16 +7,19 @@ A command-line interface to ``pecunia``
 
 # Standard imports:
 import argparse
-import collections
+import os
 import re
 import sys
 
 # Project imports:
+import amountindexing
 import datetools
 import classifying
 import importing
 import filtering
 import formatting
+import manifests
+import tagindexing
 import transactions
 
 
@@ -29,6 +32,10 @@ def main():
 
     if options.db_file is not None:
         transactions.set_database_path(options.db_file)
+    if options.no_cache:
+        transactions.set_cache_enabled(False)
+    if options.rebuild_cache:
+        transactions.clear_cache()
 
     if options.command == 'import':
         _ImportTransactionsCommand(options).do()
@@ -38,6 +45,8 @@ def main():
         _ListTagsCommand(options).do()
     elif options.command == 'classify':
         _ClassifyTransactionsCommand(options).do()
+    elif options.command == 'compact':
+        _CompactDatabaseCommand(options).do()
 
 
 def _parse_options(args=None):
@@ -58,6 +67,7 @@ class _OptionParser(object):
         self._create_options_subparser_list()
         self._create_options_subparser_tags()
         self._create_options_subparser_classify()
+        self._create_options_subparser_compact()
 
     def parse_args(self, args=None):
         return self.parser.parse_args(args)
@@ -68,17 +78,42 @@ class _OptionParser(object):
             help='the path to the database file',
             metavar='FILE',
             dest='db_file')
+        self.parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='neither read nor write the cache of decoded transactions, '
+            'which is used only without a current snapshot',
+            dest='no_cache')
+        self.parser.add_argument(
+            '--rebuild-cache',
+            action='store_true',
+            help='discard the cache of decoded transactions and rebuild it '
+            'if there is no current snapshot',
+            dest='rebuild_cache')
 
     def _create_options_subparser_import(self):
         parser = self.subparsers.add_parser(
             'import',
-            description='Import transactions from .csv files',
+            description=(
+                'Import transactions from .csv files, which may be'
+                ' gzipped or in .zip or .tar.gz archives'),
             help='import transactions')
         parser.add_argument(
             'input_file_paths',
             nargs='+',
             help='input file path',
             metavar='FILE')
+        parser.add_argument(
+            '-j', '--jobs',
+            type=int,
+            help='parse up to N files at once (default: one per core)',
+            metavar='N',
+            dest='job_count')
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='import files even if they are unchanged since last imported',
+            dest='force')
 
     def _create_options_subparser_list(self):
         parser = self.subparsers.add_parser(
@@ -90,6 +125,9 @@ class _OptionParser(object):
         self._create_option_include_regexs(parser)
         self._create_option_exclude_regexs(parser)
         self._create_option_no_tags(parser)
+        self._create_option_tag_queries(parser)
+        self._create_option_amounts(parser)
+        self._create_option_explain(parser)
         self._create_option_print_total(parser)
         self._create_option_export_total(parser)
 
@@ -100,6 +138,8 @@ class _OptionParser(object):
             help='list tags')
         self._create_option_dates(parser)
         self._create_option_dates_files(parser)
+        self._create_option_tag_queries(parser)
+        self._create_option_amounts(parser)
 
     def _create_options_subparser_classify(self):
         parser = self.subparsers.add_parser(
@@ -111,6 +151,15 @@ class _OptionParser(object):
         self._create_option_include_regexs(parser)
         self._create_option_exclude_regexs(parser)
         self._create_option_no_tags(parser)
+        self._create_option_tag_queries(parser)
+        self._create_option_amounts(parser)
+        self._create_option_explain(parser)
+
+    def _create_options_subparser_compact(self):
+        self.subparsers.add_parser(
+            'compact',
+            description='Fold the journal of edits into the database file',
+            help='compact the database')
 
     def _create_option_dates(self, parser):
         parser.add_argument(
@@ -153,6 +202,32 @@ class _OptionParser(object):
             help='consider only transactions without tags',
             dest='no_tags')
 
+    def _create_option_tag_queries(self, parser):
+        parser.add_argument(
+            '--tag',
+            action='append',
+            type=tagindexing.parse_tag_query,
+            default=[],
+            help='consider only transactions with a tag, or without it if '
+            'it starts with "!" (separate alternatives with "|")',
+            metavar='TAG',
+            dest='tag_queries')
+
+    def _create_option_amounts(self, parser):
+        parser.add_argument(
+            '--amount',
+            type=amountindexing.parse_amount_ranges,
+            help='consider only transactions with an amount in a range',
+            metavar='RANGE',
+            dest='amounts')
+
+    def _create_option_explain(self, parser):
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help='show the order in which the filters ran and their counts',
+            dest='explain')
+
     def _create_option_print_total(self, parser):
         parser.add_argument(
             '--print-total',
@@ -178,17 +253,64 @@ class _ImportTransactionsCommand(object):
     def do(self):
         sys.stdout.write('Importing transactions.\n')
 
-        xactions = []
-        for path in self.options.input_file_paths:
-            xactions.extend(importing.parse_file(path))
-
-        sys.stdout.write('Imported %d transactions.\n' % len(xactions))
+        manifest = manifests.Manifest(transactions.manifest_path())
+        input_file_paths = self.options.input_file_paths
+        if not self.options.force and os.path.exists(
+                transactions.database_path()):
+            input_file_paths = [
+                path
+                for path in input_file_paths
+                if not manifest.is_unchanged(path)
+            ]
+            sys.stdout.write(
+                'Skipped %d files already imported.\n' % (
+                    len(self.options.input_file_paths) -
+                    len(input_file_paths)))
+            if len(input_file_paths) == 0:
+                manifest.save()
+                return
+
+        parsed_files = importing.parse_files(
+            input_file_paths, self.options.job_count)
+        for parsed_file in parsed_files:
+            if parsed_file.error is not None:
+                sys.stderr.write('Cannot import "%s": %s\n' % (
+                    parsed_file.path, parsed_file.error))
+            elif len(parsed_file.row_errors) > 0:
+                sys.stderr.write(parsed_file.row_errors.summary())
+
+        imported_xaction_lists = [
+            parsed_file.xactions for parsed_file in parsed_files
+        ]
+        imported_count = sum([
+            len(imported_xactions)
+            for imported_xactions in imported_xaction_lists
+        ])
+
+        sys.stdout.write('Imported %d transactions.\n' % imported_count)
+
+        new_xactions = importing.store_new(imported_xaction_lists)
 
-        transactions.store(xactions)
+        sys.stdout.write(
+            'Skipped %d transactions already in the database.\n' % (
+                imported_count - len(new_xactions)))
 
         sys.stdout.write(
-            'Stored %d transcations to file "%s".\n' % (
-                len(xactions), transactions.database_path()))
+            'Stored %d new transcations to file "%s".\n' % (
+                len(new_xactions), transactions.database_path()))
+
+        failed_paths = set([
+            parsed_file.input_path
+            for parsed_file in parsed_files
+            if parsed_file.error is not None
+        ])
+        for path in input_file_paths:
+            if path not in failed_paths:
+                manifest.record(path)
+        manifest.save()
+
+        if len(failed_paths) > 0:
+            sys.exit(1)
 
 
 class _ListTransactionsCommand(object):
@@ -200,9 +322,7 @@ class _ListTransactionsCommand(object):
         self.options = options
 
     def do(self):
-        all_xactions = transactions.load()
-        filtered_xactions = _filter_transactions(
-            all_xactions, self.options)
+        filtered_xactions = _query_transactions(self.options)
         for xaction in filtered_xactions:
             sys.stdout.write(
                 formatting.format_transaction_for_one_line(xaction))
@@ -233,77 +353,33 @@ class _ListTagsCommand(object):
         self.options = options
 
     def do(self):
-        all_xactions = transactions.load()
-        filtered_xactions = _filter_transactions(
-            all_xactions, self.options)
-        if len(filtered_xactions) == 0:
+        row_count, tag_totals = filtering.query_tag_totals(self.options)
+        sys.stdout.write(
+            'After filtering, %d transactions remain.\n' % row_count)
+        if row_count == 0:
             return
 
-        xactions_by_tag = _sort_transactions_by_tag(filtered_xactions)
-
-        def map_tags(token_func):
-            return [token_func(tag) for tag in xactions_by_tag.iterkeys()]
-
-        def map_transaction_lists(token_func):
-            return [
-                token_func(xaction_list)
-                for xaction_list in xactions_by_tag.itervalues()
-                ]
+        def map_totals(token_func, index):
+            return [token_func(totals[index]) for totals in tag_totals]
 
         def tag_token(s):
             return str(s)
 
-        def count_token(xactions):
-            return str(len(xactions))
-
-        def expense_token(xactions):
-            return '{0:,.2f}'.format(
-                sum([x.amount for x in xactions if x.amount < 0]))
-
-        def income_token(xactions):
-            return '{0:,.2f}'.format(
-                sum([x.amount for x in xactions if x.amount > 0]))
-
-        def volume_token(xactions):
-            return '{0:,.2f}'.format(
-                sum([abs(x.amount) for x in xactions]))
-
-        def net_token(xactions):
-            return '{0:,.2f}'.format(
-                sum([x.amount for x in xactions]))
+        def count_token(count):
+            return str(count)
 
-        table = formatting.ConsoleTable()
-        table.create_column('TAG', map_tags(tag_token), alignment='left')
-        table.create_column('COUNT', map_transaction_lists(count_token))
-        table.create_column('EXPENSE', map_transaction_lists(expense_token))
-        table.create_column('INCOME', map_transaction_lists(income_token))
-        table.create_column('VOLUME', map_transaction_lists(volume_token))
-        table.create_column('NET', map_transaction_lists(net_token))
-        table.write(sys.stdout)
+        def amount_token(amount):
+            return '{0:,.2f}'.format(amount)
 
-
-def _sort_transactions_by_tag(xactions):
-    # Discover the full set of tags.
-    tags = set()
-    for xaction in xactions:
-        if len(xaction.tags) == 0:
-            tags.add(None)
-        for tag in xaction.tags.keys():
-            tags.add(tag)
-
-    # Create an alphabetically sorted mapping of tag onto empty lists.
-    xactions_by_tag = collections.OrderedDict()
-    for tag in sorted(tags):
-        xactions_by_tag[tag] = []
-
-    # Populate the lists with transactions.
-    for xaction in xactions:
-        if len(xaction.tags) == 0:
-            xactions_by_tag[None].append(xaction)
-        for tag in xaction.tags.keys():
-            xactions_by_tag[tag].append(xaction)
-
-    return xactions_by_tag
+        console_table = formatting.ConsoleTable()
+        console_table.create_column(
+            'TAG', map_totals(tag_token, 0), alignment='left')
+        console_table.create_column('COUNT', map_totals(count_token, 1))
+        console_table.create_column('EXPENSE', map_totals(amount_token, 2))
+        console_table.create_column('INCOME', map_totals(amount_token, 3))
+        console_table.create_column('VOLUME', map_totals(amount_token, 4))
+        console_table.create_column('NET', map_totals(amount_token, 5))
+        console_table.write(sys.stdout)
 
 
 class _ClassifyTransactionsCommand(object):
@@ -331,9 +407,36 @@ class _ClassifyTransactionsCommand(object):
                 len(all_xactions), transactions.database_path()))
 
 
+class _CompactDatabaseCommand(object):
+    '''
+    The ``compact`` command
+    '''
+
+    def __init__(self, options):
+        self.options = options
+
+    def do(self):
+        transactions.compact()
+        sys.stdout.write(
+            'Compacted file "%s".\n' % transactions.database_path())
+
+
+def _query_transactions(options):
+    return _report_filtered_transactions(
+        filtering.query_transactions(options))
+
+
 def _filter_transactions(all_xactions, options):
-    filtered_xactions = filtering.filter_transactions(
-        all_xactions, options)
+    # `all_xactions` are as :func:`transactions.load` returned them.
+    return _report_filtered_transactions(
+        filtering.filter_transactions(all_xactions, options, date_sorted=True))
+
+
+def _report_filtered_transactions(filtered_xactions):
+    # Databases written before :func:`transactions.store` sorted its
+    # output may not be in date order.  Sorting what survived the
+    # filter is cheap, and nearly free when it is already in order.
+    filtered_xactions.sort(key=lambda x: x.date, reverse=True)
 
     sys.stdout.write(
         'After filtering, %d transactions remain.\n' % (
@@ -0,0 +1,125 @@
+'''
+An on-disk cache of query results
+
+A result cache belongs to one version of the database.  It maps the
+normalized criteria of each recent query onto the positions of the
+transactions that satisfied them, the messages the query wrote and
+whatever totals were computed from them.  The least recently used
+results are evicted to keep within a number of results and a number
+of positions in all.  The order of use is stored in a small file of
+its own, so that a query answered from the cache need not rewrite the
+results.
+
+* :class:`ResultCache`
+* :class:`QueryResult`
+* :func:`clear`
+'''
+
+# Standard imports:
+import array
+import collections
+
+# Project imports:
+import caching
+
+
+class QueryResult(object):
+    '''
+    The positions of the transactions that satisfied a query, the
+    messages it wrote and the totals computed from them
+    '''
+
+    def __init__(self, positions, messages, totals=None):
+        self.positions = array.array('i', positions)
+        self.messages = messages
+        self.totals = totals
+
+    def __getstate__(self):
+        return (self.positions, self.messages, self.totals)
+
+    def __setstate__(self, state):
+        self.positions, self.messages, self.totals = state
+
+
+class ResultCache(object):
+    '''
+    The :class:`QueryResult` of each recent query on one version of the
+    database, stored at `path`, least recently used first
+    '''
+
+    def __init__(
+            self,
+            path,
+            version,
+            result_capacity=32,
+            position_capacity=1000 * 1000):
+        self.path = path
+        self.version = version
+        self.result_capacity = result_capacity
+        self.position_capacity = position_capacity
+        self._results = None
+
+    @property
+    def results(self):
+        if self._results is None:
+            self._results = caching.load(self.path, self.version)
+            if self._results is None:
+                self._results = collections.OrderedDict()
+            order = caching.load(_order_path(self.path), self.version)
+            for key in order or ():
+                if key in self._results:
+                    self._results[key] = self._results.pop(key)
+        return self._results
+
+    def get(self, key):
+        '''
+        Return the :class:`QueryResult` cached under `key`, marking it
+        most recently used, or ``None``.
+        '''
+
+        result = self.results.pop(key, None)
+        if result is not None:
+            self.results[key] = result
+            self._save_order()
+        return result
+
+    def put(self, key, result):
+        '''
+        Cache `result` under `key` as the most recently used, evicting
+        the least recently used results that no longer fit.  A result
+        with more positions than the cache may hold is not cached.
+        '''
+
+        if len(result.positions) > self.position_capacity:
+            return
+        self.results.pop(key, None)
+        self.results[key] = result
+        position_count = sum(
+            len(cached_result.positions)
+            for cached_result in self.results.itervalues())
+        while (len(self.results) > self.result_capacity or
+                position_count > self.position_capacity):
+            _, evicted_result = self.results.popitem(last=False)
+            position_count -= len(evicted_result.positions)
+        self._save()
+
+    def _save(self):
+        caching.store(self.path, self.version, self.results)
+        self._save_order()
+
+    def _save_order(self):
+        caching.store(
+            _order_path(self.path), self.version, self.results.keys())
+
+
+def clear(path):
+    '''
+    Discard the result cache at `path`.
+    '''
+
+    caching.clear(path)
+    caching.clear(_order_path(path))
+
+
+def _order_path(path):
+    return path + '.order'
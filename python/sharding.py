@@ -0,0 +1,201 @@
+'''
+A transaction database kept as a folder of one JSON file per month
+
+Each shard is named for its month (``2019-05.json``) and holds that
+month's transactions in the same format as the single-file database.
+Transactions without a date are kept in ``undated.json``.
+
+* :func:`is_sharded_path`
+* :func:`iterate`
+* :func:`load`
+* :func:`store`
+'''
+
+# Standard imports:
+import collections
+import os
+import re
+
+# Project imports:
+import datetools
+import transactions
+
+
+_undated_shard_name = 'undated'
+
+_shard_file_name_pattern = re.compile(r'^(\d{4})-(\d{2})\.json$')
+
+
+def is_sharded_path(path):
+    '''
+    Return ``True`` if the database at `path` is a folder of shards: it
+    is an existing folder or it ends with a path separator.
+    '''
+
+    return os.path.isdir(path) or path.endswith(os.sep)
+
+
+def iterate(path, date_sequence=None):
+    '''
+    Yield each transaction in the sharded database at `path`, most
+    recent first.
+
+    When `date_sequence` is given, only the shards of the months it
+    touches are read.
+    '''
+
+    for shard_name in _shard_names_to_read(path, date_sequence):
+        for x in _read_shard(path, shard_name):
+            yield x
+
+
+def load(path):
+    '''
+    Load every transaction in the sharded database at `path`, most
+    recent first.
+
+    A later :func:`store` rewrites only the shards whose transactions
+    have changed since.
+    '''
+
+    xactions = list(iterate(path))
+    _remember_baseline(path, xactions)
+    return xactions
+
+
+def store(path, xactions):
+    '''
+    Store `xactions` as the entire content of the sharded database at
+    `path`.
+
+    A shard whose transactions are unchanged since they were last
+    loaded or stored is left alone.  Shards left without
+    transactions are removed.
+    '''
+
+    if not os.path.isdir(path):
+        os.makedirs(path)
+
+    xactions_by_shard_name = collections.defaultdict(list)
+    for x in xactions:
+        xactions_by_shard_name[_shard_name(x.date)].append(x)
+
+    baseline = _baseline
+    if baseline is not None and baseline.path != path:
+        baseline = None
+
+    for shard_name, shard_xactions in xactions_by_shard_name.iteritems():
+        if baseline is not None and baseline.is_unchanged(
+                shard_name, shard_xactions):
+            continue
+        _write_shard(path, shard_name, shard_xactions)
+
+    for shard_name in _shard_names(path):
+        if shard_name not in xactions_by_shard_name:
+            os.remove(_shard_path(path, shard_name))
+
+    _remember_baseline(path, xactions)
+
+
+class _Baseline(object):
+    '''
+    The transactions of a sharded database as they were last loaded or
+    stored
+
+    Each transaction is known by its identity and mapped to its shard,
+    its other fields and a copy of its tags.
+    '''
+
+    def __init__(self, path, xactions):
+        self.path = path
+        self.entries = {}
+        self.counts_by_shard_name = collections.defaultdict(int)
+        for x in xactions:
+            shard_name = _shard_name(x.date)
+            self.entries[id(x)] = (
+                shard_name, x, x.fields(), dict(x.tags))
+            self.counts_by_shard_name[shard_name] += 1
+
+    def is_unchanged(self, shard_name, shard_xactions):
+        if self.counts_by_shard_name.get(shard_name) != len(shard_xactions):
+            return False
+        for x in shard_xactions:
+            entry = self.entries.get(id(x))
+            if entry is None:
+                return False
+            entry_shard_name, _, fields, tags = entry
+            if (entry_shard_name != shard_name or
+                    not transactions.same_fields(fields, x.fields()) or
+                    tags != x.tags):
+                return False
+        return True
+
+
+_baseline = None
+
+
+def _remember_baseline(path, xactions):
+    global _baseline
+    _baseline = _Baseline(path, xactions)
+
+
+def _shard_name(date):
+    if date is None:
+        return _undated_shard_name
+    return '%04d-%02d' % (date.year, date.month)
+
+
+def _shard_path(path, shard_name):
+    return os.path.join(path, shard_name + '.json')
+
+
+def _shard_names(path):
+    '''
+    Return the name of every shard in the database at `path`, most
+    recent month first and the undated shard last.
+    '''
+
+    if not os.path.isdir(path):
+        return []
+    file_names = os.listdir(path)
+    shard_names = sorted(
+        [
+            file_name[:-len('.json')]
+            for file_name in file_names
+            if _shard_file_name_pattern.match(file_name)
+        ],
+        reverse=True)
+    if _undated_shard_name + '.json' in file_names:
+        shard_names.append(_undated_shard_name)
+    return shard_names
+
+
+def _shard_names_to_read(path, date_sequence):
+    shard_names = _shard_names(path)
+    if date_sequence is None or date_sequence.is_empty:
+        return shard_names
+
+    shard_names_to_read = []
+    for shard_name in shard_names:
+        if shard_name == _undated_shard_name:
+            continue
+        year, month = shard_name.split('-')
+        if date_sequence.overlaps(
+                datetools.month_date_range(int(year), int(month))):
+            shard_names_to_read.append(shard_name)
+    return shard_names_to_read
+
+
+def _read_shard(path, shard_name):
+    with open(_shard_path(path, shard_name), 'r') as shard_file:
+        for json_decodable in transactions.iterate_json_array(shard_file):
+            yield transactions.Transaction.decode(json_decodable)
+
+
+def _write_shard(path, shard_name, xactions):
+    xactions = sorted(xactions, key=lambda x: x.date, reverse=True)
+    shard_path = _shard_path(path, shard_name)
+    temporary_path = shard_path + '.tmp'
+    with open(temporary_path, 'w') as shard_file:
+        transactions.write_json_array(shard_file, xactions)
+    os.rename(temporary_path, shard_path)
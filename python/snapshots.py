@@ -0,0 +1,323 @@
+'''
+A compact binary copy of the transaction database for fast startup
+
+A snapshot mirrors the database file row for row.  Dates are stored
+as ordinals, amounts as doubles and strings once each in a shared
+string table.  An index of the rows in each month lets a query that
+covers only a few months decode only their rows.
+
+* :func:`write`
+* :func:`is_current`
+* :func:`row_count`
+* :func:`rows_in_dates`
+* :func:`iterate`
+'''
+
+# Standard imports:
+import bisect
+import contextlib
+import datetime
+import mmap
+import os
+import struct
+
+# Project imports:
+import datetools
+import transactions
+
+
+_magic = 'PECSNAP1'
+
+# magic, source mtime, source size, row count, month count, tag count,
+# string count
+_header = struct.Struct('<8sdQIIII')
+
+# month key, first row, row count
+_month = struct.Struct('<iII')
+
+# trans date ordinal, post date ordinal, amount, type string, description
+# string, first tag, tag count
+_row = struct.Struct('<iidiiII')
+
+# trans date ordinal, post date ordinal: the start of a row
+_row_dates = struct.Struct('<ii')
+
+# tag string, has amount, amount
+_tag = struct.Struct('<i?d')
+
+# offset, length
+_string = struct.Struct('<II')
+
+_no_date_month_key = -1
+
+
+def write(path, xactions, source_path):
+    '''
+    Write a snapshot of `xactions` to `path`, where `xactions` are in
+    the same order as in the database file at `source_path`.
+    '''
+
+    strings = _StringTable()
+    months = []
+    rows = []
+    tags = []
+    for row, x in enumerate(xactions):
+        month_key = _month_key(x.date)
+        if len(months) > 0 and months[-1][0] == month_key:
+            months[-1][2] += 1
+        else:
+            months.append([month_key, row, 1])
+
+        rows.append(_row.pack(
+            _date_as_ordinal(x.trans_date),
+            _date_as_ordinal(x.post_date),
+            float('nan') if x.amount is None else x.amount,
+            strings.encode(x.type),
+            strings.encode(x.description),
+            len(tags),
+            len(x.tags)))
+        for tag, amount in sorted(x.tags.items()):
+            tags.append(_tag.pack(
+                strings.encode(tag),
+                amount is not None,
+                0.0 if amount is None else amount))
+
+    source_stat = os.stat(source_path)
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'wb') as snapshot_file:
+        snapshot_file.write(_header.pack(
+            _magic,
+            source_stat.st_mtime,
+            source_stat.st_size,
+            len(rows),
+            len(months),
+            len(tags),
+            len(strings.encoded_strings)))
+        for month in months:
+            snapshot_file.write(_month.pack(*month))
+        snapshot_file.write(''.join(rows))
+        snapshot_file.write(''.join(tags))
+        offset = 0
+        for encoded_string in strings.encoded_strings:
+            snapshot_file.write(_string.pack(offset, len(encoded_string)))
+            offset += len(encoded_string)
+        snapshot_file.write(''.join(strings.encoded_strings))
+    os.rename(temporary_path, path)
+
+
+def is_current(path, source_path):
+    '''
+    Return ``True`` if the snapshot at `path` mirrors the database file
+    at `source_path` as it is now.
+    '''
+
+    if not os.path.exists(path) or not os.path.exists(source_path):
+        return False
+    with open(path, 'rb') as snapshot_file:
+        header = snapshot_file.read(_header.size)
+    if len(header) != _header.size:
+        return False
+    magic, source_mtime, source_size = _header.unpack(header)[:3]
+    source_stat = os.stat(source_path)
+    return (
+        magic == _magic and
+        source_mtime == source_stat.st_mtime and
+        source_size == source_stat.st_size)
+
+
+def row_count(path):
+    '''
+    Return the number of rows in the snapshot at `path`.
+    '''
+
+    with open(path, 'rb') as snapshot_file:
+        return _header.unpack(snapshot_file.read(_header.size))[3]
+
+
+def rows_in_dates(path, date_sequence):
+    '''
+    Return the sorted rows of the snapshot at `path` whose date is in
+    `date_sequence`, reading the dates of only the months it touches.
+    '''
+
+    with open(path, 'rb') as snapshot_file:
+        with contextlib.closing(mmap.mmap(
+                snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)) as data:
+            reader = _Reader(data)
+            return [
+                row
+                for first_row, row_count in reader.row_ranges(date_sequence)
+                for row in xrange(first_row, first_row + row_count)
+                if date_sequence.contains_ordinal(reader.date_ordinal(row))
+            ]
+
+
+def iterate(path, date_sequence=None, rows=None):
+    '''
+    Yield the row number and :class:`transactions.Transaction` of each
+    row in the snapshot at `path`.
+
+    When `date_sequence` is given, rows in months it does not touch are
+    skipped without being decoded.  When the sorted list `rows` is
+    given, only those rows are decoded.
+    '''
+
+    with open(path, 'rb') as snapshot_file:
+        with contextlib.closing(mmap.mmap(
+                snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)) as data:
+            reader = _Reader(data)
+            for first_row, row_count in reader.row_ranges(date_sequence):
+                if rows is None:
+                    range_rows = xrange(first_row, first_row + row_count)
+                else:
+                    range_rows = rows[
+                        bisect.bisect_left(rows, first_row):
+                        bisect.bisect_left(rows, first_row + row_count)]
+                for row in range_rows:
+                    yield row, reader.transaction(row)
+
+
+class _StringTable(object):
+    '''
+    The distinct strings of a snapshot as they are being written
+    '''
+
+    def __init__(self):
+        self.encoded_strings = []
+        self._indexes = {}
+
+    def encode(self, s):
+        '''
+        Return the index of `s` in the table, or -1 for ``None``.
+        '''
+
+        if s is None:
+            return -1
+        index = self._indexes.get(s)
+        if index is None:
+            index = len(self.encoded_strings)
+            self._indexes[s] = index
+            if isinstance(s, unicode):
+                s = s.encode('utf-8')
+            self.encoded_strings.append(s)
+        return index
+
+
+class _Reader(object):
+    '''
+    Decodes the rows of a memory-mapped snapshot on demand
+    '''
+
+    def __init__(self, data):
+        self.data = data
+        (
+            _, _, _,
+            self.row_count,
+            self.month_count,
+            self.tag_count,
+            self.string_count,
+        ) = _header.unpack_from(data, 0)
+        self.months_offset = _header.size
+        self.rows_offset = self.months_offset + self.month_count * _month.size
+        self.tags_offset = self.rows_offset + self.row_count * _row.size
+        self.strings_offset = self.tags_offset + self.tag_count * _tag.size
+        self.blob_offset = (
+            self.strings_offset + self.string_count * _string.size)
+        self._decoded_strings = {-1: None}
+
+    def row_ranges(self, date_sequence):
+        '''
+        Return the ``(first_row, row_count)`` of each month that
+        `date_sequence` touches, or of every month if it is ``None``.
+        '''
+
+        if date_sequence is None or date_sequence.is_empty:
+            return [(0, self.row_count)]
+
+        row_ranges = []
+        for index in xrange(self.month_count):
+            month_key, first_row, row_count = _month.unpack_from(
+                self.data, self.months_offset + index * _month.size)
+            if month_key == _no_date_month_key:
+                continue
+            if date_sequence.overlaps(
+                    datetools.month_date_range(*_month_of_key(month_key))):
+                row_ranges.append((first_row, row_count))
+        return row_ranges
+
+    def date_ordinal(self, row):
+        '''
+        Return the ordinal of the date of `row`, which is dated.
+        '''
+
+        trans_date_ordinal, post_date_ordinal = _row_dates.unpack_from(
+            self.data, self.rows_offset + row * _row.size)
+        return trans_date_ordinal or post_date_ordinal
+
+    def transaction(self, row):
+        (
+            trans_date_ordinal,
+            post_date_ordinal,
+            amount,
+            type_index,
+            description_index,
+            first_tag,
+            tag_count,
+        ) = _row.unpack_from(self.data, self.rows_offset + row * _row.size)
+
+        x = transactions.Transaction.from_fields(
+            self._string(type_index),
+            _ordinal_as_date(trans_date_ordinal),
+            _ordinal_as_date(post_date_ordinal),
+            self._string(description_index),
+            None if amount != amount else amount)
+        if tag_count > 0:
+            tags = {}
+            for index in xrange(first_tag, first_tag + tag_count):
+                tag_index, has_amount, tag_amount = _tag.unpack_from(
+                    self.data, self.tags_offset + index * _tag.size)
+                tags[self._string(tag_index)] = (
+                    tag_amount if has_amount else None)
+            x.tags = tags
+        return x
+
+    def _string(self, index):
+        '''
+        Return the string at `index`, decoding it only the first time.
+        '''
+
+        s = self._decoded_strings.get(index)
+        if s is None and index not in self._decoded_strings:
+            offset, length = _string.unpack_from(
+                self.data, self.strings_offset + index * _string.size)
+            start = self.blob_offset + offset
+            s = self.data[start:start + length].decode('utf-8')
+            self._decoded_strings[index] = s
+        return s
+
+
+def _month_key(date):
+    if date is None:
+        return _no_date_month_key
+    return date.year * 12 + date.month - 1
+
+
+def _month_of_key(month_key):
+    '''
+    Return the year and month of a month key.
+    '''
+
+    year, month_index = divmod(month_key, 12)
+    return year, month_index + 1
+
+
+def _date_as_ordinal(date):
+    if date is None:
+        return 0
+    return date.toordinal()
+
+
+def _ordinal_as_date(ordinal):
+    if ordinal == 0:
+        return None
+    return datetime.date.fromordinal(ordinal)
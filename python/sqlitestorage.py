@@ -0,0 +1,175 @@
+'''
+An indexed SQLite alternative to the JSON transaction database
+
+* :func:`is_sqlite_path`
+* :func:`iterate`
+* :func:`store`
+* :func:`compact`
+'''
+
+# Standard imports:
+import contextlib
+import json
+import sqlite3
+
+# Project imports:
+import datetools
+import transactions
+
+
+_sqlite_extensions = ('.sqlite', '.sqlite3', '.db')
+
+_schema = '''
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    type TEXT,
+    trans_date TEXT,
+    post_date TEXT,
+    date TEXT,
+    description TEXT,
+    amount REAL,
+    tags TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transactions_date
+    ON transactions (date);
+CREATE INDEX IF NOT EXISTS transactions_description
+    ON transactions (description);
+CREATE TABLE IF NOT EXISTS transaction_tags (
+    transaction_id INTEGER NOT NULL REFERENCES transactions (id),
+    tag TEXT NOT NULL,
+    PRIMARY KEY (transaction_id, tag)
+);
+CREATE INDEX IF NOT EXISTS transaction_tags_tag
+    ON transaction_tags (tag);
+'''
+
+
+def is_sqlite_path(path):
+    '''
+    Return ``True`` if the database at `path` belongs in SQLite.
+    '''
+
+    return path.lower().endswith(_sqlite_extensions)
+
+
+def iterate(path, date_sequence=None, no_tags=False, ruled_out_counts=None):
+    '''
+    Yield each transaction in the SQLite database at `path`, most
+    recent first.
+
+    Only the transactions in `date_sequence` (if any) and without tags
+    (if `no_tags`) are read.  Both are answered by the indexes.  If
+    `no_tags`, the number of transactions in `date_sequence` that have
+    tags is added to the dict `ruled_out_counts`, if given, under
+    ``'no-tags'``.
+    '''
+
+    where, parameters = _where_clause(date_sequence, no_tags)
+    with contextlib.closing(_connect(path)) as connection:
+        if no_tags and ruled_out_counts is not None:
+            tagged_where, tagged_parameters = _where_clause(
+                date_sequence, tagged=True)
+            tagged_count, = connection.execute(
+                'SELECT COUNT(*) FROM transactions%s' % tagged_where,
+                tagged_parameters).fetchone()
+            ruled_out_counts['no-tags'] = (
+                ruled_out_counts.get('no-tags', 0) + tagged_count)
+        rows = connection.execute(
+            'SELECT type, trans_date, post_date, description, amount, tags'
+            ' FROM transactions%s ORDER BY date DESC, id' % where,
+            parameters)
+        for type_, trans_date, post_date, description, amount, tags in rows:
+            yield transactions.Transaction.decode({
+                'type': type_,
+                'trans_date': trans_date,
+                'post_date': post_date,
+                'description': description,
+                'amount': amount,
+                'tags': None if tags == '{}' else json.loads(tags),
+            })
+
+
+def store(path, xactions):
+    '''
+    Replace the content of the SQLite database at `path` with
+    `xactions`.
+    '''
+
+    with contextlib.closing(_connect(path)) as connection:
+        with connection:
+            connection.execute('DELETE FROM transaction_tags')
+            connection.execute('DELETE FROM transactions')
+            for x in xactions:
+                cursor = connection.execute(
+                    'INSERT INTO transactions'
+                    ' (type, trans_date, post_date, date, description,'
+                    ' amount, tags)'
+                    ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (
+                        x.type,
+                        x.trans_date_as_string,
+                        x.post_date_as_string,
+                        x.date_as_string,
+                        x.description,
+                        x.amount,
+                        json.dumps(x.tags, sort_keys=True),
+                    ))
+                connection.executemany(
+                    'INSERT INTO transaction_tags (transaction_id, tag)'
+                    ' VALUES (?, ?)',
+                    [(cursor.lastrowid, tag) for tag in x.tags])
+
+
+def compact(path):
+    '''
+    Reclaim the space that deleted rows occupy in the SQLite database
+    at `path`.
+    '''
+
+    with contextlib.closing(_connect(path)) as connection:
+        connection.execute('VACUUM')
+
+
+def _connect(path):
+    connection = sqlite3.connect(path)
+    connection.executescript(_schema)
+    return connection
+
+
+def _where_clause(date_sequence, no_tags=False, tagged=False):
+    '''
+    Return the ``WHERE`` clause and its parameters that select only
+    transactions in `date_sequence`, without tags if `no_tags` and with
+    tags if `tagged`.
+    '''
+
+    conditions = []
+    parameters = []
+
+    if date_sequence is not None and not date_sequence.is_empty:
+        date_conditions = []
+        for date in date_sequence.dates:
+            if not isinstance(date, datetools.DateRange):
+                date_conditions.append('date = ?')
+                parameters.append(datetools.date_as_string(date))
+            elif date.first is None:
+                date_conditions.append('date <= ?')
+                parameters.append(datetools.date_as_string(date.last))
+            elif date.last is None:
+                date_conditions.append('date >= ?')
+                parameters.append(datetools.date_as_string(date.first))
+            else:
+                date_conditions.append('date BETWEEN ? AND ?')
+                parameters.append(datetools.date_as_string(date.first))
+                parameters.append(datetools.date_as_string(date.last))
+        conditions.append('(%s)' % ' OR '.join(date_conditions))
+
+    if no_tags or tagged:
+        conditions.append(
+            '%sEXISTS (SELECT 1 FROM transaction_tags'
+            ' WHERE transaction_id = transactions.id)' % (
+                'NOT ' if no_tags else ''))
+
+    if len(conditions) == 0:
+        return '', parameters
+    return ' WHERE %s' % ' AND '.join(conditions), parameters
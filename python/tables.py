@@ -0,0 +1,229 @@
+'''
+A columnar representation of many transactions
+
+* :class:`TransactionTable`
+'''
+
+# Standard imports:
+import array
+import collections
+import datetime
+
+# Project imports:
+import transactions
+
+
+class TransactionTable(object):
+    '''
+    Transactions stored column by column
+
+    Dates are ordinals (zero for no date) and amounts are doubles,
+    each in an :mod:`array`.  Types, descriptions and sets of tags are
+    dictionary-encoded: each row holds the index of its value in a
+    list of the distinct values.
+
+    Methods that select or aggregate rows take and return arrays of
+    row numbers so that they may be chained without building any
+    :class:`transactions.Transaction`.
+    '''
+
+    def __init__(self, xactions=()):
+        self.trans_date_ordinals = array.array('i')
+        self.post_date_ordinals = array.array('i')
+        self.date_ordinals = array.array('i')
+        self.amounts = array.array('d')
+        self.type_codes = array.array('i')
+        self.description_codes = array.array('i')
+        self.tags_codes = array.array('i')
+        self.types = _Dictionary()
+        self.descriptions = _Dictionary()
+        self.tag_sets = _Dictionary()
+
+        # Code zero is always the empty set of tags.
+        self.tag_sets.encode(())
+
+        for x in xactions:
+            self.append(x)
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def __iter__(self):
+        for row in xrange(len(self)):
+            yield self.transaction(row)
+
+    def append(self, x):
+        '''
+        Append the :class:`transactions.Transaction` `x` as a new row.
+        '''
+
+        trans_date_ordinal = _date_as_ordinal(x.trans_date)
+        post_date_ordinal = _date_as_ordinal(x.post_date)
+        self.trans_date_ordinals.append(trans_date_ordinal)
+        self.post_date_ordinals.append(post_date_ordinal)
+        self.date_ordinals.append(trans_date_ordinal or post_date_ordinal)
+        self.amounts.append(x.amount)
+        self.type_codes.append(self.types.encode(x.type))
+        self.description_codes.append(
+            self.descriptions.encode(x.description))
+        self.tags_codes.append(
+            self.tag_sets.encode(tuple(sorted(x.tags.items()))))
+
+    def transaction(self, row):
+        '''
+        Return the :class:`transactions.Transaction` at `row`.
+        '''
+
+        x = transactions.Transaction.from_fields(
+            self.types.values[self.type_codes[row]],
+            _ordinal_as_date(self.trans_date_ordinals[row]),
+            _ordinal_as_date(self.post_date_ordinals[row]),
+            self.descriptions.values[self.description_codes[row]],
+            self.amounts[row])
+        tag_set = self.tag_sets.values[self.tags_codes[row]]
+        if len(tag_set) > 0:
+            x.tags = dict(tag_set)
+        return x
+
+    def rows(self):
+        '''
+        Return every row number.
+        '''
+
+        return array.array('i', xrange(len(self)))
+
+    def select_dates(self, rows, date_sequence):
+        '''
+        Return the `rows` whose date is in `date_sequence`.
+        '''
+
+        contains_ordinal = date_sequence.contains_ordinal
+        date_ordinals = self.date_ordinals
+        return array.array('i', [
+            row for row in rows
+            if date_ordinals[row] != 0 and contains_ordinal(date_ordinals[row])
+        ])
+
+    def select_descriptions(self, rows, predicate):
+        '''
+        Return the `rows` whose description satisfies `predicate`.
+
+        `predicate` is called once per distinct description rather than
+        once per row.
+        '''
+
+        matches = [
+            predicate(description)
+            for description in self.descriptions.values
+        ]
+        description_codes = self.description_codes
+        return array.array(
+            'i', [row for row in rows if matches[description_codes[row]]])
+
+    def select_untagged(self, rows):
+        '''
+        Return the `rows` without tags.
+        '''
+
+        tags_codes = self.tags_codes
+        return array.array('i', [row for row in rows if tags_codes[row] == 0])
+
+    def select_tags(self, rows, predicate):
+        '''
+        Return the `rows` whose tags satisfy `predicate`, which is
+        called with a mapping of tag onto amount once per distinct set
+        of tags rather than once per row.
+        '''
+
+        matches = [
+            predicate(dict(tag_set)) for tag_set in self.tag_sets.values
+        ]
+        tags_codes = self.tags_codes
+        return array.array(
+            'i', [row for row in rows if matches[tags_codes[row]]])
+
+    def select_amounts(self, rows, amount_ranges):
+        '''
+        Return the `rows` whose amount is in `amount_ranges`.
+        '''
+
+        amounts = self.amounts
+        return array.array(
+            'i', [row for row in rows if amounts[row] in amount_ranges])
+
+    def rows_by_tag(self, rows):
+        '''
+        Return an alphabetically ordered mapping of each tag among
+        `rows` onto the `rows` that have it.  Untagged `rows` are
+        mapped from ``None``.
+        '''
+
+        tags_by_code = [
+            [tag for tag, _ in tag_set] or [None]
+            for tag_set in self.tag_sets.values
+        ]
+        tags_codes = self.tags_codes
+
+        unordered_rows_by_tag = collections.defaultdict(
+            lambda: array.array('i'))
+        for row in rows:
+            for tag in tags_by_code[tags_codes[row]]:
+                unordered_rows_by_tag[tag].append(row)
+
+        rows_by_tag = collections.OrderedDict()
+        for tag in sorted(unordered_rows_by_tag):
+            rows_by_tag[tag] = unordered_rows_by_tag[tag]
+        return rows_by_tag
+
+    def total(self, rows):
+        amounts = self.amounts
+        return sum([amounts[row] for row in rows])
+
+    def credits(self, rows):
+        amounts = self.amounts
+        return sum([amounts[row] for row in rows if amounts[row] > 0.0])
+
+    def debits(self, rows):
+        amounts = self.amounts
+        return sum([amounts[row] for row in rows if amounts[row] < 0.0])
+
+    def volume(self, rows):
+        amounts = self.amounts
+        return sum([abs(amounts[row]) for row in rows])
+
+
+class _Dictionary(object):
+    '''
+    The distinct values of a dictionary-encoded column
+    '''
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, value):
+        '''
+        Return the code of `value`, assigning a new one if need be.
+        '''
+
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+
+def _date_as_ordinal(date):
+    if date is None:
+        return 0
+    return date.toordinal()
+
+
+def _ordinal_as_date(ordinal):
+    if ordinal == 0:
+        return None
+    return datetime.date.fromordinal(ordinal)
@@ -0,0 +1,195 @@
+'''
+A bitmap index of the tags in the transaction database
+
+The index maps each tag onto a bitmap of the positions of the
+transactions that have it, where a position is the row in the database
+file.  It is written only with the database file, so a reader applies
+the tags that the journal has changed or added since.  A bitmap is a ``long``, so
+that AND, OR and NOT run in C over many positions at once, and is
+stored compressed with :mod:`zlib`.
+
+* :class:`TagQuery`
+* :func:`parse_tag_query`
+* :func:`write`
+* :func:`load`
+* :class:`TagIndex`
+* :func:`positions`
+'''
+
+# Standard imports:
+import binascii
+import re
+import zlib
+
+# Project imports:
+import caching
+
+
+class TagQuery(object):
+    '''
+    Tells whether a transaction's tags satisfy any of several terms,
+    each a tag the transaction must have or, if negated, must not have
+    '''
+
+    def __init__(self, terms):
+        self.terms = terms
+
+    def __call__(self, tags):
+        for tag, negated in self.terms:
+            if (tag in tags) != negated:
+                return True
+        return False
+
+    def select(self, tag_index):
+        '''
+        Return the bitmap of the positions in `tag_index` that satisfy
+        the query.
+        '''
+
+        bitmap = 0
+        for tag, negated in self.terms:
+            tag_bitmap = tag_index.bitmap(tag)
+            if negated:
+                tag_bitmap = tag_index.all_bitmap & ~tag_bitmap
+            bitmap |= tag_bitmap
+        return bitmap
+
+
+def parse_tag_query(s):
+    '''
+    Convert a string like ``food``, ``!reimbursed`` or ``food|!cash``
+    to a :class:`TagQuery` that any of its ``|``-separated terms
+    satisfies, where a term that starts with ``!`` is negated.
+    '''
+
+    terms = []
+    for token in s.split('|'):
+        negated = token.startswith('!')
+        tag = token[1:] if negated else token
+        if tag == '':
+            raise ValueError('"%s" is not a tag query.' % s)
+        terms.append((tag, negated))
+    return TagQuery(terms)
+
+
+def write(path, xactions, source_paths):
+    '''
+    Write an index of the tags of `xactions`, each at its position in
+    the list, to `path` as of the files at `source_paths`.
+    '''
+
+    positions_by_tag = {}
+    position_count = 0
+    for position, x in enumerate(xactions):
+        for tag in x.tags:
+            positions_by_tag.setdefault(tag, []).append(position)
+        position_count += 1
+    caching.store(
+        path,
+        caching.stat_key(source_paths),
+        (
+            position_count,
+            {
+                tag: _compress_bitmap(tag_positions, position_count)
+                for tag, tag_positions in positions_by_tag.iteritems()
+            },
+        ))
+
+
+def load(path, source_paths):
+    '''
+    Return the :class:`TagIndex` at `path` if it is as of the files at
+    `source_paths` as they are now, otherwise ``None``.
+    '''
+
+    payload = caching.load(path, caching.stat_key(source_paths))
+    if payload is None:
+        return None
+    position_count, compressed_bitmaps = payload
+    return TagIndex(position_count, compressed_bitmaps)
+
+
+class TagIndex(object):
+    '''
+    The bitmaps of a tag index, each decompressed when first used
+    '''
+
+    def __init__(self, position_count, compressed_bitmaps):
+        self.position_count = position_count
+        self.all_bitmap = (1 << position_count) - 1
+        self._compressed_bitmaps = compressed_bitmaps
+        self._bitmaps = {}
+        self._tagged_bitmap = None
+
+    def bitmap(self, tag):
+        '''
+        Return the bitmap of the positions with `tag`.
+        '''
+
+        bitmap = self._bitmaps.get(tag)
+        if bitmap is None:
+            compressed_bitmap = self._compressed_bitmaps.get(tag)
+            bitmap = self._bitmaps[tag] = (
+                0 if compressed_bitmap is None
+                else _decompress_bitmap(compressed_bitmap))
+        return bitmap
+
+    @property
+    def untagged_bitmap(self):
+        '''
+        The bitmap of the positions without tags
+        '''
+
+        if self._tagged_bitmap is None:
+            self._tagged_bitmap = 0
+            for tag in self._compressed_bitmaps:
+                self._tagged_bitmap |= self.bitmap(tag)
+        return self.all_bitmap & ~self._tagged_bitmap
+
+    def select(self, tag_queries=(), no_tags=False):
+        '''
+        Return the sorted positions that satisfy every one of
+        `tag_queries` and, if `no_tags`, have no tags.
+        '''
+
+        bitmap = self.all_bitmap
+        if no_tags:
+            bitmap &= self.untagged_bitmap
+        for tag_query in tag_queries:
+            bitmap &= tag_query.select(self)
+        return positions(bitmap)
+
+
+def positions(bitmap):
+    '''
+    Return the sorted positions of the set bits of `bitmap`.
+    '''
+
+    # Reversed, the binary digits run from position zero upward.
+    return [
+        match.start()
+        for match in _one_pattern.finditer(bin(bitmap)[:1:-1])
+    ]
+
+
+_one_pattern = re.compile('1')
+
+
+def _compress_bitmap(bit_positions, position_count):
+    '''
+    Return the compressed bitmap of `bit_positions` among
+    `position_count`, least significant byte first.
+    '''
+
+    bits = bytearray((position_count + 7) // 8)
+    for position in bit_positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return zlib.compress(str(bits))
+
+
+def _decompress_bitmap(compressed_bitmap):
+    bits = zlib.decompress(compressed_bitmap)
+    if len(bits) == 0:
+        return 0
+    return long(binascii.hexlify(bits[::-1]), 16)
+
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+'''
+Tests for :mod:`amountindexing`
+'''
+
+# Standard imports:
+import inspect
+import os
+import shutil
+import traceback
+import unittest
+
+# Project imports:
+import amountindexing
+import transactions
+
+
+_this_file_path = os.path.abspath(inspect.getfile(inspect.currentframe()))
+_this_folder_path = os.path.dirname(_this_file_path)
+_python_folder_path = os.path.dirname(_this_folder_path)
+_root_folder_path = os.path.dirname(_python_folder_path)
+_build_folder_path = os.path.join(_root_folder_path, 'build')
+
+
+class parse_amount_ranges_TestCase(unittest.TestCase):
+
+    def test_amount(self):
+        self.assertEqual(
+            [(-10.0, -10.0)],
+            amountindexing.parse_amount_ranges('-10').ranges)
+
+    def test_ranges(self):
+        self.assertEqual(
+            [(9.99, 10.01), (None, -500.0), (500.0, None)],
+            amountindexing.parse_amount_ranges(
+                '9.99..10.01,..-500,500..').ranges)
+
+    def test_invalid_raises(self):
+        for s in ['ten', '..', '10..9', '1..2..3']:
+            with self.assertRaises(ValueError):
+                amountindexing.parse_amount_ranges(s)
+
+    def test_contains(self):
+        amount_ranges = amountindexing.parse_amount_ranges(
+            '..-500,9.99..10.01')
+        self.assertIn(-600.0, amount_ranges)
+        self.assertIn(-500.0, amount_ranges)
+        self.assertIn(10.0, amount_ranges)
+        self.assertNotIn(-499.99, amount_ranges)
+        self.assertNotIn(10.02, amount_ranges)
+        self.assertNotIn(None, amount_ranges)
+
+
+class AmountIndexTestCase(unittest.TestCase):
+
+    def test_select(self):
+        amount_index = self._create_test_index()
+        for s, positions in [
+                ('..-500', [1, 4]),
+                ('9.99..10.01', [0, 3]),
+                ('10..,..-600', [0, 3, 4]),
+                ('-1', [])]:
+            self.assertEqual(
+                positions,
+                amount_index.select(amountindexing.parse_amount_ranges(s)),
+                s)
+
+    def test_stale_index_is_not_loaded(self):
+        self._create_test_index()
+        with open(self.source_path, 'a') as source_file:
+            source_file.write(' ')
+        self.assertIsNone(
+            amountindexing.load(self.index_path, [self.source_path]))
+
+    def _create_test_index(self):
+        class_name = self.__class__.__name__
+        method_name = traceback.extract_stack(None, 2)[0][2]
+        folder_path = os.path.join(_build_folder_path, class_name, method_name)
+        if os.path.exists(folder_path):
+            shutil.rmtree(folder_path)
+        os.makedirs(folder_path)
+
+        self.source_path = os.path.join(folder_path, 'transactions.json')
+        with open(self.source_path, 'w') as source_file:
+            source_file.write('[]')
+        self.index_path = self.source_path + '.amounts'
+        amountindexing.write(
+            self.index_path,
+            [
+                _transaction(10.0),
+                _transaction(-500.0),
+                _transaction(None),
+                _transaction(10.0),
+                _transaction(-700.0),
+                _transaction(9.0),
+            ],
+            [self.source_path])
+        return amountindexing.load(self.index_path, [self.source_path])
+
+
+def _transaction(amount):
+    x = transactions.Transaction()
+    x.type = 'sale'
+    x.description = 'SHOP'
+    x.amount = amount
+    return x
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+'''
+Tests for :mod:`caching`
+'''
+
+# Standard imports:
+import inspect
+import os
+import shutil
+import traceback
+import unittest
+
+# Project imports:
+import caching
+
+
+_this_file_path = os.path.abspath(inspect.getfile(inspect.currentframe()))
+_this_folder_path = os.path.dirname(_this_file_path)
+_python_folder_path = os.path.dirname(_this_folder_path)
+_root_folder_path = os.path.dirname(_python_folder_path)
+_build_folder_path = os.path.join(_root_folder_path, 'build')
+
+
+class CacheTestCase(unittest.TestCase):
+
+    def test_load_missing(self):
+        folder_path = self._create_test_folder()
+        self.assertIsNone(
+            caching.load(os.path.join(folder_path, 'cache'), ()))
+
+    def test_store_then_load(self):
+        folder_path = self._create_test_folder()
+        cache_path = os.path.join(folder_path, 'cache')
+        caching.store(cache_path, ('key',), [1, 2, 3])
+        self.assertEqual([1, 2, 3], caching.load(cache_path, ('key',)))
+        self.assertIsNone(caching.load(cache_path, ('other key',)))
+
+    def test_file_key_follows_content(self):
+        folder_path = self._create_test_folder()
+        data_path = os.path.join(folder_path, 'data')
+        missing_key = caching.file_key([data_path])
+        with open(data_path, 'w') as data_file:
+            data_file.write('abc')
+        abc_key = caching.file_key([data_path])
+        self.assertNotEqual(missing_key, abc_key)
+        self.assertEqual(abc_key, caching.file_key([data_path]))
+
+        stat = os.stat(data_path)
+        with open(data_path, 'w') as data_file:
+            data_file.write('xyz')
+        os.utime(data_path, (stat.st_atime, stat.st_mtime))
+        self.assertNotEqual(abc_key, caching.file_key([data_path]))
+
+    def test_corrupt_cache_is_ignored(self):
+        folder_path = self._create_test_folder()
+        cache_path = os.path.join(folder_path, 'cache')
+        with open(cache_path, 'w') as cache_file:
+            cache_file.write('not a pickle')
+        self.assertIsNone(caching.load(cache_path, ()))
+
+    def test_clear(self):
+        folder_path = self._create_test_folder()
+        cache_path = os.path.join(folder_path, 'cache')
+        caching.store(cache_path, (), [])
+        caching.clear(cache_path)
+        self.assertFalse(os.path.exists(cache_path))
+
+    def _create_test_folder(self):
+        class_name = self.__class__.__name__
+        method_name = traceback.extract_stack(None, 2)[0][2]
+        path = os.path.join(_build_folder_path, class_name, method_name)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+        return path
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,6 +8,7 @@ import unittest
 
 # Project imports:
 import classifying
+import transactions
 
 
 class classify_interactively_TestCase(unittest.TestCase):
@@ -15,7 +16,11 @@ class classify_interactively_TestCase(unittest.TestCase):
 
 
 class handle_user_input_TestCase(unittest.TestCase):
-    pass
+
+    def test_tags(self):
+        x = transactions.Transaction()
+        classifying._handle_user_input('grocery cash:20.00', [x], x)
+        self.assertEqual({'grocery': None, 'cash': 20.00}, x.tags)
 
 
 class parse_tag_TestCase(unittest.TestCase):
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+'''
+Tests for :mod:`contentindexing`
+'''
+
+# Standard imports:
+import datetime
+import inspect
+import os
+import shutil
+import traceback
+import unittest
+
+# Project imports:
+import contentindexing
+import transactions
+
+
+_this_file_path = os.path.abspath(inspect.getfile(inspect.currentframe()))
+_this_folder_path = os.path.dirname(_this_file_path)
+_python_folder_path = os.path.dirname(_this_folder_path)
+_root_folder_path = os.path.dirname(_python_folder_path)
+_build_folder_path = os.path.join(_root_folder_path, 'build')
+
+
+class content_key_TestCase(unittest.TestCase):
+
+    def test_quotes_are_dropped(self):
+        quoted = _sale(4)
+        quoted.description = '"WALGREENS #1234"'
+        self.assertEqual(
+            contentindexing.content_key(_sale(4)),
+            contentindexing.content_key(quoted))
+
+
+class ContentIndexTestCase(unittest.TestCase):
+
+    def test_count(self):
+        content_index = self._create_test_index()
+        for day, count in [(4, 2), (5, 1), (6, 0)]:
+            self.assertEqual(
+                count,
+                content_index.count(contentindexing.content_key(_sale(day))),
+                day)
+
+    def test_stale_index_is_not_loaded(self):
+        self._create_test_index()
+        with open(self.source_path, 'a') as source_file:
+            source_file.write(' ')
+        self.assertIsNone(
+            contentindexing.load(self.index_path, [self.source_path]))
+
+    def _create_test_index(self):
+        class_name = self.__class__.__name__
+        method_name = traceback.extract_stack(None, 2)[0][2]
+        folder_path = os.path.join(_build_folder_path, class_name, method_name)
+        if os.path.exists(folder_path):
+            shutil.rmtree(folder_path)
+        os.makedirs(folder_path)
+
+        self.source_path = os.path.join(folder_path, 'transactions.json')
+        with open(self.source_path, 'w') as source_file:
+            source_file.write('[]')
+        self.index_path = self.source_path + '.keys'
+        contentindexing.write(
+            self.index_path,
+            [_sale(4), _sale(5), _sale(4)],
+            [self.source_path])
+        return contentindexing.load(self.index_path, [self.source_path])
+
+
+def _sale(day):
+    x = transactions.Transaction()
+    x.type = 'sale'
+    x.trans_date = datetime.date(2018, 9, day)
+    x.description = 'WALGREENS #1234'
+    x.amount = -2.85
+    return x
+
+
+if __name__ == '__main__':
+    unittest.main()
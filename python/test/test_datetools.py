@@ -179,12 +179,90 @@ class date_as_string_TestCase(unittest.TestCase):
     pass
 
 
+class month_date_range_TestCase(unittest.TestCase):
+
+    def test_february_of_leap_year(self):
+        self.assertEqual(
+            datetools.DateRange(
+                datetime.date(2020, 2, 1), datetime.date(2020, 2, 29)),
+            datetools.month_date_range(2020, 2))
+
+    def test_december(self):
+        self.assertEqual(
+            datetools.DateRange(
+                datetime.date(2018, 12, 1), datetime.date(2018, 12, 31)),
+            datetools.month_date_range(2018, 12))
+
+
+class DateSequenceTestCase_overlaps(unittest.TestCase):
+
+    def test_date_inside(self):
+        self.assertTrue(
+            datetools.parse_date_sequence('2018-09-14').overlaps(
+                datetools.month_date_range(2018, 9)))
+
+    def test_open_range_reaching_in(self):
+        self.assertTrue(
+            datetools.parse_date_sequence('..2018-09-01').overlaps(
+                datetools.month_date_range(2018, 9)))
+
+    def test_dates_outside(self):
+        self.assertFalse(
+            datetools.parse_date_sequence(
+                '2018-08-31,2018-10-01..').overlaps(
+                    datetools.month_date_range(2018, 9)))
+
+
 class DateSequenceTestCase_contains(unittest.TestCase):
 
     def test_None(self):
         with self.assertRaises(TypeError):
             None in datetools.DateSequence([])
 
+    def test_dates_and_ranges(self):
+        date_sequence = datetools.parse_date_sequence(
+            '2018-09-20..2018-09-25,2018-09-01,..2018-08-15,2018-10-01..')
+        for day, expected in [
+                (datetime.date(2018, 8, 15), True),
+                (datetime.date(2018, 8, 16), False),
+                (datetime.date(2018, 9, 1), True),
+                (datetime.date(2018, 9, 2), False),
+                (datetime.date(2018, 9, 19), False),
+                (datetime.date(2018, 9, 20), True),
+                (datetime.date(2018, 9, 25), True),
+                (datetime.date(2018, 9, 26), False),
+                (datetime.date(2018, 10, 1), True),
+                (datetime.date(9999, 12, 31), True),
+                (datetime.date(1, 1, 1), True)]:
+            self.assertEqual(expected, day in date_sequence, day)
+
+    def test_extend(self):
+        date_sequence = datetools.parse_date_sequence('2018-09-01')
+        self.assertFalse(datetime.date(2018, 9, 2) in date_sequence)
+        date_sequence.extend(datetools.parse_date_sequence('2018-09-02'))
+        self.assertTrue(datetime.date(2018, 9, 2) in date_sequence)
+
+
+class DateSequenceTestCase_ordinal_intervals(unittest.TestCase):
+
+    def test_merged(self):
+        date_sequence = datetools.parse_date_sequence(
+            '2018-09-10..2018-09-12,2018-09-01,2018-09-11..2018-09-20,'
+            '2018-09-21,2018-09-02')
+        self.assertEqual(
+            [
+                (datetime.date(2018, 9, 1).toordinal(),
+                 datetime.date(2018, 9, 2).toordinal()),
+                (datetime.date(2018, 9, 10).toordinal(),
+                 datetime.date(2018, 9, 21).toordinal()),
+            ],
+            date_sequence.ordinal_intervals())
+
+    def test_equality_is_of_dates_as_given(self):
+        self.assertNotEqual(
+            datetools.parse_date_sequence('2018-09-01,2018-09-02'),
+            datetools.parse_date_sequence('2018-09-02,2018-09-01'))
+
 
 class DateRangeTestCase_contains(unittest.TestCase):
 
@@ -4,10 +4,28 @@ Tests for :mod:`filtering`
 '''
 
 # Standard imports:
+import argparse
+import datetime
+import inspect
+import os
+import shutil
+import StringIO
+import sys
+import traceback
 import unittest
 
 # Project imports
+import amountindexing
+import datetools
 import filtering
+import transactions
+
+
+_this_file_path = os.path.abspath(inspect.getfile(inspect.currentframe()))
+_this_folder_path = os.path.dirname(_this_file_path)
+_python_folder_path = os.path.dirname(_this_folder_path)
+_root_folder_path = os.path.dirname(_python_folder_path)
+_build_folder_path = os.path.join(_root_folder_path, 'build')
 
 class filterTransactionsTestCase(unittest.TestCase):
 
@@ -17,11 +35,262 @@ class filterTransactionsTestCase(unittest.TestCase):
 class filterTransactionsWithNonMatchingDates(unittest.TestCase):
     pass
 
+class iterateFilteredTransactionsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._original_stdout = sys.stdout
+        sys.stdout = StringIO.StringIO()
+
+    def tearDown(self):
+        sys.stdout = self._original_stdout
+
+    def test_explain(self):
+        xactions = [
+            _transaction(30, 'SHOP', {}),
+            _transaction(20, 'BANK', {'food': None}),
+            _transaction(10, 'BANK', {}),
+        ]
+        options = argparse.Namespace(
+            include_regexs=['bank'], no_tags=True, explain=True)
+        self.assertEqual(
+            [xactions[2]],
+            list(filtering.iterate_filtered_transactions(xactions, options)))
+        lines = sys.stdout.getvalue().splitlines()
+        plan_lines = lines[lines.index('Filter plan:') + 1:]
+        self.assertEqual(
+            ['STAGE', 'COST', 'PASS', 'IN', 'OUT'], plan_lines[0].split())
+        self.assertEqual(
+            [['3', '2'], ['2', '1']],
+            [line.split()[-2:] for line in plan_lines[1:]])
+
+    def test_single_pass(self):
+        xactions = [
+            _transaction(day, description, tags)
+            for day, description, tags in [
+                (30, 'WALGREENS', {}),
+                (20, 'WALGREENS', {'food': None}),
+                (19, 'TRADER JOE', {}),
+                (5, 'WALGREENS #2', {}),
+                (1, 'WALGREENS', {}),
+            ]
+        ]
+        options = argparse.Namespace(
+            dates=datetools.parse_date_sequence('2018-09-02..'),
+            include_regexs=['walgreens'],
+            exclude_regexs=['#'],
+            no_tags=True)
+        # Without a sample to plan by, the stages keep their order.
+        original_sample_size = filtering._sample_size
+        filtering._sample_size = 0
+        try:
+            filtered_xactions = filtering.iterate_filtered_transactions(
+                iter(xactions), options)
+        finally:
+            filtering._sample_size = original_sample_size
+        self.assertIs(xactions[0], next(filtered_xactions))
+        self.assertEqual('', sys.stdout.getvalue())
+        self.assertEqual([], list(filtered_xactions))
+        self.assertEqual(
+            'Filtered 1 transaction(s) for not matching include regex.\n'
+            'Filtered 1 transaction(s) for matching exclude regex.\n'
+            'Filtered 1 transaction(s) for not having tags.\n',
+            sys.stdout.getvalue())
+
+class queryTransactionsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._original_stdout = sys.stdout
+        sys.stdout = StringIO.StringIO()
+        self._original_database_path = transactions.database_path()
+
+    def tearDown(self):
+        sys.stdout = self._original_stdout
+        transactions.set_database_path(self._original_database_path)
+
+    def test_sqlite_no_tags_counts_unread(self):
+        self._use_test_database('transactions.sqlite')
+        transactions.store([
+            _transaction(30, 'SHOP', {}),
+            _transaction(20, 'BANK', {'food': None}),
+            _transaction(10, 'BANK', {}),
+        ])
+        options = argparse.Namespace(
+            include_regexs=['bank'], no_tags=True, explain=True)
+        self.assertEqual(
+            [10],
+            [x.date.day for x in filtering.query_transactions(options)])
+        lines = sys.stdout.getvalue().splitlines()
+        self.assertEqual(
+            [
+                'Filtered 1 transaction(s) for not having tags.',
+                'Filtered 1 transaction(s) for not matching include regex.',
+            ],
+            lines[:2])
+        plan_lines = lines[lines.index('Filter plan:') + 2:]
+        self.assertEqual(
+            [['no-tags', '3', '2'], ['include', '2', '1']],
+            [[line.split()[0]] + line.split()[-2:] for line in plan_lines])
+
+    def test_amount_index_counts_unread(self):
+        self._use_test_database('transactions.json')
+        xactions = [
+            _transaction(day, 'SHOP', {}) for day in (30, 20, 10)
+        ]
+        for x, amount in zip(xactions, [-600.0, 5.0, -500.0]):
+            x.amount = amount
+        transactions.store(xactions)
+        options = argparse.Namespace(
+            amounts=amountindexing.parse_amount_ranges('..-500'),
+            explain=True)
+        self.assertEqual(
+            [30, 10],
+            [x.date.day for x in filtering.query_transactions(options)])
+        lines = sys.stdout.getvalue().splitlines()
+        self.assertEqual(
+            'Filtered 1 transaction(s) for amount out of range.', lines[0])
+        plan_lines = lines[lines.index('Filter plan:') + 2:]
+        self.assertEqual(
+            [['amount', '3', '2']],
+            [[line.split()[0]] + line.split()[-2:] for line in plan_lines])
+
+    def _use_test_database(self, file_name):
+        class_name = self.__class__.__name__
+        method_name = traceback.extract_stack(None, 2)[0][2]
+        folder_path = os.path.join(_build_folder_path, class_name, method_name)
+        if os.path.exists(folder_path):
+            shutil.rmtree(folder_path)
+        os.makedirs(folder_path)
+        transactions.set_database_path(os.path.join(folder_path, file_name))
+
+class planFilterStagesTestCase(unittest.TestCase):
+
+    def test_stage_that_drops_nothing_runs_last(self):
+        sample = [_transaction(day, 'SHOP', {}) for day in (1, 2, 3)]
+        sample[0].tags = {'food': None}
+        stages = filtering._filter_stages(
+            argparse.Namespace(include_regexs=['shop'], no_tags=True), None)
+        self.assertEqual(
+            ['include', 'no-tags'], [stage.name for stage in stages])
+        stages = filtering._plan_filter_stages(stages, sample)
+        self.assertEqual(
+            ['no-tags', 'include'], [stage.name for stage in stages])
+        self.assertAlmostEqual(2.0 / 3, stages[0].pass_rate)
+        self.assertEqual(1.0, stages[1].pass_rate)
+
+    def test_ties_keep_order_of_kinds(self):
+        sample = [_transaction(1, 'SHOP', {}), _transaction(2, 'BANK', {})]
+        stages = filtering._filter_stages(
+            argparse.Namespace(
+                include_regexs=['shop'], exclude_regexs=['bank']),
+            None)
+        stages = filtering._plan_filter_stages(stages, sample)
+        self.assertEqual(
+            ['include', 'exclude'], [stage.name for stage in stages])
+        self.assertEqual(stages[0].cost, stages[1].cost)
+        self.assertEqual(0.5, stages[1].pass_rate)
+
+    def test_empty_sample_keeps_order(self):
+        stages = filtering._filter_stages(
+            argparse.Namespace(include_regexs=['shop'], no_tags=True), None)
+        self.assertEqual(
+            stages, filtering._plan_filter_stages(stages, []))
+
+class sliceTransactionsWithMatchingDatesTestCase(unittest.TestCase):
+
+    def test_matches_filter(self):
+        xactions = [_transaction(day) for day in (30, 20, 20, 19, 5, 1)]
+        xactions.append(transactions.Transaction())
+        for dates in [
+                '2018-09-20',
+                '2018-09-02..2018-09-19',
+                '..2018-09-05,2018-09-30',
+                '2018-09-20..,2018-09-01',
+                '2018-08-01..2018-08-31',
+                '2018-09-21..2018-09-29']:
+            date_sequence = datetools.parse_date_sequence(dates)
+            self.assertEqual(
+                [x for x in xactions if x.date and x.date in date_sequence],
+                filtering._slice_transactions_with_matching_dates(
+                    xactions, date_sequence),
+                dates)
+
+    def test_touches_only_matching_dates(self):
+        xactions = [_transaction(day) for day in xrange(30, 0, -1)]
+        filtering._slice_transactions_with_matching_dates(
+            xactions, datetools.parse_date_sequence('2018-09-10'))
+        self.assertLessEqual(
+            len([
+                x for x in xactions
+                if x._date is not transactions._undecoded
+            ]),
+            10)
+
 class filterTransactionsWithNonMatchingDescriptions(unittest.TestCase):
     pass
 
 class filterTransactionsWithoutTagsTestCase(unittest.TestCase):
     pass
 
+class DescriptionMatcherTestCase(unittest.TestCase):
+
+    def test_literals_ignore_case(self):
+        matcher = filtering._DescriptionMatcher(['walgreens #', 'Trader'])
+        self.assertEqual(['walgreens #'], matcher.literals[:1])
+        self.assertIsNone(matcher.combined_regex)
+        self.assertTrue(matcher('WALGREENS #1234'))
+        self.assertTrue(matcher("POS DEBIT TRADER JOE'S"))
+        self.assertFalse(matcher('AMAZON.COM'))
+
+    def test_non_ascii(self):
+        # u'caf\xe9' as the command line gives it, in UTF-8
+        matcher = filtering._DescriptionMatcher(
+            ['caf\xc3\xa9', '^th\xc3\xa9.'])
+        self.assertTrue(matcher(u'LE CAF\xc9 ROUGE'))
+        self.assertTrue(matcher('LE CAF\xc3\xa9 ROUGE'))
+        self.assertTrue(matcher(u'TH\xc9S'))
+        self.assertFalse(matcher(u'CAFE'))
+
+    def test_regexs_are_combined(self):
+        matcher = filtering._DescriptionMatcher(['^amazon', 'joe.s$', 'xz|cab'])
+        self.assertEqual([], matcher.literals)
+        self.assertEqual([], matcher.separate_regexs)
+        self.assertTrue(matcher('AMAZON.COM'))
+        self.assertTrue(matcher("TRADER JOE'S"))
+        self.assertFalse(matcher('THRIFT BOOKS'))
+        self.assertFalse(matcher('WALGREENS'))
+        self.assertTrue(matcher('CAB'))
+
+    def test_backreference_is_separate(self):
+        matcher = filtering._DescriptionMatcher(['(x)y', r'(o)\1'])
+        self.assertEqual(1, len(matcher.separate_regexs))
+        self.assertTrue(matcher('BOOKS'))
+        self.assertFalse(matcher('BOKS'))
+
+    def test_named_groups_are_separate(self):
+        matcher = filtering._DescriptionMatcher(
+            ['(?P<m>AMAZON) 1$', '(?P<m>SHELL) 2$'])
+        self.assertEqual(2, len(matcher.separate_regexs))
+        self.assertTrue(matcher('AMAZON 1'))
+        self.assertTrue(matcher('SHELL 2'))
+        self.assertFalse(matcher('SHELL 1'))
+
+    def test_inline_flags_are_separate(self):
+        matcher = filtering._DescriptionMatcher(['(?x) a m a z o n', 'b c'])
+        self.assertEqual(['b c'], matcher.literals)
+        self.assertEqual(1, len(matcher.separate_regexs))
+        self.assertTrue(matcher('AMAZON'))
+        self.assertTrue(matcher('B C'))
+
+    def test_none(self):
+        self.assertFalse(filtering._DescriptionMatcher(['a'])(None))
+
+def _transaction(day, description=None, tags=None):
+    x = transactions.Transaction()
+    x.trans_date = datetime.date(2018, 9, day)
+    x.description = description
+    if tags is not None:
+        x.tags = tags
+    return x
+
 if __name__ == '__main__':
     unittest.main()
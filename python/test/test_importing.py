@@ -4,17 +4,303 @@ Tests for :mod:`activity`
 '''
 
 # Standard imports:
+import contextlib
 import datetime
+import gzip
+import inspect
+import os
+import shutil
+import StringIO
+import tarfile
+import traceback
 import unittest
+import zipfile
 
 # Project imports:
 import importing
+import transactions
+
+
+_this_file_path = os.path.abspath(inspect.getfile(inspect.currentframe()))
+_this_folder_path = os.path.dirname(_this_file_path)
+_python_folder_path = os.path.dirname(_this_folder_path)
+_root_folder_path = os.path.dirname(_python_folder_path)
+_build_folder_path = os.path.join(_root_folder_path, 'build')
 
 
 class parse_file_TestCase(unittest.TestCase):
     pass  # TODO
 
 
+class iterate_file_TestCase(unittest.TestCase):
+
+    def test_quoted_and_unquoted_commas(self):
+        folder_path = _create_test_folder(self)
+        path = _write_activity_file(folder_path, 'a.CSV', [], [
+            'Sale,08/18/2018,08/19/2018,"THRIFT BOOKS, LLC",-43.87',
+            'Sale,08/18/2018,08/19/2018,THRIFT BOOKS GLOBAL, LLC,-43.87',
+        ])
+        self.assertEqual(
+            ['THRIFT BOOKS, LLC', 'THRIFT BOOKS GLOBAL, LLC'],
+            [x.description for x in importing.iterate_file(path)])
+
+    def test_skips_payments_and_blank_lines(self):
+        folder_path = _create_test_folder(self)
+        path = _write_activity_file(folder_path, 'a.CSV', [3], [
+            '',
+            'Payment,09/04/2018,09/04/2018,THANK YOU,100.00',
+        ])
+        self.assertEqual(
+            ['sale'], [x.type for x in importing.iterate_file(path)])
+
+    def test_row_errors(self):
+        folder_path = _create_test_folder(self)
+        path = _write_activity_file(folder_path, 'a.CSV', [3], [
+            'Sale,09/04/2018,09/04/2018,WALGREENS #1234,oops',
+            'Sale,09/05/2018',
+            'Sale,09/06/2018,09/06/2018,WALGREENS #1234,oops',
+        ])
+        row_errors = importing.RowErrors(path)
+        xactions = list(importing.iterate_file(path, row_errors))
+        self.assertEqual([3], [x.trans_date.day for x in xactions])
+        self.assertEqual(3, len(row_errors))
+        self.assertEqual(
+            [[3, 5], [4]], row_errors.line_numbers_by_message.values())
+
+
+class RowErrors_TestCase(unittest.TestCase):
+
+    def test_summary(self):
+        row_errors = importing.RowErrors('a.CSV')
+        for line_number in xrange(2, 9):
+            row_errors.add(line_number, ValueError, ValueError('bad amount'))
+        row_errors.add(9, IndexError, IndexError('list index out of range'))
+        self.assertEqual(
+            'Skipped 8 rows of "a.CSV":\n'
+            '    ValueError: bad amount (line 2, 3, 4, 5, 6 and 2 more)\n'
+            '    IndexError: list index out of range (line 9)\n',
+            row_errors.summary())
+
+
+class parse_files_TestCase(unittest.TestCase):
+
+    def test_in_order(self):
+        folder_path = _create_test_folder(self)
+        paths = [
+            _write_activity_file(folder_path, 'a.CSV', [3, 4]),
+            _write_activity_file(folder_path, 'b.CSV', [5]),
+            _write_activity_file(folder_path, 'c.CSV', [6, 7, 8]),
+        ]
+        parsed_files = importing.parse_files(paths, process_count=2)
+        self.assertEqual(paths, [p.path for p in parsed_files])
+        self.assertEqual(
+            [[3, 4], [5], [6, 7, 8]],
+            [[x.trans_date.day for x in p.xactions] for p in parsed_files])
+        self.assertEqual(
+            [[3, 4], [5], [6, 7, 8]],
+            [[x.date.day for x in p.xactions] for p in parsed_files])
+        self.assertEqual([None] * 3, [p.error for p in parsed_files])
+
+    def test_error_is_per_file(self):
+        folder_path = _create_test_folder(self)
+        paths = [
+            os.path.join(folder_path, 'missing.CSV'),
+            _write_activity_file(folder_path, 'b.CSV', [5]),
+        ]
+        for process_count in (1, 2):
+            parsed_files = importing.parse_files(paths, process_count)
+            self.assertIn('IOError', parsed_files[0].error)
+            self.assertEqual([], parsed_files[0].xactions)
+            self.assertIsNone(parsed_files[1].error)
+            self.assertEqual(1, len(parsed_files[1].xactions))
+
+
+
+def _create_test_folder(test_case):
+    class_name = test_case.__class__.__name__
+    method_name = traceback.extract_stack(None, 2)[0][2]
+    path = os.path.join(_build_folder_path, class_name, method_name)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+    return path
+
+
+def _write_activity_file(folder_path, file_name, days, extra_lines=()):
+    path = os.path.join(folder_path, file_name)
+    with open(path, 'w') as activity_file:
+        activity_file.write(_activity_text(days, extra_lines))
+    return path
+
+
+def _activity_text(days, extra_lines=()):
+    lines = ['Type,Trans Date,Post Date,Description,Amount']
+    for day in days:
+        lines.append(
+            'Sale,09/%02d/2018,09/%02d/2018,WALGREENS #1234,-2.85' % (
+                day, day))
+    lines.extend(extra_lines)
+    return ''.join([line + '\n' for line in lines])
+
+
+class bundle_TestCase(unittest.TestCase):
+
+    def test_gzip(self):
+        path = os.path.join(_create_test_folder(self), 'a.CSV.gz')
+        with contextlib.closing(gzip.GzipFile(path, 'wb')) as gzip_file:
+            gzip_file.write(_activity_text([3, 4]))
+        self.assertEqual(
+            [3, 4], [x.trans_date.day for x in importing.parse_file(path)])
+        self.assertEqual(
+            [3, 4], [x.trans_date.day for x in importing.iterate_file(path)])
+
+    def test_zip(self):
+        path = os.path.join(_create_test_folder(self), 'bundle.zip')
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('2018-09/a.CSV', _activity_text([3, 4]))
+            archive.writestr('README.txt', 'Not activity')
+            archive.writestr('b.csv', _activity_text([5]))
+        self.assertEqual(
+            [3, 4, 5],
+            [x.trans_date.day for x in importing.parse_file(path)])
+        for process_count in (1, 2):
+            parsed_files = importing.parse_files([path], process_count)
+            self.assertEqual(
+                [path + ':2018-09/a.CSV', path + ':b.csv'],
+                [parsed_file.path for parsed_file in parsed_files])
+            self.assertEqual(
+                [2, 1],
+                [len(parsed_file.xactions) for parsed_file in parsed_files])
+
+    def test_tar_gz(self):
+        folder_path = _create_test_folder(self)
+        member_path = _write_activity_file(folder_path, 'a.CSV', [3, 4])
+        path = os.path.join(folder_path, 'bundle.tar.gz')
+        with tarfile.open(path, 'w:gz') as archive:
+            archive.add(member_path, 'a.CSV')
+        parsed_files = importing.parse_files([path])
+        self.assertEqual([path + ':a.CSV'], [p.path for p in parsed_files])
+        self.assertEqual(
+            [3, 4], [x.trans_date.day for x in parsed_files[0].xactions])
+
+    def test_corrupt_zip(self):
+        folder_path = _create_test_folder(self)
+        path = _write_activity_file(folder_path, 'bundle.zip', [3])
+        parsed_files = importing.parse_files([path])
+        self.assertEqual([path], [p.path for p in parsed_files])
+        self.assertIn('BadZipfile', parsed_files[0].error)
+
+
+class merge_TestCase(unittest.TestCase):
+
+    def test_into_empty(self):
+        xactions = []
+        new_xactions = importing.merge(xactions, [[_sale(3), _sale(5)]])
+        self.assertEqual([5, 3], [x.date.day for x in xactions])
+        self.assertEqual([3, 5], [x.date.day for x in new_xactions])
+
+    def test_skips_present_and_keeps_tags(self):
+        present = _sale(4)
+        present.add_tags({'food': None})
+        xactions = [_sale(6), present, _sale(2)]
+        new_xactions = importing.merge(
+            xactions, [[_sale(5), _sale(4), _sale(3)]])
+        self.assertEqual([5, 3], [x.date.day for x in new_xactions])
+        self.assertEqual([6, 5, 4, 3, 2], [x.date.day for x in xactions])
+        self.assertIs(present, xactions[2])
+        self.assertEqual({'food': None}, xactions[2].tags)
+
+    def test_differing_amount_is_new(self):
+        xactions = [_sale(4)]
+        imported = _sale(4)
+        imported.amount = -2.00
+        self.assertEqual([imported], importing.merge(xactions, [[imported]]))
+        self.assertEqual(2, len(xactions))
+
+    def test_identical_within_file(self):
+        xactions = [_sale(4)]
+        new_xactions = importing.merge(
+            xactions, [[_sale(4), _sale(4), _sale(4)]])
+        self.assertEqual(2, len(new_xactions))
+        self.assertEqual(3, len(xactions))
+
+    def test_overlapping_files(self):
+        xactions = []
+        new_xactions = importing.merge(
+            xactions, [[_sale(4), _sale(3)], [_sale(5), _sale(4)]])
+        self.assertEqual([4, 3, 5], [x.date.day for x in new_xactions])
+        self.assertEqual([5, 4, 3], [x.date.day for x in xactions])
+
+    def test_quotes_of_older_imports(self):
+        present = _sale(4)
+        present.description = '"WALGREENS #1234"'
+        self.assertEqual([], importing.merge([present], [[_sale(4)]]))
+
+    def test_undated_sort_last(self):
+        undated = transactions.Transaction()
+        undated.description = 'UNDATED'
+        xactions = [_sale(4)]
+        importing.merge(xactions, [[undated, _sale(5)]])
+        self.assertEqual([5, 4, None], [x.date and x.date.day for x in xactions])
+
+
+class store_new_TestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._original_database_path = transactions.database_path()
+
+    def tearDown(self):
+        transactions.set_database_path(self._original_database_path)
+
+    def test_journals_only_new(self):
+        self._use_test_database()
+        present = _sale(4)
+        present.add_tags({'food': None})
+        transactions.store([_sale(6), present])
+        with open(transactions.database_path()) as database_file:
+            database = database_file.read()
+
+        new_xactions = importing.store_new(
+            [[_sale(5), _sale(4)], [_sale(5)]])
+        self.assertEqual([5], [x.date.day for x in new_xactions])
+        self.assertEqual([], importing.store_new([[_sale(5), _sale(6)]]))
+
+        with open(transactions.database_path()) as database_file:
+            self.assertEqual(database, database_file.read())
+        xactions = transactions.load()
+        self.assertEqual([6, 5, 4], [x.date.day for x in xactions])
+        self.assertEqual({'food': None}, xactions[2].tags)
+
+    def test_without_content_index(self):
+        self._use_test_database()
+        transactions.store([_sale(6)])
+        os.remove(transactions.database_path() + '.keys')
+
+        new_xactions = importing.store_new([[_sale(6), _sale(5)]])
+        self.assertEqual([5], [x.date.day for x in new_xactions])
+        self.assertEqual(
+            [6, 5], [x.date.day for x in transactions.load()])
+
+    def _use_test_database(self):
+        class_name = self.__class__.__name__
+        method_name = traceback.extract_stack(None, 2)[0][2]
+        path = os.path.join(_build_folder_path, class_name, method_name)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+        transactions.set_database_path(
+            os.path.join(path, 'transactions.json'))
+
+
+def _sale(day):
+    x = transactions.Transaction()
+    x.type = 'sale'
+    x.trans_date = datetime.date(2018, 9, day)
+    x.description = 'WALGREENS #1234'
+    x.amount = -2.85
+    return x
+
+
 class parse_key_line_TestCase(unittest.TestCase):
 
     def test_debit_card(self):
@@ -42,25 +328,23 @@ class TransactionKeyTestCase(unittest.TestCase):
     pass  # TODO
 
 
-class parse_line_TestCase(unittest.TestCase):
+class iterate_rows_TestCase(unittest.TestCase):
 
-    debit_key = importing._parse_key_line(
-        '''Details,Posting Date,Description,Amount,Type,Balance,Check or Slip #''')
-    credit_key = importing._parse_key_line(
-        '''Type,Trans Date,Post Date,Description,Amount''')
+    debit_key = '''Details,Posting Date,Description,Amount,Type,Balance,Check or Slip #'''
+    credit_key = '''Type,Trans Date,Post Date,Description,Amount'''
 
     def test_debit_card_at_trader_joes(self):
         line = '''DEBIT,09/07/2018,"POS DEBIT TRADER JOE'S # 123 HAPPY AZ",-10.80,MISC_DEBIT, ,,'''
-        transaction = importing._parse_line(self.debit_key, line)
+        transaction = _parse_line(self.debit_key, line)
         self.assertIsNotNone(transaction)
         self.assertEqual('misc_debit', transaction.type)
         self.assertEqual(datetime.date(2018, 9, 7), transaction.post_date)
-        self.assertEqual('''"POS DEBIT TRADER JOE'S # 123 HAPPY AZ"''', transaction.description)
+        self.assertEqual('''POS DEBIT TRADER JOE'S # 123 HAPPY AZ''', transaction.description)
         self.assertEqual(-10.80, transaction.amount)
 
     def test_credit_card_at_walgreens(self):
         line = '''Sale,09/05/2018,09/06/2018,WALGREENS #1234,-2.85'''
-        transaction = importing._parse_line(self.credit_key, line)
+        transaction = _parse_line(self.credit_key, line)
         self.assertIsNotNone(transaction)
         self.assertEqual('sale', transaction.type)
         self.assertEqual(datetime.date(2018, 9, 5), transaction.trans_date)
@@ -69,7 +353,7 @@ class parse_line_TestCase(unittest.TestCase):
         self.assertEqual(-2.85, transaction.amount)
 
     def test_credit_card_with_comma_in_description(self):
-        transaction = importing._parse_line(
+        transaction = _parse_line(
             self.credit_key,
             '''Sale,08/18/2018,08/19/2018,THRIFT BOOKS GLOBAL, LLC,-43.87''')
         self.assertIsNotNone(transaction)
@@ -80,16 +364,92 @@ class parse_line_TestCase(unittest.TestCase):
         self.assertEqual(-43.87, transaction.amount)
 
 
-class split_transaction_line_TestCase(unittest.TestCase):
-    pass  # TODO
+def _parse_line(key_line, line):
+    '''
+    Parse the single `line` of account activity laid out as `key_line`
+    says.
+    '''
 
+    activity_file = StringIO.StringIO(key_line + '\n' + line + '\n')
+    return next(importing._iterate_rows(activity_file))
 
-class parse_transaction_type_TestCase(unittest.TestCase):
-    pass  # TODO
 
+class join_unquoted_commas_TestCase(unittest.TestCase):
 
-class parse_transaction_date_TestCase(unittest.TestCase):
-    pass  # TODO
+    def test_trailing_blank_token_is_kept(self):
+        self.assertEqual(
+            ['DEBIT', 'A, B', ' ', ''],
+            importing._join_unquoted_commas(['DEBIT', 'A', ' B', ' ', '']))
+
+
+class register_format_TestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._original_formats = list(importing._formats)
+
+    def tearDown(self):
+        importing._formats[:] = self._original_formats
+
+    def test_registered_format_is_detected(self):
+        importing.register_format('Example bank', {
+            'Date': 'trans_date',
+            'Payee': 'description',
+            'Debit': 'amount',
+        })
+        key = importing._parse_key_line('Date,Payee,Memo,Debit')
+        self.assertEqual('Example bank', key.format_name)
+        self.assertEqual(0, key.trans_date)
+        self.assertEqual(1, key.description)
+        self.assertEqual(3, key.amount)
+        self.assertIsNone(key.type)
+
+    def test_most_specific_format_wins(self):
+        key = importing._parse_key_line(
+            'Details,Posting Date,Description,Amount,Type,Balance')
+        self.assertEqual('Chase checking', key.format_name)
+
+    def test_unregistered_header_uses_generic_names(self):
+        key = importing._parse_key_line('Amount,Memo,Post Date')
+        self.assertIsNone(key.format_name)
+        self.assertEqual(0, key.amount)
+        self.assertEqual(2, key.post_date)
+
+
+class create_row_parser_TestCase(unittest.TestCase):
+
+    def test_reads_only_keyed_columns(self):
+        key = importing._parse_key_line('Amount,Memo,Post Date')
+        parse_row = importing._create_row_parser(
+            key, importing._parse_dashed_date)
+        x = parse_row(['-2.85', 'ignored', '2018-09-06'])
+        self.assertEqual(-2.85, x.amount)
+        self.assertEqual(datetime.date(2018, 9, 6), x.post_date)
+        self.assertIsNone(x.trans_date)
+        self.assertIsNone(x.description)
+        self.assertIsNone(x.type)
+
+    def test_same_date_is_parsed_once(self):
+        key = importing._parse_key_line('Trans Date,Post Date')
+        parse_row = importing._create_row_parser(
+            key, importing._parse_slashed_date)
+        x = parse_row(['09/06/2018', '09/06/2018'])
+        self.assertIs(x.trans_date, x.post_date)
+
+
+class detect_date_parser_TestCase(unittest.TestCase):
+
+    key = importing._parse_key_line('Description,Trans Date')
+
+    def test_slashed(self):
+        self.assertIs(
+            importing._parse_slashed_date,
+            importing._detect_date_parser(self.key, [['A', '09/06/2018']]))
+
+    def test_dashed_after_short_row(self):
+        self.assertIs(
+            importing._parse_dashed_date,
+            importing._detect_date_parser(
+                self.key, [['A'], ['B', '2018-09-06']]))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+'''
+Tests for :mod:`indexing`
+'''
+
+# Standard imports:
+import inspect
+import os
+import shutil
+import traceback
+import unittest
+
+# Project imports:
+import filtering
+import indexing
+import transactions
+
+
+_this_file_path = os.path.abspath(inspect.getfile(inspect.currentframe()))
+_this_folder_path = os.path.dirname(_this_file_path)
+_python_folder_path = os.path.dirname(_this_folder_path)
+_root_folder_path = os.path.dirname(_python_folder_path)
+_build_folder_path = os.path.join(_root_folder_path, 'build')
+
+
+class required_literals_TestCase(unittest.TestCase):
+
+    def test_literal(self):
+        self.assertEqual([[u'thrift']], indexing.required_literals('thrift'))
+
+    def test_literals_around_special_characters(self):
+        self.assertEqual(
+            [[u'trader', u'joe']],
+            indexing.required_literals('trader.*joe'))
+
+    def test_alternatives(self):
+        self.assertEqual(
+            [[u'foo'], [u'bar']], indexing.required_literals('foo|bar'))
+
+    def test_optional_group_requires_nothing(self):
+        self.assertEqual(
+            [[u'cafe']], indexing.required_literals('cafe(teria)?'))
+
+    def test_invalid_regex_requires_nothing(self):
+        self.assertEqual([[]], indexing.required_literals('(unclosed'))
+
+
+class matching_rows_TestCase(unittest.TestCase):
+
+    def test_literal(self):
+        index_path = self._create_test_index()
+        self.assertEqual(
+            [0, 2], self._matching_rows(index_path, ['thrift']))
+
+    def test_ignores_case(self):
+        index_path = self._create_test_index()
+        self.assertEqual([1], self._matching_rows(index_path, ['Joe']))
+
+    def test_alternatives(self):
+        index_path = self._create_test_index()
+        self.assertEqual(
+            [0, 1, 2], self._matching_rows(index_path, ['thrift|joe']))
+
+    def test_unindexable_regex_checks_every_description(self):
+        index_path = self._create_test_index()
+        self.assertEqual([3], self._matching_rows(index_path, [u'^caf.$']))
+
+    def test_no_match(self):
+        index_path = self._create_test_index()
+        self.assertEqual([], self._matching_rows(index_path, ['walgreens']))
+
+    def test_is_current(self):
+        index_path = self._create_test_index()
+        source_path = index_path[:-len('.index')]
+        self.assertTrue(indexing.is_current(index_path, source_path))
+        with open(source_path, 'a') as source_file:
+            source_file.write(' ')
+        self.assertFalse(indexing.is_current(index_path, source_path))
+
+    def _matching_rows(self, index_path, regexs):
+        return indexing.matching_rows(
+            index_path, filtering._DescriptionMatcher(regexs))
+
+    def _create_test_index(self):
+        class_name = self.__class__.__name__
+        method_name = traceback.extract_stack(None, 2)[0][2]
+        folder_path = os.path.join(_build_folder_path, class_name, method_name)
+        if os.path.exists(folder_path):
+            shutil.rmtree(folder_path)
+        os.makedirs(folder_path)
+
+        source_path = os.path.join(folder_path, 'transactions.json')
+        with open(source_path, 'w') as source_file:
+            source_file.write('[]')
+        index_path = source_path + '.index'
+        indexing.write(
+            index_path,
+            [
+                _transaction('THRIFT BOOKS'),
+                _transaction('TRADER JOE\'S'),
+                _transaction('THRIFT BOOKS'),
+                _transaction(u'Caf\xe9'),
+                _transaction(None),
+            ],
+            source_path)
+        return index_path
+
+
+def _transaction(description):
+    x = transactions.Transaction()
+    x.type = 'sale'
+    x.description = description
+    x.amount = -1.0
+    return x
+
+
+if __name__ == '__main__':
+    unittest.main()
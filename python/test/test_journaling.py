@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+'''
+Tests for :mod:`journaling`
+'''
+
+# Standard imports:
+import inspect
+import os
+import shutil
+import traceback
+import unittest
+
+# Project imports:
+import journaling
+
+
+_this_file_path = os.path.abspath(inspect.getfile(inspect.currentframe()))
+_this_folder_path = os.path.dirname(_this_file_path)
+_python_folder_path = os.path.dirname(_this_folder_path)
+_root_folder_path = os.path.dirname(_python_folder_path)
+_build_folder_path = os.path.join(_root_folder_path, 'build')
+
+
+class JournalTestCase(unittest.TestCase):
+
+    def test_iterate_missing(self):
+        journal = self._create_journal()
+        self.assertEqual([], list(journal.iterate()))
+
+    def test_append_then_iterate(self):
+        journal = self._create_journal()
+        journal.append([{'op': 'tags', 'index': 0, 'tags': {'food': None}}])
+        journal.append([{'op': 'tags', 'index': 1, 'tags': {}}])
+        self.assertEqual(
+            [
+                {'op': 'tags', 'index': 0, 'tags': {'food': None}},
+                {'op': 'tags', 'index': 1, 'tags': {}},
+            ],
+            list(journal.iterate()))
+
+    def test_torn_final_record_is_ignored(self):
+        journal = self._create_journal()
+        journal.append([{'op': 'tags', 'index': 0, 'tags': {}}])
+        with open(journal.path, 'a') as journal_file:
+            journal_file.write('{"op": "ta')
+        self.assertEqual(
+            [{'op': 'tags', 'index': 0, 'tags': {}}],
+            list(journal.iterate()))
+
+    def test_append_after_torn_final_record(self):
+        journal = self._create_journal()
+        journal.append([{'op': 'tags', 'index': 0, 'tags': {}}])
+        with open(journal.path, 'a') as journal_file:
+            journal_file.write('{"op": "ta')
+        journal.append([{'op': 'tags', 'index': 1, 'tags': {}}])
+        journal.append([{'op': 'tags', 'index': 2, 'tags': {}}])
+        self.assertEqual(
+            [
+                {'op': 'tags', 'index': 0, 'tags': {}},
+                {'op': 'tags', 'index': 1, 'tags': {}},
+                {'op': 'tags', 'index': 2, 'tags': {}},
+            ],
+            list(journal.iterate()))
+
+    def test_append_after_torn_only_record(self):
+        journal = self._create_journal()
+        with open(journal.path, 'a') as journal_file:
+            journal_file.write('{"op": "ta')
+        journal.append([{'op': 'tags', 'index': 0, 'tags': {}}])
+        self.assertEqual(
+            [{'op': 'tags', 'index': 0, 'tags': {}}],
+            list(journal.iterate()))
+
+    def test_corrupt_record_raises(self):
+        journal = self._create_journal()
+        with open(journal.path, 'a') as journal_file:
+            journal_file.write('{"op": "ta\n')
+        journal.append([{'op': 'tags', 'index': 0, 'tags': {}}])
+        with self.assertRaises(journaling.JournalError):
+            list(journal.iterate())
+
+    def test_clear(self):
+        journal = self._create_journal()
+        journal.append([{'op': 'tags', 'index': 0, 'tags': {}}])
+        journal.clear()
+        self.assertFalse(journal.exists)
+        self.assertEqual([], list(journal.iterate()))
+
+    def _create_journal(self):
+        class_name = self.__class__.__name__
+        method_name = traceback.extract_stack(None, 2)[0][2]
+        path = os.path.join(_build_folder_path, class_name, method_name)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+        return journaling.Journal(os.path.join(path, 'transactions.journal'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+'''
+Tests for :mod:`manifests`
+'''
+
+# Standard imports:
+import inspect
+import os
+import shutil
+import traceback
+import unittest
+
+# Project imports:
+import manifests
+
+
+_this_file_path = os.path.abspath(inspect.getfile(inspect.currentframe()))
+_this_folder_path = os.path.dirname(_this_file_path)
+_python_folder_path = os.path.dirname(_this_folder_path)
+_root_folder_path = os.path.dirname(_python_folder_path)
+_build_folder_path = os.path.join(_root_folder_path, 'build')
+
+
+class ManifestTestCase(unittest.TestCase):
+
+    def test_unrecorded(self):
+        manifest, activity_path = self._create_manifest()
+        self.assertFalse(manifest.is_unchanged(activity_path))
+
+    def test_recorded_survives_save(self):
+        manifest, activity_path = self._create_manifest()
+        manifest.record(activity_path)
+        manifest.save()
+        self.assertTrue(
+            manifests.Manifest(manifest.path).is_unchanged(activity_path))
+
+    def test_changed_content(self):
+        manifest, activity_path = self._create_manifest()
+        manifest.record(activity_path)
+        with open(activity_path, 'a') as activity_file:
+            activity_file.write('Sale,09/06/2018,09/06/2018,CAFE,-3.00\n')
+        self.assertFalse(manifest.is_unchanged(activity_path))
+
+    def test_touched_but_unchanged(self):
+        manifest, activity_path = self._create_manifest()
+        manifest.record(activity_path)
+        stat = os.stat(activity_path)
+        os.utime(activity_path, (stat.st_atime, stat.st_mtime + 10))
+        self.assertTrue(manifest.is_unchanged(activity_path))
+        self.assertEqual(
+            os.stat(activity_path).st_mtime,
+            manifest.entries[os.path.abspath(activity_path)][1])
+
+    def test_same_size_other_content(self):
+        manifest, activity_path = self._create_manifest()
+        manifest.record(activity_path)
+        stat = os.stat(activity_path)
+        with open(activity_path, 'w') as activity_file:
+            activity_file.write('Type,Trans Date,Post Date,Description,Amoun!\n')
+        os.utime(activity_path, (stat.st_atime, stat.st_mtime + 10))
+        self.assertFalse(manifest.is_unchanged(activity_path))
+
+    def test_removed(self):
+        manifest, activity_path = self._create_manifest()
+        manifest.record(activity_path)
+        os.remove(activity_path)
+        self.assertFalse(manifest.is_unchanged(activity_path))
+
+    def _create_manifest(self):
+        class_name = self.__class__.__name__
+        method_name = traceback.extract_stack(None, 2)[0][2]
+        path = os.path.join(_build_folder_path, class_name, method_name)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+        activity_path = os.path.join(path, 'a.CSV')
+        with open(activity_path, 'w') as activity_file:
+            activity_file.write('Type,Trans Date,Post Date,Description,Amount\n')
+        manifest = manifests.Manifest(
+            os.path.join(path, 'transactions.json.manifest'))
+        return manifest, activity_path
+
+
+if __name__ == '__main__':
+    unittest.main()
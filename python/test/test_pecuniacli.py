@@ -6,13 +6,25 @@ Tests for :mod:`pecuniacli`
 # Standard imports
 import contextlib
 import datetime
+import inspect
+import os
+import shutil
 import StringIO
 import sys
+import traceback
 import unittest
 
 # Project imports:
 import datetools
 import pecuniacli
+import transactions
+
+
+_this_file_path = os.path.abspath(inspect.getfile(inspect.currentframe()))
+_this_folder_path = os.path.dirname(_this_file_path)
+_python_folder_path = os.path.dirname(_this_folder_path)
+_root_folder_path = os.path.dirname(_python_folder_path)
+_build_folder_path = os.path.join(_root_folder_path, 'build')
 
 
 @contextlib.contextmanager
@@ -25,8 +37,58 @@ def _captured_stderr():
         sys.stderr = sys.__stderr__
 
 
+@contextlib.contextmanager
+def _captured_stdout():
+    output = StringIO.StringIO()
+    sys.stdout = output
+    try:
+        yield output
+    finally:
+        sys.stdout = sys.__stdout__
+
+
 class mainTestCase(unittest.TestCase):
-    pass
+
+    def setUp(self):
+        self.argv = sys.argv
+        self.database_path = transactions.database_path()
+
+    def tearDown(self):
+        sys.argv = self.argv
+        transactions.set_database_path(self.database_path)
+
+    def test_import_jobs(self):
+        folder_path = self._create_test_folder()
+        paths = []
+        for file_name, day in [('a.CSV', 3), ('b.CSV', 4)]:
+            path = os.path.join(folder_path, file_name)
+            with open(path, 'w') as activity_file:
+                activity_file.write(
+                    'Type,Trans Date,Post Date,Description,Amount\n'
+                    'Sale,09/%02d/2018,09/%02d/2018,SHOP,-1.00\n' % (
+                        day, day))
+            paths.append(path)
+        database_path = os.path.join(folder_path, 'transactions.json')
+
+        sys.argv = [
+            'pecuniacli.py', '--db-file', database_path,
+            'import', '-j', '2',
+        ] + paths
+        with _captured_stdout() as output:
+            pecuniacli.main()
+
+        self.assertIn('Stored 2 new transcations', output.getvalue())
+        self.assertEqual(
+            [4, 3], [x.date.day for x in transactions.load()])
+
+    def _create_test_folder(self):
+        class_name = self.__class__.__name__
+        method_name = traceback.extract_stack(None, 2)[0][2]
+        path = os.path.join(_build_folder_path, class_name, method_name)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+        return path
 
 
 class parse_options_TestCase(unittest.TestCase):
@@ -61,6 +123,30 @@ class parse_options_TestCase_import(unittest.TestCase):
             '--db-file=FILE', 'import', 'foo.csv'])
         self.assertEqual('FILE', options.db_file)
 
+    def test_no_cache(self):
+        options = pecuniacli._parse_options(['import', 'foo.csv'])
+        self.assertFalse(options.no_cache)
+        self.assertFalse(options.rebuild_cache)
+        options = pecuniacli._parse_options(['--no-cache', 'import', 'foo.csv'])
+        self.assertTrue(options.no_cache)
+
+    def test_rebuild_cache(self):
+        options = pecuniacli._parse_options([
+            '--rebuild-cache', 'import', 'foo.csv'])
+        self.assertTrue(options.rebuild_cache)
+
+    def test_jobs(self):
+        options = pecuniacli._parse_options(['import', 'foo.csv'])
+        self.assertIsNone(options.job_count)
+        options = pecuniacli._parse_options(['import', '-j', '3', 'foo.csv'])
+        self.assertEqual(3, options.job_count)
+
+    def test_force(self):
+        options = pecuniacli._parse_options(['import', 'foo.csv'])
+        self.assertFalse(options.force)
+        options = pecuniacli._parse_options(['import', '--force', 'foo.csv'])
+        self.assertTrue(options.force)
+
 
 
 class parse_options_TestCase_list(unittest.TestCase):
@@ -128,6 +214,19 @@ class parse_options_TestCase_list(unittest.TestCase):
         self.assertEqual('list', options.command)
         self.assertTrue(options.no_tags)
 
+    def test_tag_twice(self):
+        options = pecuniacli._parse_options([
+            'list', '--tag', 'food', '--tag', '!reimbursed'])
+        self.assertEqual('list', options.command)
+        self.assertEqual(
+            [[('food', False)], [('reimbursed', True)]],
+            [tag_query.terms for tag_query in options.tag_queries])
+
+    def test_amount(self):
+        options = pecuniacli._parse_options(['list', '--amount=..-500'])
+        self.assertEqual('list', options.command)
+        self.assertEqual([(None, -500.0)], options.amounts.ranges)
+
     def test_print_total(self):
         options = pecuniacli._parse_options(['list', '--print-total'])
         self.assertEqual('list', options.command)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+'''
+Tests for :mod:`resultcaching`
+'''
+
+# Standard imports:
+import inspect
+import os
+import shutil
+import traceback
+import unittest
+
+# Project imports:
+import resultcaching
+
+
+_this_file_path = os.path.abspath(inspect.getfile(inspect.currentframe()))
+_this_folder_path = os.path.dirname(_this_file_path)
+_python_folder_path = os.path.dirname(_this_folder_path)
+_root_folder_path = os.path.dirname(_python_folder_path)
+_build_folder_path = os.path.join(_root_folder_path, 'build')
+
+
+class ResultCacheTestCase(unittest.TestCase):
+
+    def test_put_then_get(self):
+        cache_path = self._create_test_cache_path()
+        result_cache = resultcaching.ResultCache(cache_path, ('version',))
+        self.assertIsNone(result_cache.get('query'))
+        result_cache.put('query', resultcaching.QueryResult(
+            [1, 5], ['Filtered 3 transaction(s).\n'], (2, [])))
+
+        result = resultcaching.ResultCache(
+            cache_path, ('version',)).get('query')
+        self.assertEqual([1, 5], list(result.positions))
+        self.assertEqual(['Filtered 3 transaction(s).\n'], result.messages)
+        self.assertEqual((2, []), result.totals)
+
+    def test_other_version_is_empty(self):
+        cache_path = self._create_test_cache_path()
+        resultcaching.ResultCache(cache_path, ('version',)).put(
+            'query', resultcaching.QueryResult([1], []))
+        self.assertIsNone(resultcaching.ResultCache(
+            cache_path, ('other version',)).get('query'))
+
+    def test_least_recently_used_is_evicted(self):
+        cache_path = self._create_test_cache_path()
+        result_cache = resultcaching.ResultCache(
+            cache_path, (), result_capacity=2)
+        result_cache.put('a', resultcaching.QueryResult([1], []))
+        result_cache.put('b', resultcaching.QueryResult([2], []))
+        result_cache.get('a')
+        result_cache.put('c', resultcaching.QueryResult([3], []))
+        self.assertEqual(['a', 'c'], result_cache.results.keys())
+
+    def test_get_keeps_results_and_saves_order(self):
+        cache_path = self._create_test_cache_path()
+        result_cache = resultcaching.ResultCache(cache_path, ())
+        result_cache.put('a', resultcaching.QueryResult([1], []))
+        result_cache.put('b', resultcaching.QueryResult([2], []))
+        results_stat = os.stat(cache_path)
+        os.utime(cache_path, (0, 0))
+
+        resultcaching.ResultCache(cache_path, ()).get('a')
+        self.assertEqual(0, os.stat(cache_path).st_mtime)
+        self.assertEqual(results_stat.st_size, os.stat(cache_path).st_size)
+        self.assertEqual(
+            ['b', 'a'],
+            resultcaching.ResultCache(cache_path, ()).results.keys())
+
+    def test_position_capacity(self):
+        cache_path = self._create_test_cache_path()
+        result_cache = resultcaching.ResultCache(
+            cache_path, (), position_capacity=3)
+        result_cache.put('a', resultcaching.QueryResult([1, 2], []))
+        result_cache.put('b', resultcaching.QueryResult([3, 4], []))
+        self.assertEqual(['b'], result_cache.results.keys())
+        result_cache.put('c', resultcaching.QueryResult([1, 2, 3, 4], []))
+        self.assertEqual(['b'], result_cache.results.keys())
+
+    def _create_test_cache_path(self):
+        class_name = self.__class__.__name__
+        method_name = traceback.extract_stack(None, 2)[0][2]
+        folder_path = os.path.join(_build_folder_path, class_name, method_name)
+        if os.path.exists(folder_path):
+            shutil.rmtree(folder_path)
+        os.makedirs(folder_path)
+        return os.path.join(folder_path, 'transactions.json.results')
+
+
+if __name__ == '__main__':
+    unittest.main()
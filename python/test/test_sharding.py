@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+'''
+Tests for :mod:`sharding`
+'''
+
+# Standard imports:
+import datetime
+import inspect
+import os
+import shutil
+import traceback
+import unittest
+
+# Project imports:
+import datetools
+import sharding
+import transactions
+
+
+_this_file_path = os.path.abspath(inspect.getfile(inspect.currentframe()))
+_this_folder_path = os.path.dirname(_this_file_path)
+_python_folder_path = os.path.dirname(_this_folder_path)
+_root_folder_path = os.path.dirname(_python_folder_path)
+_build_folder_path = os.path.join(_root_folder_path, 'build')
+
+
+class is_sharded_path_TestCase(unittest.TestCase):
+
+    def test_json_file(self):
+        self.assertFalse(sharding.is_sharded_path('transactions.json'))
+
+    def test_trailing_separator(self):
+        self.assertTrue(sharding.is_sharded_path('transactions' + os.sep))
+
+
+class ShardedDatabaseTestCase(unittest.TestCase):
+
+    def test_one_shard_per_month(self):
+        path = self._create_test_database()
+        self.assertEqual(
+            ['2018-08.json', '2018-09.json', 'undated.json'],
+            sorted(os.listdir(path)))
+
+    def test_round_trip(self):
+        path = self._create_test_database()
+        xactions = list(sharding.iterate(path))
+        self.assertEqual(
+            [
+                datetime.date(2018, 9, 30),
+                datetime.date(2018, 9, 1),
+                datetime.date(2018, 8, 31),
+                None,
+            ],
+            [x.date for x in xactions])
+
+    def test_date_sequence_reads_only_its_months(self):
+        path = self._create_test_database()
+        with open(os.path.join(path, '2018-08.json'), 'w') as shard_file:
+            shard_file.write('not JSON')
+        xactions = sharding.iterate(
+            path, datetools.parse_date_sequence('2018-09-15..'))
+        self.assertEqual(
+            [datetime.date(2018, 9, 30), datetime.date(2018, 9, 1)],
+            [x.date for x in xactions])
+
+    def test_store_rewrites_only_changed_shards(self):
+        path = self._create_test_database()
+        xactions = sharding.load(path)
+        august_path = os.path.join(path, '2018-08.json')
+        with open(august_path, 'a') as shard_file:
+            shard_file.write(' ')
+        with open(august_path) as shard_file:
+            august = shard_file.read()
+
+        xactions[0].add_tags({'food': None})
+        sharding.store(path, xactions)
+
+        with open(august_path) as shard_file:
+            self.assertEqual(august, shard_file.read())
+        self.assertEqual(
+            {'food': None}, list(sharding.iterate(path))[0].tags)
+
+    def test_store_rewrites_shards_with_edited_fields(self):
+        path = self._create_test_database()
+        xactions = sharding.load(path)
+        xactions[2].amount = -99.0
+        xactions[2].description = 'Other shop'
+        sharding.store(path, xactions)
+
+        august = sharding.iterate(
+            path, datetools.parse_date_sequence('2018-08-01..2018-08-31'))
+        self.assertEqual(
+            [(-99.0, 'Other shop')],
+            [(x.amount, x.description) for x in august])
+
+    def test_store_removes_emptied_shards(self):
+        path = self._create_test_database()
+        xactions = sharding.load(path)
+        sharding.store(path, xactions[:2])
+        self.assertEqual(['2018-09.json'], os.listdir(path))
+
+    def _create_test_database(self):
+        class_name = self.__class__.__name__
+        method_name = traceback.extract_stack(None, 2)[0][2]
+        folder_path = os.path.join(_build_folder_path, class_name, method_name)
+        if os.path.exists(folder_path):
+            shutil.rmtree(folder_path)
+        path = os.path.join(folder_path, 'transactions') + os.sep
+        sharding.store(path, [
+            _transaction(datetime.date(2018, 9, 1)),
+            _transaction(None),
+            _transaction(datetime.date(2018, 8, 31)),
+            _transaction(datetime.date(2018, 9, 30)),
+        ])
+        return path
+
+
+def _transaction(date):
+    x = transactions.Transaction()
+    x.type = 'sale'
+    x.trans_date = date
+    x.description = 'Shop'
+    x.amount = -1.0
+    return x
+
+
+if __name__ == '__main__':
+    unittest.main()
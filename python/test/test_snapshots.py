@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+'''
+Tests for :mod:`snapshots`
+'''
+
+# Standard imports:
+import datetime
+import inspect
+import os
+import shutil
+import traceback
+import unittest
+
+# Project imports:
+import datetools
+import snapshots
+import transactions
+
+
+_this_file_path = os.path.abspath(inspect.getfile(inspect.currentframe()))
+_this_folder_path = os.path.dirname(_this_file_path)
+_python_folder_path = os.path.dirname(_this_folder_path)
+_root_folder_path = os.path.dirname(_python_folder_path)
+_build_folder_path = os.path.join(_root_folder_path, 'build')
+
+
+class SnapshotTestCase(unittest.TestCase):
+
+    def test_round_trip(self):
+        snapshot_path, _ = self._create_test_snapshot()
+        rows_and_xactions = list(snapshots.iterate(snapshot_path))
+        self.assertEqual([0, 1, 2, 3], [row for row, _ in rows_and_xactions])
+
+        xactions = [x for _, x in rows_and_xactions]
+        self.assertEqual(
+            [
+                datetime.date(2018, 10, 2),
+                datetime.date(2018, 9, 30),
+                datetime.date(2018, 9, 1),
+                None,
+            ],
+            [x.date for x in xactions])
+        self.assertEqual(u'Caf\xe9', xactions[0].description)
+        self.assertEqual('sale', xactions[0].type)
+        self.assertEqual(-12.5, xactions[0].amount)
+        self.assertEqual({'food': None, 'cash': 2.0}, xactions[1].tags)
+        self.assertEqual({}, xactions[2].tags)
+        self.assertEqual(datetime.date(2018, 9, 2), xactions[2].post_date)
+        self.assertEqual(4, snapshots.row_count(snapshot_path))
+
+    def test_date_sequence_skips_other_months(self):
+        snapshot_path, _ = self._create_test_snapshot()
+        rows = [
+            row for row, _ in snapshots.iterate(
+                snapshot_path,
+                datetools.parse_date_sequence('2018-09-15..2018-09-20'))
+        ]
+        self.assertEqual([1, 2], rows)
+
+    def test_rows_skips_other_rows(self):
+        snapshot_path, _ = self._create_test_snapshot()
+        rows_and_xactions = list(snapshots.iterate(
+            snapshot_path,
+            datetools.parse_date_sequence('2018-09-01..2018-10-31'),
+            rows=[0, 2, 3]))
+        self.assertEqual([0, 2], [row for row, _ in rows_and_xactions])
+        self.assertEqual('Bank', rows_and_xactions[1][1].description)
+
+    def test_rows_in_dates(self):
+        snapshot_path, _ = self._create_test_snapshot()
+        for dates, rows in [
+                ('2018-09-15..2018-10-01', [1]),
+                ('2018-09-01,2018-10-02', [0, 2]),
+                ('2018-08-01..2018-08-31', [])]:
+            self.assertEqual(
+                rows,
+                snapshots.rows_in_dates(
+                    snapshot_path, datetools.parse_date_sequence(dates)),
+                dates)
+
+    def test_is_current(self):
+        snapshot_path, source_path = self._create_test_snapshot()
+        self.assertTrue(snapshots.is_current(snapshot_path, source_path))
+        with open(source_path, 'a') as source_file:
+            source_file.write(' ')
+        self.assertFalse(snapshots.is_current(snapshot_path, source_path))
+
+    def test_is_current_missing(self):
+        self.assertFalse(snapshots.is_current('no-such-file', 'nor-this'))
+
+    def _create_test_snapshot(self):
+        class_name = self.__class__.__name__
+        method_name = traceback.extract_stack(None, 2)[0][2]
+        folder_path = os.path.join(_build_folder_path, class_name, method_name)
+        if os.path.exists(folder_path):
+            shutil.rmtree(folder_path)
+        os.makedirs(folder_path)
+
+        source_path = os.path.join(folder_path, 'transactions.json')
+        with open(source_path, 'w') as source_file:
+            source_file.write('[]')
+        snapshot_path = source_path + '.snapshot'
+
+        october = _transaction(datetime.date(2018, 10, 2), u'Caf\xe9')
+        late_september = _transaction(datetime.date(2018, 9, 30), 'Shop')
+        late_september.tags = {'food': None, 'cash': 2.0}
+        early_september = _transaction(None, 'Bank')
+        early_september.trans_date = datetime.date(2018, 9, 1)
+        early_september.post_date = datetime.date(2018, 9, 2)
+        undated = _transaction(None, 'Mystery')
+        snapshots.write(
+            snapshot_path,
+            [october, late_september, early_september, undated],
+            source_path)
+        return snapshot_path, source_path
+
+
+def _transaction(date, description):
+    x = transactions.Transaction()
+    x.type = 'sale'
+    x.trans_date = date
+    x.description = description
+    x.amount = -12.5
+    return x
+
+
+if __name__ == '__main__':
+    unittest.main()
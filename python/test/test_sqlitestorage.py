@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+'''
+Tests for :mod:`sqlitestorage`
+'''
+
+# Standard imports:
+import datetime
+import inspect
+import os
+import shutil
+import traceback
+import unittest
+
+# Project imports:
+import datetools
+import sqlitestorage
+import transactions
+
+
+_this_file_path = os.path.abspath(inspect.getfile(inspect.currentframe()))
+_this_folder_path = os.path.dirname(_this_file_path)
+_python_folder_path = os.path.dirname(_this_folder_path)
+_root_folder_path = os.path.dirname(_python_folder_path)
+_build_folder_path = os.path.join(_root_folder_path, 'build')
+
+
+class is_sqlite_path_TestCase(unittest.TestCase):
+
+    def test_json(self):
+        self.assertFalse(sqlitestorage.is_sqlite_path('transactions.json'))
+
+    def test_sqlite(self):
+        self.assertTrue(sqlitestorage.is_sqlite_path('transactions.SQLite'))
+
+
+class iterate_TestCase(unittest.TestCase):
+
+    def test_round_trip(self):
+        path = self._create_test_database()
+        xactions = list(sqlitestorage.iterate(path))
+        self.assertEqual([5, 4, 3], [x.date.day for x in xactions])
+        self.assertEqual(
+            [{}, {'food': None, 'cash': 2.0}, {}],
+            [x.tags for x in xactions])
+        self.assertEqual('Day 4', xactions[1].description)
+        self.assertEqual(-4.0, xactions[1].amount)
+        self.assertEqual('sale', xactions[1].type)
+        self.assertIsNone(xactions[1].post_date)
+
+    def test_date_sequence(self):
+        path = self._create_test_database()
+        xactions = sqlitestorage.iterate(
+            path,
+            date_sequence=datetools.parse_date_sequence(
+                '2018-09-03,2018-09-05..'))
+        self.assertEqual([5, 3], [x.date.day for x in xactions])
+
+    def test_no_tags(self):
+        path = self._create_test_database()
+        xactions = sqlitestorage.iterate(path, no_tags=True)
+        self.assertEqual([5, 3], [x.date.day for x in xactions])
+
+    def test_no_tags_counts_ruled_out(self):
+        path = self._create_test_database()
+        ruled_out_counts = {}
+        xactions = sqlitestorage.iterate(
+            path, no_tags=True, ruled_out_counts=ruled_out_counts)
+        self.assertEqual([5, 3], [x.date.day for x in xactions])
+        self.assertEqual({'no-tags': 1}, ruled_out_counts)
+
+        ruled_out_counts = {}
+        list(sqlitestorage.iterate(
+            path,
+            date_sequence=datetools.parse_date_sequence('2018-09-05'),
+            no_tags=True,
+            ruled_out_counts=ruled_out_counts))
+        self.assertEqual({'no-tags': 0}, ruled_out_counts)
+
+    def test_store_replaces(self):
+        path = self._create_test_database()
+        sqlitestorage.store(path, [_transaction(7)])
+        self.assertEqual(
+            [7], [x.date.day for x in sqlitestorage.iterate(path)])
+        self.assertEqual(
+            [7],
+            [x.date.day for x in sqlitestorage.iterate(path, no_tags=True)])
+
+    def _create_test_database(self):
+        class_name = self.__class__.__name__
+        method_name = traceback.extract_stack(None, 2)[0][2]
+        folder_path = os.path.join(_build_folder_path, class_name, method_name)
+        if os.path.exists(folder_path):
+            shutil.rmtree(folder_path)
+        os.makedirs(folder_path)
+        path = os.path.join(folder_path, 'transactions.sqlite')
+        tagged = _transaction(4)
+        tagged.tags = {'food': None, 'cash': 2.0}
+        sqlitestorage.store(path, [_transaction(3), tagged, _transaction(5)])
+        return path
+
+
+def _transaction(day):
+    x = transactions.Transaction()
+    x.type = 'sale'
+    x.trans_date = datetime.date(2018, 9, day)
+    x.description = 'Day %d' % day
+    x.amount = -1.0 * day
+    return x
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+'''
+Tests for :mod:`tables`
+'''
+
+# Standard imports:
+import datetime
+import unittest
+
+# Project imports:
+import amountindexing
+import datetools
+import tables
+import transactions
+
+
+class TransactionTableTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.table = tables.TransactionTable([
+            _transaction(3, 'AMAZON.COM', -30.0),
+            _transaction(4, 'PAYROLL', 400.0, {'income': None}),
+            _transaction(5, 'AMAZON.COM', -50.0, {'food': None, 'cash': 20.0}),
+        ])
+
+    def test_len(self):
+        self.assertEqual(3, len(self.table))
+
+    def test_descriptions_are_encoded_once(self):
+        self.assertEqual(2, len(self.table.descriptions))
+
+    def test_transaction(self):
+        x = self.table.transaction(2)
+        self.assertEqual('sale', x.type)
+        self.assertEqual(datetime.date(2018, 9, 5), x.trans_date)
+        self.assertIsNone(x.post_date)
+        self.assertEqual('AMAZON.COM', x.description)
+        self.assertEqual(-50.0, x.amount)
+        self.assertEqual({'food': None, 'cash': 20.0}, x.tags)
+
+    def test_select_dates(self):
+        self.assertEqual(
+            [0, 2],
+            list(self.table.select_dates(
+                self.table.rows(),
+                datetools.parse_date_sequence('..2018-09-03,2018-09-05'))))
+
+    def test_select_descriptions(self):
+        self.assertEqual(
+            [0, 2],
+            list(self.table.select_descriptions(
+                self.table.rows(), lambda s: 'AMAZON' in s)))
+
+    def test_select_untagged(self):
+        self.assertEqual(
+            [0], list(self.table.select_untagged(self.table.rows())))
+
+    def test_select_tags(self):
+        self.assertEqual(
+            [1, 2],
+            list(self.table.select_tags(
+                self.table.rows(), lambda tags: len(tags) > 0)))
+
+    def test_select_amounts(self):
+        self.assertEqual(
+            [0, 2],
+            list(self.table.select_amounts(
+                self.table.rows(),
+                amountindexing.parse_amount_ranges('..-30'))))
+
+    def test_rows_by_tag(self):
+        rows_by_tag = self.table.rows_by_tag(self.table.rows())
+        self.assertEqual([None, 'cash', 'food', 'income'], rows_by_tag.keys())
+        self.assertEqual([2], list(rows_by_tag['food']))
+        self.assertEqual([0], list(rows_by_tag[None]))
+
+    def test_aggregates(self):
+        rows = self.table.rows()
+        self.assertEqual(320.0, self.table.total(rows))
+        self.assertEqual(400.0, self.table.credits(rows))
+        self.assertEqual(-80.0, self.table.debits(rows))
+        self.assertEqual(480.0, self.table.volume(rows))
+
+
+def _transaction(day, description, amount, tags=None):
+    x = transactions.Transaction()
+    x.type = 'sale'
+    x.trans_date = datetime.date(2018, 9, day)
+    x.description = description
+    x.amount = amount
+    if tags is not None:
+        x.tags = tags
+    return x
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+'''
+Tests for :mod:`tagindexing`
+'''
+
+# Standard imports:
+import inspect
+import os
+import shutil
+import traceback
+import unittest
+
+# Project imports:
+import tagindexing
+import transactions
+
+
+_this_file_path = os.path.abspath(inspect.getfile(inspect.currentframe()))
+_this_folder_path = os.path.dirname(_this_file_path)
+_python_folder_path = os.path.dirname(_this_folder_path)
+_root_folder_path = os.path.dirname(_python_folder_path)
+_build_folder_path = os.path.join(_root_folder_path, 'build')
+
+
+class parse_tag_query_TestCase(unittest.TestCase):
+
+    def test_tag(self):
+        self.assertEqual(
+            [('food', False)], tagindexing.parse_tag_query('food').terms)
+
+    def test_alternatives(self):
+        self.assertEqual(
+            [('food', False), ('cash', True)],
+            tagindexing.parse_tag_query('food|!cash').terms)
+
+    def test_empty_tag_raises(self):
+        with self.assertRaises(ValueError):
+            tagindexing.parse_tag_query('food|!')
+
+    def test_call(self):
+        tag_query = tagindexing.parse_tag_query('food|!cash')
+        self.assertTrue(tag_query({'food': None, 'cash': 2.0}))
+        self.assertTrue(tag_query({}))
+        self.assertFalse(tag_query({'cash': 2.0}))
+
+
+class TagIndexTestCase(unittest.TestCase):
+
+    def test_select(self):
+        tag_index = self._create_test_index()
+        self.assertEqual(
+            [0, 2], tag_index.select([tagindexing.parse_tag_query('food')]))
+        self.assertEqual(
+            [2],
+            tag_index.select([
+                tagindexing.parse_tag_query('food'),
+                tagindexing.parse_tag_query('!cash'),
+            ]))
+        self.assertEqual(
+            [0, 1, 2, 8],
+            tag_index.select([tagindexing.parse_tag_query('food|rent')]))
+        self.assertEqual(
+            [1, 3, 4, 5, 6, 7, 8, 9],
+            tag_index.select([tagindexing.parse_tag_query('!food')]))
+
+    def test_select_untagged(self):
+        tag_index = self._create_test_index()
+        self.assertEqual(
+            [3, 4, 5, 6, 7, 9], tag_index.select(no_tags=True))
+
+    def test_unknown_tag(self):
+        tag_index = self._create_test_index()
+        self.assertEqual(
+            [], tag_index.select([tagindexing.parse_tag_query('travel')]))
+
+    def test_stale_index_is_not_loaded(self):
+        self._create_test_index()
+        with open(self.source_path, 'a') as source_file:
+            source_file.write(' ')
+        self.assertIsNone(
+            tagindexing.load(self.index_path, [self.source_path]))
+
+    def _create_test_index(self):
+        class_name = self.__class__.__name__
+        method_name = traceback.extract_stack(None, 2)[0][2]
+        folder_path = os.path.join(_build_folder_path, class_name, method_name)
+        if os.path.exists(folder_path):
+            shutil.rmtree(folder_path)
+        os.makedirs(folder_path)
+
+        self.source_path = os.path.join(folder_path, 'transactions.json')
+        with open(self.source_path, 'w') as source_file:
+            source_file.write('[]')
+        self.index_path = self.source_path + '.tags'
+        xactions = [
+            _transaction({'food': None, 'cash': 2.0}),
+            _transaction({'rent': None, 'cash': None}),
+            _transaction({'food': None}),
+        ]
+        xactions.extend(_transaction({}) for _ in xrange(7))
+        xactions[-2].tags = {'rent': None}
+        tagindexing.write(self.index_path, xactions, [self.source_path])
+        return tagindexing.load(self.index_path, [self.source_path])
+
+
+class positions_TestCase(unittest.TestCase):
+
+    def test_positions(self):
+        self.assertEqual([], tagindexing.positions(0))
+        self.assertEqual([0, 3, 64], tagindexing.positions(9 | (1 << 64)))
+
+
+def _transaction(tags):
+    x = transactions.Transaction()
+    x.type = 'sale'
+    x.description = 'SHOP'
+    x.amount = -1.0
+    x.tags = tags
+    return x
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,20 +4,457 @@ Tests for :mod:`transactions`
 '''
 
 # Standard imports:
+import argparse
 import datetime
+import inspect
 import json
+import os
+import shutil
+import StringIO
+import sys
+import traceback
 import unittest
 
 # Project imports:
+import amountindexing
+import datetools
+import filtering
+import tagindexing
 import transactions
 
 
+_this_file_path = os.path.abspath(inspect.getfile(inspect.currentframe()))
+_this_folder_path = os.path.dirname(_this_file_path)
+_python_folder_path = os.path.dirname(_this_folder_path)
+_root_folder_path = os.path.dirname(_python_folder_path)
+_build_folder_path = os.path.join(_root_folder_path, 'build')
+
+
 class load_TestCase(unittest.TestCase):
     pass
 
 
 class store_TestCase(unittest.TestCase):
-    pass
+
+    def setUp(self):
+        self._original_database_path = transactions.database_path()
+
+    def tearDown(self):
+        transactions.set_database_path(self._original_database_path)
+
+    def test_round_trip(self):
+        self._use_test_database()
+        transactions.store([_transaction(3), _transaction(5), _transaction(4)])
+        self.assertEqual(
+            [5, 4, 3],
+            [x.date.day for x in transactions.load()])
+        self.assertFalse(os.path.exists(self._journal_path()))
+
+    def test_load_before_store(self):
+        self._use_test_database()
+        self.assertEqual([], transactions.load())
+
+    def test_tags_are_journaled(self):
+        self._use_test_database()
+        transactions.store([_transaction(3), _transaction(4)])
+        with open(transactions.database_path()) as database_file:
+            snapshot = database_file.read()
+
+        xactions = transactions.load()
+        xactions[1].add_tags({'food': None})
+        transactions.store(xactions)
+
+        with open(transactions.database_path()) as database_file:
+            self.assertEqual(snapshot, database_file.read())
+        with open(self._journal_path()) as journal_file:
+            self.assertEqual(1, len(journal_file.readlines()))
+        self.assertEqual(
+            [{}, {'food': None}],
+            [x.tags for x in transactions.load()])
+
+    def test_store_after_torn_journal(self):
+        self._use_test_database()
+        transactions.store([_transaction(3), _transaction(4)])
+        xactions = transactions.load()
+        xactions[0].add_tags({'food': None})
+        transactions.store(xactions)
+        with open(self._journal_path(), 'a') as journal_file:
+            journal_file.write('{"op": "ta')
+
+        xactions = transactions.load()
+        xactions[1].add_tags({'cash': None})
+        transactions.store(xactions)
+        xactions = transactions.load()
+        xactions[1].add_tags({'rent': None})
+        transactions.store(xactions)
+        self.assertEqual(
+            [{'food': None}, {'cash': None, 'rent': None}],
+            [x.tags for x in transactions.load()])
+
+    def test_unchanged_store_appends_nothing(self):
+        self._use_test_database()
+        transactions.store([_transaction(3)])
+        transactions.store(transactions.load())
+        self.assertFalse(os.path.exists(self._journal_path()))
+
+    def test_additions_are_journaled(self):
+        self._use_test_database()
+        transactions.store([_transaction(3)])
+        xactions = transactions.load()
+        xactions.append(_transaction(9))
+        transactions.store(xactions)
+        xactions[1].add_tags({'rent': None})
+        transactions.store(xactions)
+
+        self.assertTrue(os.path.exists(self._journal_path()))
+        xactions = transactions.load()
+        self.assertEqual([9, 3], [x.date.day for x in xactions])
+        self.assertEqual([{'rent': None}, {}], [x.tags for x in xactions])
+
+    def test_edited_fields_rewrite(self):
+        self._use_test_database()
+        transactions.store([_transaction(3), _transaction(4)])
+        xactions = transactions.load()
+        xactions[1].amount = -99.0
+        xactions[1].description = 'B'
+        transactions.store(xactions)
+
+        self.assertFalse(os.path.exists(self._journal_path()))
+        xactions = transactions.load()
+        self.assertEqual([-99.0, 'B'], [
+            xactions[1].amount, xactions[1].description])
+
+    def test_earlier_load_rewrites(self):
+        self._use_test_database()
+        transactions.store([_transaction(3), _transaction(4)])
+        earlier_xactions = transactions.load()
+        transactions.load()
+        earlier_xactions[0].add_tags({'food': None})
+        transactions.store(earlier_xactions)
+
+        self.assertFalse(os.path.exists(self._journal_path()))
+        self.assertEqual(
+            [{'food': None}, {}], [x.tags for x in transactions.load()])
+
+    def test_retagging_twice_journals_latest_tags(self):
+        self._use_test_database()
+        transactions.store([_transaction(3), _transaction(4)])
+        xactions = transactions.load()
+        xactions[0].add_tags({'food': None})
+        xactions[0].add_tags({'cash': None})
+        transactions.store(xactions)
+        transactions.store(xactions)
+
+        with open(self._journal_path()) as journal_file:
+            self.assertEqual(1, len(journal_file.readlines()))
+        self.assertEqual(
+            [{'food': None, 'cash': None}, {}],
+            [x.tags for x in transactions.load()])
+
+    def test_removal_rewrites(self):
+        self._use_test_database()
+        transactions.store([_transaction(3), _transaction(4)])
+        xactions = transactions.load()
+        xactions[0].add_tags({'food': None})
+        transactions.store(xactions)
+        transactions.store(xactions[:1])
+        self.assertFalse(os.path.exists(self._journal_path()))
+        self.assertEqual(
+            [{'food': None}],
+            [x.tags for x in transactions.load()])
+
+    def test_compact(self):
+        self._use_test_database()
+        transactions.store([_transaction(3)])
+        xactions = transactions.load()
+        xactions[0].add_tags({'food': None})
+        transactions.store(xactions)
+        transactions.compact()
+        self.assertFalse(os.path.exists(self._journal_path()))
+        with open(transactions.database_path()) as database_file:
+            self.assertEqual(
+                {'food': None}, json.load(database_file)[0]['tags'])
+
+    def test_cache_is_used_and_invalidated(self):
+        self._use_test_database()
+        transactions.store([_transaction(3)])
+        os.remove(transactions.database_path() + '.snapshot')
+        self.assertEqual(1, len(transactions.load()))
+        self.assertTrue(os.path.exists(self._cache_path()))
+
+        xactions = transactions.load()
+        self.assertIs(transactions._no_tags, xactions[0].tags)
+        xactions[0].add_tags({'food': None})
+        transactions.store(xactions)
+        self.assertFalse(os.path.exists(self._cache_path()))
+        self.assertEqual(
+            [{'food': None}], [x.tags for x in transactions.load()])
+
+    def test_description_index_narrows_iterate(self):
+        self._use_test_database()
+        transactions.store([_transaction(3), _transaction(13)])
+        self.assertTrue(
+            os.path.exists(transactions.database_path() + '.index'))
+        xactions = transactions.load()
+        xactions.append(_transaction(23))
+        transactions.store(xactions)
+
+        # The journaled addition is yielded whether it matches or not.
+        matcher = filtering._DescriptionMatcher(['day 1'])
+        self.assertEqual(
+            [13, 23],
+            [x.date.day
+             for x in transactions.iterate(description_matcher=matcher)])
+
+    def test_tag_index_follows_journal(self):
+        self._use_test_database()
+        transactions.store([_transaction(3), _transaction(4)])
+        xactions = transactions.load()
+        xactions[1].add_tags({'food': None})
+        xactions.append(_transaction(9))
+        xactions[2].add_tags({'food': None})
+        transactions.store(xactions)
+        self.assertTrue(os.path.exists(self._journal_path()))
+
+        food = tagindexing.parse_tag_query('food')
+        self.assertEqual([3, 9], [x.date.day for x in transactions.iterate(
+            tag_queries=[food])])
+        self.assertEqual(
+            [4], [x.date.day for x in transactions.iterate(no_tags=True)])
+
+    def test_indexes_are_updated_by_each_journaled_store(self):
+        self._use_test_database()
+        transactions.store([_transaction(3), _transaction(4)])
+        xactions = transactions.load()
+        xactions[0].add_tags({'food': None})
+        xactions.append(_transaction(12))
+        transactions.store(xactions)
+        xactions[0].tags = {}
+        xactions[1].add_tags({'food': None})
+        xactions.append(_transaction(2))
+        transactions.store(xactions)
+
+        food = tagindexing.parse_tag_query('food')
+        self.assertEqual([3], [x.date.day for x in transactions.iterate(
+            tag_queries=[food])])
+        self.assertEqual(
+            [4, 12, 2],
+            [x.date.day for x in transactions.iterate(no_tags=True)])
+        amount_ranges = amountindexing.parse_amount_ranges('-4..-2')
+        self.assertEqual(
+            [4, 3, 2],
+            [x.date.day
+             for x in transactions.iterate(amount_ranges=amount_ranges)])
+
+    def test_amount_index_narrows_iterate(self):
+        self._use_test_database()
+        transactions.store([_transaction(3), _transaction(13)])
+        xactions = transactions.load()
+        xactions.append(_transaction(23))
+        xactions.append(_transaction(9))
+        transactions.store(xactions)
+        self.assertTrue(
+            os.path.exists(transactions.database_path() + '.amounts'))
+
+        amount_ranges = amountindexing.parse_amount_ranges('..-10')
+        self.assertEqual(
+            [13, 23],
+            [x.date.day
+             for x in transactions.iterate(amount_ranges=amount_ranges)])
+
+    def test_indexes_count_ruled_out(self):
+        self._use_test_database()
+        transactions.store([
+            _transaction(3), _transaction(13), _transaction(14),
+            _transaction(25),
+        ])
+        xactions = transactions.load()
+        xactions.append(_transaction(23))
+        xactions.append(_transaction(9))
+        transactions.store(xactions)
+
+        ruled_out_counts = {}
+        xactions = transactions.iterate(
+            date_sequence=datetools.parse_date_sequence('2018-09-05..'),
+            description_matcher=filtering._DescriptionMatcher(['day 1']),
+            amount_ranges=amountindexing.parse_amount_ranges('..-14'),
+            ruled_out_counts=ruled_out_counts)
+        self.assertEqual([14, 23], [x.date.day for x in xactions])
+        self.assertEqual({'include': 1, 'amount': 2}, ruled_out_counts)
+
+    def test_query_result_is_cached_until_store(self):
+        self._use_test_database()
+        transactions.store([_transaction(3), _transaction(13)])
+        options = argparse.Namespace(include_regexs=['day 1'])
+        original_stdout = sys.stdout
+        sys.stdout = StringIO.StringIO()
+        try:
+            self.assertEqual(
+                [13],
+                [x.date.day for x in filtering.query_transactions(options)])
+            self.assertEqual(1, len(transactions.result_cache().results))
+            self.assertEqual(
+                [13],
+                [x.date.day for x in filtering.query_transactions(options)])
+
+            xactions = transactions.load()
+            xactions.append(_transaction(19))
+            transactions.store(xactions)
+            self.assertEqual(0, len(transactions.result_cache().results))
+            self.assertEqual(
+                [13, 19],
+                [x.date.day for x in filtering.query_transactions(options)])
+        finally:
+            sys.stdout = original_stdout
+
+    def test_no_result_cache_without_snapshot(self):
+        self._use_test_database()
+        transactions.store([_transaction(3)])
+        os.remove(transactions.database_path() + '.snapshot')
+        self.assertIsNone(transactions.result_cache())
+
+    def test_cache_disabled(self):
+        self._use_test_database()
+        transactions.set_cache_enabled(False)
+        try:
+            transactions.store([_transaction(3)])
+            transactions.load()
+            self.assertFalse(os.path.exists(self._cache_path()))
+        finally:
+            transactions.set_cache_enabled(True)
+
+    def test_gzip_round_trip(self):
+        self._use_test_database('transactions.json.gz')
+        transactions.store([_transaction(3), _transaction(4)])
+        with open(transactions.database_path(), 'rb') as database_file:
+            self.assertEqual('\x1f\x8b', database_file.read(2))
+        self.assertEqual(
+            [4, 3], [x.date.day for x in transactions.load()])
+
+    def test_bz2_round_trip(self):
+        self._use_test_database('transactions.json.bz2')
+        transactions.store([_transaction(3)])
+        self.assertEqual([3], [x.date.day for x in transactions.load()])
+
+    def test_compression_is_detected_by_content(self):
+        self._use_test_database('transactions.json.gz')
+        transactions.store([_transaction(3)])
+        renamed_path = transactions.database_path()[:-len('.gz')]
+        os.rename(transactions.database_path(), renamed_path)
+        transactions.set_database_path(renamed_path)
+        self.assertEqual([3], [x.date.day for x in transactions.load()])
+
+    def _use_test_database(self, file_name='transactions.json'):
+        class_name = self.__class__.__name__
+        method_name = traceback.extract_stack(None, 2)[0][2]
+        path = os.path.join(_build_folder_path, class_name, method_name)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+        transactions.set_database_path(os.path.join(path, file_name))
+
+    def _journal_path(self):
+        return transactions.database_path() + '.journal'
+
+    def _cache_path(self):
+        return transactions.database_path() + '.cache'
+
+
+def _transaction(day):
+    x = transactions.Transaction()
+    x.type = 'sale'
+    x.trans_date = datetime.date(2018, 9, day)
+    x.description = 'Day %d' % day
+    x.amount = -1.0 * day
+    return x
+
+
+class write_json_array_TestCase(unittest.TestCase):
+
+    def test_readable_matches_json_dump(self):
+        xactions = [_transaction(3), _transaction(4)]
+        xactions[1].add_tags({'food': None, 'cash': 2.0})
+        expected = StringIO.StringIO()
+        json.dump([x.encode() for x in xactions], expected, indent=4)
+        self.assertEqual(expected.getvalue(), self._write(xactions))
+
+    def test_readable_empty(self):
+        self.assertEqual('[]', self._write([]))
+
+    def test_compact(self):
+        written = self._write([_transaction(3), _transaction(4)], compact=True)
+        self.assertEqual(4, len(written.splitlines()))
+        self.assertNotIn(', ', written)
+        self.assertEqual(
+            [_transaction(3).encode(), _transaction(4).encode()],
+            json.loads(written))
+
+    def _write(self, xactions, compact=False):
+        json_file = StringIO.StringIO()
+        transactions.write_json_array(json_file, xactions, compact=compact)
+        return json_file.getvalue()
+
+
+class iterate_json_array_TestCase(unittest.TestCase):
+
+    def test_empty(self):
+        self.assertEqual(
+            [], self._iterate('  [ ]  '))
+
+    def test_elements_spanning_chunks(self):
+        elements = [
+            {'description': 'Fairyland Souvenir Shop', 'tags': {}},
+            {'description': 'Trader Joe\'s, Inc.', 'tags': {'food': None}},
+            {'description': '[brackets], {braces}', 'tags': {}},
+        ]
+        self.assertEqual(
+            elements,
+            self._iterate(json.dumps(elements, indent=4), chunk_size=3))
+
+    def test_stops_reading_early(self):
+        json_file = StringIO.StringIO('[{"a": 1}, {"b": 2}, garbage')
+        generator = transactions.iterate_json_array(json_file, chunk_size=4)
+        self.assertEqual({'a': 1}, next(generator))
+        generator.close()
+
+    def test_truncated_raises(self):
+        with self.assertRaises(ValueError):
+            self._iterate('[{"a": 1}, {"b"')
+
+    def test_not_an_array_raises(self):
+        with self.assertRaises(ValueError):
+            self._iterate('{"a": 1}')
+
+    def _iterate(self, s, chunk_size=64):
+        return list(transactions.iterate_json_array(
+            StringIO.StringIO(s), chunk_size=chunk_size))
+
+
+class same_fields_TestCase(unittest.TestCase):
+
+    def test_decoding_keeps_fields_the_same(self):
+        x = self._decode()
+        fields = x.fields()
+        x.post_date
+        self.assertNotEqual(fields, x.fields())
+        self.assertTrue(transactions.same_fields(fields, x.fields()))
+
+    def test_edited_date_differs(self):
+        x = self._decode()
+        fields = x.fields()
+        x.post_date = datetime.date(2018, 9, 8)
+        self.assertFalse(transactions.same_fields(fields, x.fields()))
+
+    def _decode(self):
+        return transactions.Transaction.decode(
+            {
+                'type': 'debit',
+                'trans_date': '2018-09-06',
+                'post_date': '2018-09-07',
+                'description': 'Fairyland Souvenir Shop',
+                'amount': 12.34,
+                'tags': [],
+            })
 
 
 class TransactionTestCase(unittest.TestCase):
@@ -73,6 +510,65 @@ class TransactionTestCase(unittest.TestCase):
         self.assertEqual(12.34, x.amount)
         self.assertEqual({}, x.tags)
 
+    def test_decode_shares_empty_tags(self):
+        json_decodable = {
+            'type': 'debit',
+            'trans_date': None,
+            'post_date': '2018-09-07',
+            'description': 'Fairyland Souvenir Shop',
+            'amount': 12.34,
+            'tags': {},
+        }
+        x = transactions.Transaction.decode(json_decodable)
+        y = transactions.Transaction.decode(json_decodable)
+        self.assertIs(x.tags, y.tags)
+        with self.assertRaises(TypeError):
+            x.tags['food'] = None
+
+    def test_decode_interns_type_and_tags(self):
+        x = transactions.Transaction.decode(json.loads(
+            '{"type": "sale", "trans_date": null, "post_date": null,'
+            ' "description": "", "amount": 0.0, "tags": {"food": null}}'))
+        y = transactions.Transaction.decode(json.loads(
+            '{"type": "sale", "trans_date": null, "post_date": null,'
+            ' "description": "", "amount": 0.0, "tags": {"food": null}}'))
+        self.assertIs(x.type, y.type)
+        self.assertIs(x.tags.keys()[0], y.tags.keys()[0])
+
+    def test_decode_is_lazy(self):
+        x = transactions.Transaction.decode(
+            {
+                'type': 'debit',
+                'trans_date': '2018-09-06',
+                'post_date': 'not a date',
+                'description': 'Fairyland Souvenir Shop',
+                'amount': 12.34,
+                'tags': ['food'],
+            })
+        self.assertEqual(datetime.date(2018, 9, 6), x.date)
+        self.assertEqual('not a date', x.post_date_as_string)
+        self.assertEqual({'food': None}, x.tags)
+        with self.assertRaises(ValueError):
+            x.post_date
+
+    def test_date_follows_replaced_dates(self):
+        x = transactions.Transaction()
+        x.post_date = datetime.date(2018, 9, 7)
+        self.assertEqual(datetime.date(2018, 9, 7), x.date)
+        x.trans_date = datetime.date(2018, 9, 6)
+        self.assertEqual(datetime.date(2018, 9, 6), x.date)
+
+    def test_add_tags(self):
+        x = transactions.Transaction()
+        x.add_tags({'food': None})
+        x.add_tags({'cash': 20.0})
+        self.assertEqual({'food': None, 'cash': 20.0}, x.tags)
+        self.assertEqual({}, transactions.Transaction().tags)
+
+    def test_no_instance_dict(self):
+        with self.assertRaises(AttributeError):
+            transactions.Transaction().colour = 'red'
+
     def test_decode_tags_as_list(self):
         '''
         Prove we can still decode, even when the tags are a ``list``.
@@ -3,20 +3,46 @@
 About transactions
 
 :func:`load`
+:func:`iterate`
+:func:`iterate_with_positions`
+:func:`result_cache`
 :func:`store`
+:func:`add`
+:func:`content_counter`
+:func:`compact`
+:func:`set_cache_enabled`
+:func:`clear_cache`
 :func:`database_path`
 :func:`set_database_path`
+:func:`manifest_path`
+:func:`write_json_array`
+:func:`iterate_json_array`
+:func:`same_fields`
 :class:`Transaction`
 '''
 
 # Standard imports:
+import bisect
+import bz2
+import contextlib
 import datetime
+import gzip
 import inspect
 import json
 import os
 
 # Project imports:
+import amountindexing
+import caching
+import contentindexing
 import datetools
+import indexing
+import journaling
+import resultcaching
+import sharding
+import snapshots
+import sqlitestorage
+import tagindexing
 
 _this_file_path = inspect.getfile(inspect.currentframe())
 _this_folder_path = os.path.abspath(os.path.dirname(_this_file_path))
@@ -26,53 +52,488 @@ _database_path = os.path.join(
 
 
 def load():
-    with open(_database_path, 'r') as database_file:
-        json_decodables = json.load(database_file)
-        xactions = [
-            Transaction.decode(json_decodable)
-            for json_decodable in json_decodables
-            ]
+    '''
+    Load every transaction in the database into a list sorted by date,
+    most recent first.  A database yet to be stored loads as empty.
+
+    A later :func:`store` of the same transactions to a JSON database
+    appends only what changed to the journal.
+    '''
+
+    if sqlitestorage.is_sqlite_path(_database_path):
+        xactions = list(iterate())
+    elif sharding.is_sharded_path(_database_path):
+        xactions = sharding.load(_database_path)
+    else:
+        indexes, xactions = _unzip(_iterate_json())
+        _remember_baseline(indexes, xactions)
     xactions.sort(key=lambda x: x.date, reverse=True)
     return xactions
 
 
+def iterate(
+        date_sequence=None,
+        no_tags=False,
+        description_matcher=None,
+        tag_queries=(),
+        amount_ranges=None,
+        ruled_out_counts=None):
+    '''
+    Yield each transaction in the database in stored order without
+    first decoding the whole database.
+
+    :func:`store` writes transactions most recent first, so this is
+    normally the same order :func:`load` returns.  Transactions added
+    through the journal follow the rest.  Abandoning the generator
+    early closes the database without reading the rest of it.
+
+    An indexed database yields only the transactions in
+    `date_sequence` and, if `no_tags`, without tags.  A sharded
+    database, or a JSON database with a current binary snapshot, skips
+    the months `date_sequence` does not touch.  A JSON database with a
+    current snapshot and description index also skips the
+    transactions whose description does not satisfy
+    `description_matcher` (see :func:`indexing.matching_rows`).  With
+    a current tag index, it skips those that do not satisfy every one
+    of the :class:`tagindexing.TagQuery` `tag_queries` or, if
+    `no_tags`, have tags, and with a current amount index, those whose
+    amount is not in the :class:`amountindexing.AmountRanges`
+    `amount_ranges`.  Others may yield everything, so these arguments
+    narrow what is read but are no substitute for
+    :func:`filtering.filter_transactions`.
+
+    How many transactions in `date_sequence` each criterion skipped is
+    added to the dict `ruled_out_counts`, if given, by the time the
+    last transaction is yielded, under ``'include'``, ``'no-tags'``,
+    ``'tag'`` or ``'amount'``.  Each is counted among the transactions
+    that the criteria before it in that order let through.
+    '''
+
+    if sqlitestorage.is_sqlite_path(_database_path):
+        return sqlitestorage.iterate(
+            _database_path, date_sequence, no_tags, ruled_out_counts)
+    if sharding.is_sharded_path(_database_path):
+        return sharding.iterate(_database_path, date_sequence)
+    return (
+        x for _, x in _iterate_json(
+            date_sequence,
+            description_matcher,
+            no_tags,
+            tag_queries,
+            amount_ranges,
+            ruled_out_counts=ruled_out_counts))
+
+
+def iterate_with_positions(
+        date_sequence=None,
+        no_tags=False,
+        description_matcher=None,
+        tag_queries=(),
+        amount_ranges=None,
+        positions=None,
+        ruled_out_counts=None):
+    '''
+    Yield the position and transaction of each transaction in a JSON
+    database as :func:`iterate` does, where a position is the row in
+    the database file or, past the last row, the order in which the
+    journal added it.
+
+    When the database has a :func:`result_cache`, giving the sorted
+    list `positions` yields just the transactions at those positions.
+    '''
+
+    return _iterate_json(
+        date_sequence,
+        description_matcher,
+        no_tags,
+        tag_queries,
+        amount_ranges,
+        positions,
+        ruled_out_counts)
+
+
+def result_cache():
+    '''
+    Return the :class:`resultcaching.ResultCache` of the database as it
+    is now, or ``None`` if its transactions cannot be read by position:
+    it is not a JSON database with a current snapshot.
+    '''
+
+    if (sqlitestorage.is_sqlite_path(_database_path) or
+            sharding.is_sharded_path(_database_path) or
+            not snapshots.is_current(_snapshot_path(), _database_path)):
+        return None
+    return resultcaching.ResultCache(
+        _result_cache_path(),
+        caching.stat_key([_database_path, _journal().path]))
+
+
 def store(xactions):
-    with open(_database_path, 'w') as database_file:
-        json.dump(
-            [x.encode() for x in xactions],
-            database_file,
-            indent=4)
+    '''
+    Store `xactions` as the entire content of the database.
+
+    When `xactions` are the transactions most recently loaded from or
+    stored to a JSON database, perhaps with new ones among them, only
+    their differences are appended to the journal.  Otherwise the
+    database is rewritten and the journal is discarded.  A sharded
+    database rewrites only the shards that changed.
+    '''
+
+    if sqlitestorage.is_sqlite_path(_database_path):
+        sqlitestorage.store(_database_path, xactions)
+        return
+    if sharding.is_sharded_path(_database_path):
+        sharding.store(_database_path, xactions)
+        return
+
+    caching.clear(_cache_path())
+    resultcaching.clear(_result_cache_path())
+    if not _store_to_journal(xactions):
+        _rewrite_database(xactions)
+
+
+def add(xactions):
+    '''
+    Add `xactions` to the database.
+
+    A stored JSON database only appends them to the journal, without
+    reading the database, after which the transactions last loaded no
+    longer journal their changes when stored.  Otherwise the database
+    is loaded, extended and stored.
+    '''
+
+    if (sqlitestorage.is_sqlite_path(_database_path) or
+            sharding.is_sharded_path(_database_path) or
+            not os.path.exists(_database_path)):
+        stored_xactions = load()
+        stored_xactions.extend(xactions)
+        store(stored_xactions)
+        return
+    if len(xactions) == 0:
+        return
+
+    caching.clear(_cache_path())
+    resultcaching.clear(_result_cache_path())
+    _journal().append([
+        {'op': 'add', 'transaction': x.encode()} for x in xactions
+    ])
+    global _baseline
+    _baseline = None
+
+
+def content_counter():
+    '''
+    Return a function that counts the transactions in the database with
+    a given :func:`contentindexing.content_key`, reading only the
+    content index and the journal, or ``None`` if there is no current
+    content index: the database is not JSON, or its file was not
+    written by :func:`store`.
+    '''
+
+    if (sqlitestorage.is_sqlite_path(_database_path) or
+            sharding.is_sharded_path(_database_path)):
+        return None
+    content_index = contentindexing.load(
+        _content_index_path(), [_database_path])
+    if content_index is None:
+        return None
+
+    _, added_json_decodables = _replay_journal()
+    added_counts_by_key = {}
+    for json_decodable in added_json_decodables:
+        key = contentindexing.content_key(Transaction.decode(json_decodable))
+        added_counts_by_key[key] = added_counts_by_key.get(key, 0) + 1
+    return lambda key: (
+        content_index.count(key) + added_counts_by_key.get(key, 0))
+
+
+def compact():
+    '''
+    Fold the journal into the database file, or reclaim unused space
+    in a SQLite database.  A sharded database is always compact.
+    '''
+
+    if sqlitestorage.is_sqlite_path(_database_path):
+        sqlitestorage.compact(_database_path)
+    elif not sharding.is_sharded_path(_database_path):
+        _rewrite_database(load())
+
+
+def set_cache_enabled(enabled):
+    '''
+    Enable or disable the cache of decoded transactions that spares
+    read-only commands from decoding an unchanged JSON database.
+    '''
+
+    global _cache_enabled
+    _cache_enabled = enabled
+
+
+def clear_cache():
+    '''
+    Discard the cache of decoded transactions so that the next full
+    read rebuilds it.
+    '''
+
+    caching.clear(_cache_path())
 
 
 def database_path():
     return _database_path
 
 
+def manifest_path():
+    '''
+    Return the path of the manifest of the files imported into the
+    database.
+    '''
+
+    return _database_path + '.manifest'
+
+
 def set_database_path(path):
     global _database_path
     _database_path = path
 
 
+def write_json_array(json_file, xactions, compact=False):
+    '''
+    Write `xactions` to `json_file` as a JSON array, encoding one
+    transaction at a time.
+
+    The readable layout is exactly that of ``json.dump(..., indent=4)``
+    so that it diffs cleanly against older databases.  The `compact`
+    layout puts each transaction on one line without spaces.
+    '''
+
+    if compact:
+        opening, separator, closing = '[\n', ',\n', '\n]'
+
+        def encode(x):
+            return json.dumps(x.encode(), separators=(',', ':'))
+    else:
+        opening, separator, closing = '[\n    ', ', \n    ', '\n]'
+
+        def encode(x):
+            return json.dumps(x.encode(), indent=4).replace('\n', '\n    ')
+
+    written_any = False
+    for x in xactions:
+        json_file.write(separator if written_any else opening)
+        json_file.write(encode(x))
+        written_any = True
+    json_file.write(closing if written_any else '[]')
+
+
+def iterate_json_array(json_file, chunk_size=64 * 1024):
+    '''
+    Yield each element of the top-level JSON array in `json_file`,
+    reading no more than `chunk_size` characters at a time beyond the
+    element being decoded.
+    '''
+
+    decoder = json.JSONDecoder()
+    buffer_ = ''
+    index = 0
+    at_eof = False
+
+    # Each state names the tokens that may come next.
+    state = '['
+
+    while True:
+        while index < len(buffer_) and buffer_[index].isspace():
+            index += 1
+
+        if index == len(buffer_):
+            if at_eof:
+                raise ValueError('Unexpected end of JSON array.')
+            chunk = json_file.read(chunk_size)
+            at_eof = (chunk == '')
+            buffer_, index = chunk, 0
+            continue
+
+        token = buffer_[index]
+        if state in ('[', ',]'):
+            if token not in state:
+                raise ValueError(
+                    'Expected one of "%s" but found "%s" in JSON array.' % (
+                        state, token))
+            index += 1
+            if token == ']':
+                return
+            state = 'element]' if token == '[' else 'element'
+            continue
+
+        if token == ']' and state == 'element]':
+            return
+
+        try:
+            element, index = decoder.raw_decode(buffer_, index)
+        except ValueError:
+            if at_eof:
+                raise
+            chunk = json_file.read(chunk_size)
+            at_eof = (chunk == '')
+            buffer_, index = buffer_[index:] + chunk, 0
+            continue
+
+        yield element
+        state = ',]'
+
+
+def same_fields(fields, other_fields):
+    '''
+    Return ``True`` if two :meth:`Transaction.fields` tuples hold the
+    same values, decoding only the dates that one holds as a string and
+    the other does not.
+    '''
+
+    if fields == other_fields:
+        return True
+    return _decoded_fields(fields) == _decoded_fields(other_fields)
+
+
+def _decoded_fields(fields):
+    type_, trans_date, post_date, description, amount = fields
+    if isinstance(trans_date, basestring):
+        trans_date = _parse_transaction_date(trans_date)
+    if isinstance(post_date, basestring):
+        post_date = _parse_transaction_date(post_date)
+    return type_, trans_date, post_date, description, amount
+
+
 class Transaction(object):
     '''
     A single account-activity event
+
+    Transactions are numerous, so they have no ``__dict__``, the types
+    and tag names they decode are interned, and those without tags
+    share one immutable empty ``tags``.  Use :meth:`add_tags` rather
+    than updating ``tags`` in place.
+
+    :meth:`decode` leaves dates and tags in their JSON-decodable form
+    until they are first read, and ``date`` is worked out once and
+    remembered until either date is replaced.
+
+    A transaction loaded from a JSON database remembers its index
+    there and tells the database version it came from whenever its
+    tags are replaced or another field is set, so that :func:`store`
+    need not look for what changed.
     '''
 
+    __slots__ = (
+        '_type',
+        '_trans_date',
+        '_post_date',
+        '_date',
+        '_description',
+        '_amount',
+        '_tags',
+        '_baseline',
+        '_index',
+    )
+
     def __init__(self):
-        self.type = None
-        self.trans_date = None
-        self.post_date = None
-        self.description = None
-        self.amount = None
-        self.tags = {}
+        self._type = None
+        self._trans_date = None
+        self._post_date = None
+        self._date = None
+        self._description = None
+        self._amount = None
+        self._tags = _no_tags
+        self._baseline = None
+        self._index = None
+
+    def add_tags(self, tags):
+        '''
+        Add `tags`, a mapping of tag onto amount (or ``None``).
+        '''
+
+        merged_tags = dict(self.tags)
+        merged_tags.update(tags)
+        self.tags = merged_tags
+
+    @property
+    def type(self):
+        return self._type
+
+    @type.setter
+    def type(self, type_):
+        self._type = type_
+        if self._baseline is not None:
+            self._baseline.is_edited = True
+
+    @property
+    def trans_date(self):
+        trans_date = self._trans_date
+        if isinstance(trans_date, basestring):
+            trans_date = self._trans_date = _parse_transaction_date(
+                trans_date)
+        return trans_date
+
+    @trans_date.setter
+    def trans_date(self, trans_date):
+        self._trans_date = trans_date
+        self._date = _undecoded
+        if self._baseline is not None:
+            self._baseline.is_edited = True
+
+    @property
+    def post_date(self):
+        post_date = self._post_date
+        if isinstance(post_date, basestring):
+            post_date = self._post_date = _parse_transaction_date(post_date)
+        return post_date
+
+    @post_date.setter
+    def post_date(self, post_date):
+        self._post_date = post_date
+        self._date = _undecoded
+        if self._baseline is not None:
+            self._baseline.is_edited = True
 
     @property
     def date(self):
-        if self.trans_date is not None:
-            return self.trans_date
-        elif self.post_date is not None:
-            return self.post_date
-        return None
+        date = self._date
+        if date is _undecoded:
+            date = self.trans_date
+            if date is None:
+                date = self.post_date
+            self._date = date
+        return date
+
+    @property
+    def description(self):
+        return self._description
+
+    @description.setter
+    def description(self, description):
+        self._description = description
+        if self._baseline is not None:
+            self._baseline.is_edited = True
+
+    @property
+    def amount(self):
+        return self._amount
+
+    @amount.setter
+    def amount(self, amount):
+        self._amount = amount
+        if self._baseline is not None:
+            self._baseline.is_edited = True
+
+    @property
+    def tags(self):
+        tags = self._tags
+        if isinstance(tags, _EncodedTags):
+            tags = self._tags = _decode_tags(tags.json_decodable)
+        return tags
+
+    @tags.setter
+    def tags(self, tags):
+        if self._baseline is not None:
+            self._baseline.retag(self)
+        self._tags = tags
 
     @property
     def date_as_string(self):
@@ -82,16 +543,35 @@ class Transaction(object):
 
     @property
     def trans_date_as_string(self):
+        if isinstance(self._trans_date, basestring):
+            return self._trans_date
         if self.trans_date is None:
             return None
         return datetools.date_as_string(self.trans_date)
 
     @property
     def post_date_as_string(self):
+        if isinstance(self._post_date, basestring):
+            return self._post_date
         if self.post_date is None:
             return None
         return datetools.date_as_string(self.post_date)
 
+    def fields(self):
+        '''
+        Return the values of every field but the tags as a tuple, with
+        each date as it is held: a date or, until it is first read, its
+        string.  Compare two with :func:`same_fields`.
+        '''
+
+        return (
+            self.type,
+            self._trans_date,
+            self._post_date,
+            self.description,
+            self.amount,
+        )
+
     def encode(self):
         return {
             'type': self.type,
@@ -102,21 +582,614 @@ class Transaction(object):
             'tags': self.tags,
         }
 
+    @staticmethod
+    def from_fields(type_, trans_date, post_date, description, amount):
+        '''
+        Return a new transaction without tags from the values of its
+        other fields, more quickly than setting each in turn.
+        '''
+
+        x = Transaction()
+        x._type = type_
+        x._trans_date = trans_date
+        x._post_date = post_date
+        x._date = _undecoded
+        x._description = description
+        x._amount = amount
+        return x
+
     @staticmethod
     def decode(json_decodable):
         x = Transaction()
-        x.type = json_decodable['type']
-        x.trans_date = _parse_transaction_date(json_decodable['trans_date'])
-        x.post_date = _parse_transaction_date(json_decodable['post_date'])
-        x.description = json_decodable['description']
-        x.amount = json_decodable['amount']
-        if 'tags' in json_decodable:
-            x.tags = json_decodable['tags']
-            if isinstance(x.tags, list):
-                x.tags = {tag: None for tag in x.tags}
+        x._type = _intern(json_decodable['type'])
+        x._trans_date = json_decodable['trans_date']
+        x._post_date = json_decodable['post_date']
+        x._date = _undecoded
+        x._description = json_decodable['description']
+        x._amount = json_decodable['amount']
+        tags = json_decodable.get('tags')
+        if tags:
+            x._tags = _EncodedTags(tags)
         return x
 
 
+class _Undecoded(object):
+    '''
+    Stands in for a value that has yet to be worked out
+    '''
+
+    def __reduce__(self):
+        # Unpickle as the one shared instance, so that transactions
+        # parsed in another process still work their dates out.
+        return '_undecoded'
+
+
+_undecoded = _Undecoded()
+
+
+class _EncodedTags(object):
+    '''
+    The JSON-decodable form of a transaction's tags, awaiting decoding
+    '''
+
+    __slots__ = ('json_decodable',)
+
+    def __init__(self, json_decodable):
+        self.json_decodable = json_decodable
+
+
+def _decode_tags(tags):
+    '''
+    Return the ``tags`` of a transaction from their JSON-decodable
+    form, which may be a ``dict``, a ``list`` or ``None``.
+    '''
+
+    if not tags:
+        return _no_tags
+    if isinstance(tags, list):
+        tags = dict.fromkeys(tags)
+    return {_intern(tag): amount for tag, amount in tags.items()}
+
+
+class _EmptyTags(dict):
+    '''
+    The immutable empty ``tags`` that every untagged transaction shares
+    '''
+
+    def _refuse(self, *args, **kwargs):
+        raise TypeError(
+            'Shared empty tags are immutable; use Transaction.add_tags().')
+
+    def __reduce__(self):
+        # Unpickle as the one shared instance.
+        return '_no_tags'
+
+    __setitem__ = _refuse
+    __delitem__ = _refuse
+    clear = _refuse
+    pop = _refuse
+    popitem = _refuse
+    setdefault = _refuse
+    update = _refuse
+
+
+_no_tags = _EmptyTags()
+
+_interned_strings = {}
+
+
+def _intern(s):
+    '''
+    Return the one shared copy of `s`.  Unlike :func:`intern`, this
+    accepts ``unicode``, which is what :mod:`json` decodes.
+    '''
+
+    return _interned_strings.setdefault(s, s)
+
+
+def _iterate_json(
+        date_sequence=None,
+        description_matcher=None,
+        no_tags=False,
+        tag_queries=(),
+        amount_ranges=None,
+        positions=None,
+        ruled_out_counts=None):
+    '''
+    Yield the index and :class:`Transaction` of each transaction in a
+    JSON database, preferring its binary snapshot, then the cache.
+
+    Decoding the whole database without a snapshot refills the cache,
+    which means holding every transaction in memory until the last is
+    yielded.
+    '''
+
+    # A current snapshot decodes more quickly than the cache, so the
+    # cache serves only a database without one.
+    if (not _cache_enabled or
+            snapshots.is_current(_snapshot_path(), _database_path)):
+        for index_and_xaction in _decode_json(
+                date_sequence,
+                description_matcher,
+                no_tags,
+                tag_queries,
+                amount_ranges,
+                positions,
+                ruled_out_counts):
+            yield index_and_xaction
+        return
+
+    key = caching.file_key([_database_path, _journal().path])
+    cached_rows = caching.load(_cache_path(), key)
+    if cached_rows is not None:
+        for cached_row in cached_rows:
+            yield _from_cached_row(cached_row)
+        return
+
+    indexes_and_xactions = []
+    for index_and_xaction in _decode_json():
+        indexes_and_xactions.append(index_and_xaction)
+        yield index_and_xaction
+    indexes_and_xactions.sort(
+        key=lambda index_and_xaction: index_and_xaction[1].date,
+        reverse=True)
+    caching.store(
+        _cache_path(),
+        key,
+        [_as_cached_row(index, x) for index, x in indexes_and_xactions])
+
+
+def _as_cached_row(index, x):
+    '''
+    Return the index and :class:`Transaction` `x` as a tuple of plain
+    values, which unpickle several times faster than the transaction.
+    '''
+
+    return (
+        index,
+        x.type,
+        0 if x.trans_date is None else x.trans_date.toordinal(),
+        0 if x.post_date is None else x.post_date.toordinal(),
+        x.description,
+        x.amount,
+        x.tags or None,
+    )
+
+
+def _from_cached_row(cached_row):
+    (
+        index,
+        type_,
+        trans_date_ordinal,
+        post_date_ordinal,
+        description,
+        amount,
+        tags,
+    ) = cached_row
+    x = Transaction.from_fields(
+        type_,
+        (None if trans_date_ordinal == 0
+         else datetime.date.fromordinal(trans_date_ordinal)),
+        (None if post_date_ordinal == 0
+         else datetime.date.fromordinal(post_date_ordinal)),
+        description,
+        amount)
+    if tags is not None:
+        x.tags = tags
+    return index, x
+
+
+def _decode_json(
+        date_sequence=None,
+        description_matcher=None,
+        no_tags=False,
+        tag_queries=(),
+        amount_ranges=None,
+        positions=None,
+        ruled_out_counts=None):
+    '''
+    Yield the index and :class:`Transaction` of each transaction in a
+    JSON database, preferring its binary snapshot when it is current.
+
+    With a current snapshot, only the indexes in the sorted list
+    `positions`, if given, are yielded.
+    '''
+
+    tags_by_index, added_json_decodables = _replay_journal()
+
+    def with_journaled_tags(index, x):
+        if index in tags_by_index:
+            x.tags = tags_by_index[index]
+        return index, x
+
+    # The indexes of the added transactions to yield, or ``None`` for
+    # all of them
+    added_indexes = None
+
+    snapshot_path = _snapshot_path()
+    if snapshots.is_current(snapshot_path, _database_path):
+        row_count = snapshots.row_count(snapshot_path)
+        rows, added_indexes = _selected_indexes(
+            row_count,
+            tags_by_index,
+            added_json_decodables,
+            date_sequence,
+            description_matcher,
+            no_tags,
+            tag_queries,
+            amount_ranges,
+            positions,
+            ruled_out_counts)
+        for index, x in snapshots.iterate(snapshot_path, date_sequence, rows):
+            yield with_journaled_tags(index, x)
+        index = row_count
+    elif not os.path.exists(_database_path):
+        # A database yet to be stored is empty.
+        index = 0
+    else:
+        index = 0
+        with _open_for_reading(_database_path) as database_file:
+            for json_decodable in iterate_json_array(database_file):
+                yield with_journaled_tags(
+                    index, Transaction.decode(json_decodable))
+                index += 1
+
+    for json_decodable in added_json_decodables:
+        if added_indexes is None or index in added_indexes:
+            yield with_journaled_tags(
+                index, Transaction.decode(json_decodable))
+        index += 1
+
+
+def _selected_indexes(
+        row_count,
+        tags_by_index,
+        added_json_decodables,
+        date_sequence,
+        description_matcher,
+        no_tags,
+        tag_queries,
+        amount_ranges,
+        positions,
+        ruled_out_counts):
+    '''
+    Return the sorted rows of a current snapshot of `row_count` rows
+    to decode, and the set of indexes of the added transactions to
+    yield, each ``None`` for all, as far as the current indexes and
+    `positions` can tell.  `tags_by_index` and `added_json_decodables`
+    are what :func:`_replay_journal` returns.
+
+    Unless `positions` is given, how many transactions in
+    `date_sequence` each index ruled out is added to the dict
+    `ruled_out_counts`, if given, as :func:`iterate` describes.
+    '''
+
+    index_count = row_count + len(added_json_decodables)
+    if positions is not None:
+        selected = positions
+    else:
+        selections = _index_selections(
+            row_count,
+            index_count,
+            tags_by_index,
+            added_json_decodables,
+            description_matcher,
+            no_tags,
+            tag_queries,
+            amount_ranges)
+        if len(selections) == 0:
+            return None, None
+
+        # The sorted indexes still selected, or ``None`` for all
+        selected = None
+        if date_sequence is not None and not date_sequence.is_empty:
+            selected = snapshots.rows_in_dates(
+                _snapshot_path(), date_sequence)
+            for index, json_decodable in enumerate(
+                    added_json_decodables, row_count):
+                date = Transaction.decode(json_decodable).date
+                if date is not None and date in date_sequence:
+                    selected.append(index)
+
+        for name, selection in selections:
+            if selected is None:
+                selected_count = index_count
+                selected = selection
+            else:
+                selected_count = len(selected)
+                selected = sorted(set(selected).intersection(selection))
+            if ruled_out_counts is not None:
+                ruled_out_counts[name] = (
+                    ruled_out_counts.get(name, 0) +
+                    selected_count - len(selected))
+
+    first_added = bisect.bisect_left(selected, row_count)
+    return selected[:first_added], set(selected[first_added:])
+
+
+def _index_selections(
+        row_count,
+        index_count,
+        tags_by_index,
+        added_json_decodables,
+        description_matcher,
+        no_tags,
+        tag_queries,
+        amount_ranges):
+    '''
+    Return the name of each criterion that a current index answers, as
+    :func:`iterate` names them, with the sorted indexes among
+    `index_count` that satisfy it, in that order.
+    '''
+
+    selections = []
+    if (description_matcher is not None and
+            indexing.is_current(_index_path(), _database_path)):
+        # The description index covers only the rows.
+        selections.append((
+            'include',
+            indexing.matching_rows(_index_path(), description_matcher) +
+            range(row_count, index_count)))
+    if no_tags or len(tag_queries) > 0:
+        tag_index = _load_tag_index()
+        if tag_index is not None:
+            # The tag index covers only the rows, as they were written.
+            journaled_tags_by_index = dict(tags_by_index)
+            for index, json_decodable in enumerate(
+                    added_json_decodables, row_count):
+                journaled_tags_by_index.setdefault(
+                    index, _decode_tags(json_decodable.get('tags')))
+            if no_tags:
+                selections.append(('no-tags', _with_journaled_tags(
+                    tag_index.select((), True),
+                    journaled_tags_by_index,
+                    lambda tags: not tags)))
+            if len(tag_queries) > 0:
+                selections.append(('tag', _with_journaled_tags(
+                    tag_index.select(tag_queries),
+                    journaled_tags_by_index,
+                    lambda tags: all(
+                        tag_query(tags) for tag_query in tag_queries))))
+    if amount_ranges is not None:
+        amount_index = _load_amount_index()
+        if amount_index is not None:
+            # The amount index covers only the rows, whose amounts the
+            # journal never changes.
+            selections.append((
+                'amount',
+                amount_index.select(amount_ranges) + [
+                    index
+                    for index, json_decodable in enumerate(
+                        added_json_decodables, row_count)
+                    if json_decodable['amount'] in amount_ranges
+                ]))
+    return selections
+
+
+def _with_journaled_tags(selection, tags_by_index, predicate):
+    '''
+    Return the sorted `selection` of rows from the tag index, with each
+    index in `tags_by_index` selected instead by whether its tags there
+    satisfy `predicate`.
+    '''
+
+    if len(tags_by_index) == 0:
+        return selection
+    return sorted(
+        [index for index in selection if index not in tags_by_index] +
+        [index for index, tags in tags_by_index.iteritems()
+         if predicate(tags)])
+
+
+def _unzip(pairs):
+    firsts = []
+    seconds = []
+    for first, second in pairs:
+        firsts.append(first)
+        seconds.append(second)
+    return firsts, seconds
+
+
+def _snapshot_path():
+    return _database_path + '.snapshot'
+
+
+def _index_path():
+    return _database_path + '.index'
+
+
+def _tag_index_path():
+    return _database_path + '.tags'
+
+
+def _load_tag_index():
+    return tagindexing.load(_tag_index_path(), [_database_path])
+
+
+def _content_index_path():
+    return _database_path + '.keys'
+
+
+def _amount_index_path():
+    return _database_path + '.amounts'
+
+
+def _load_amount_index():
+    return amountindexing.load(_amount_index_path(), [_database_path])
+
+
+def _cache_path():
+    return _database_path + '.cache'
+
+
+def _result_cache_path():
+    return _database_path + '.results'
+
+
+_cache_enabled = True
+
+
+def _journal():
+    return journaling.Journal(_database_path + '.journal')
+
+
+def _replay_journal():
+    '''
+    Return the latest tags of each edited transaction by index and the
+    JSON-decodable form of each transaction added through the journal.
+    '''
+
+    tags_by_index = {}
+    added_json_decodables = []
+    for record in _journal().iterate():
+        if record['op'] == 'tags':
+            tags_by_index[record['index']] = _decode_tags(record['tags'])
+        elif record['op'] == 'add':
+            added_json_decodables.append(record['transaction'])
+        else:
+            raise journaling.JournalError(
+                '"%s" is not a journal operation.' % record['op'])
+    return tags_by_index, added_json_decodables
+
+
+class _Baseline(object):
+    '''
+    The version of a JSON database that its transactions were last
+    loaded from or stored as
+
+    Each of its transactions refers back to it with its index in the
+    database.  It hears of every transaction whose tags were replaced
+    since, and of any other field set.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.retagged = set()
+        self.is_edited = False
+
+    def add(self, index, x):
+        x._baseline = self
+        x._index = index
+        self.count += 1
+
+    def retag(self, x):
+        self.retagged.add(x)
+
+
+_baseline = None
+
+
+def _remember_baseline(indexes, xactions):
+    global _baseline
+    _baseline = _Baseline(_database_path)
+    for index, x in zip(indexes, xactions):
+        _baseline.add(index, x)
+
+
+def _store_to_journal(xactions):
+    '''
+    Append the changes the baseline heard of, and the transactions new
+    to it, to the journal and return ``True``, or return ``False`` when
+    they cannot be expressed that way: a transaction was removed, came
+    from another version of the database or had a field other than its
+    tags set.
+    '''
+
+    baseline = _baseline
+    if baseline is None or baseline.path != _database_path:
+        return False
+    if baseline.is_edited or not os.path.exists(_database_path):
+        return False
+
+    new_xactions = [x for x in xactions if x._baseline is not baseline]
+    if len(xactions) - len(new_xactions) != baseline.count:
+        return False
+    for x in new_xactions:
+        if x._baseline is not None:
+            return False
+
+    records = [
+        {'op': 'tags', 'index': x._index, 'tags': x.tags}
+        for x in sorted(baseline.retagged, key=lambda x: x._index)
+    ]
+    for x in new_xactions:
+        records.append({'op': 'add', 'transaction': x.encode()})
+    if len(records) == 0:
+        return True
+
+    _journal().append(records)
+    baseline.retagged = set()
+    for index, x in enumerate(new_xactions, baseline.count):
+        baseline.add(index, x)
+    return True
+
+
+def _rewrite_database(xactions):
+    '''
+    Rewrite the database file, its binary snapshot and its indexes
+    with `xactions` and discard the journal.
+    '''
+
+    xactions = sorted(xactions, key=lambda x: x.date, reverse=True)
+    temporary_path = _database_path + '.tmp'
+    with _open_for_writing(temporary_path, _database_path) as database_file:
+        write_json_array(
+            database_file,
+            xactions,
+            compact=_is_compressed_path(_database_path))
+    os.rename(temporary_path, _database_path)
+    snapshots.write(_snapshot_path(), xactions, _database_path)
+    indexing.write(_index_path(), xactions, _database_path)
+    tagindexing.write(_tag_index_path(), xactions, [_database_path])
+    amountindexing.write(_amount_index_path(), xactions, [_database_path])
+    contentindexing.write(_content_index_path(), xactions, [_database_path])
+    _journal().clear()
+    _remember_baseline(range(len(xactions)), xactions)
+
+
+_compressors_by_extension = {
+    '.gz': gzip.GzipFile,
+    '.bz2': bz2.BZ2File,
+}
+
+_compressors_by_magic = {
+    '\x1f\x8b': gzip.GzipFile,
+    'BZh': bz2.BZ2File,
+}
+
+
+def _is_compressed_path(path):
+    return os.path.splitext(path)[1].lower() in _compressors_by_extension
+
+
+def _open_for_reading(path):
+    '''
+    Open the file at `path` for reading, decompressing it if its first
+    bytes say it is compressed.
+    '''
+
+    with open(path, 'rb') as probed_file:
+        magic = probed_file.read(3)
+    for compressor_magic, compressor in _compressors_by_magic.iteritems():
+        if magic.startswith(compressor_magic):
+            return contextlib.closing(compressor(path, 'rb'))
+    return open(path, 'r')
+
+
+def _open_for_writing(path, final_path):
+    '''
+    Open the file at `path` for writing, compressing it if the file it
+    will be renamed to, `final_path`, has a compressed extension.
+    '''
+
+    extension = os.path.splitext(final_path)[1].lower()
+    compressor = _compressors_by_extension.get(extension)
+    if compressor is None:
+        return open(path, 'w')
+    return contextlib.closing(compressor(path, 'wb'))
+
+
 def _parse_transaction_date(s):
     if s is None:
         return None